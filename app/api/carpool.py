@@ -1,21 +1,27 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.database import get_db
+from app.db.replicas import get_read_db
 from app.models.user import User
 from app.models.carpool import CarpoolEvent
-from app.schemas.carpool import CarpoolEventCreate, CarpoolEventResponse, CarpoolEventUpdate, CarpoolSearchQuery
+from app.schemas.carpool import CarpoolEventCreate, CarpoolEventResponse, CarpoolEventListResponse, CarpoolEventUpdate, CarpoolSearchQuery, CarpoolSearchResponse
+from app.schemas.search import AutocompleteResponse
 from app.utils.auth import get_current_user
-from app.utils.elastic import index_carpool_event, delete_document, CARPOOL_INDEX, search_carpool_events
+from app.utils.elastic import index_carpool_event, delete_document, CARPOOL_INDEX, search_carpool_events_async
+from app.utils.search import hydrate_search_hits, get_hit_highlights
+from app.utils.pagination import InvalidCursorError, keyset_query, keyset_page
+from app.utils.autocomplete import autocomplete_index
 
 router = APIRouter(prefix="/carpool", tags=["Carpool Management"])
 
 # Create a new carpool event
 @router.post("/events", response_model=CarpoolEventResponse, status_code=status.HTTP_201_CREATED)
-def create_carpool_event(
+async def create_carpool_event(
     event_data: CarpoolEventCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     # Create carpool event
@@ -29,8 +35,11 @@ def create_carpool_event(
     
     # Add to database
     db.add(db_event)
-    db.commit()
-    db.refresh(db_event)
+    await db.commit()
+    await db.refresh(db_event)
+    
+    # Keep the cached destination completions up to date
+    autocomplete_index.update(current_user.id, "destinations", new_text=db_event.destination)
     
     # Index in Elasticsearch - but don't block if it fails
     try:
@@ -44,33 +53,44 @@ def create_carpool_event(
     
     return db_event
 
-# Get all carpool events for the current user
-@router.get("/events", response_model=List[CarpoolEventResponse])
-def get_carpool_events(
+# Get the carpool events of the current user, a page at a time
+@router.get("/events", response_model=CarpoolEventListResponse)
+async def get_carpool_events(
     skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
-    # Get events for the current user ordered by drop_off_time
-    events = db.query(CarpoolEvent).filter(
-        CarpoolEvent.user_id == current_user.id
-    ).order_by(CarpoolEvent.drop_off_time).offset(skip).limit(limit).all()
+    # Get events for the current user ordered by drop_off_time, after the cursor (or the first `skip` events)
+    sort_key = (CarpoolEvent.drop_off_time, CarpoolEvent.id)
+    try:
+        query = keyset_query(
+            select(CarpoolEvent).where(CarpoolEvent.user_id == current_user.id), sort_key, limit, cursor, skip
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    events, next_cursor = keyset_page((await db.scalars(query)).all(), sort_key, limit)
     
-    return events
+    return {"results": events, "next_cursor": next_cursor}
 
 # Get a specific carpool event
 @router.get("/events/{event_id}", response_model=CarpoolEventResponse)
-def get_carpool_event(
+async def get_carpool_event(
     event_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     # Get event
-    event = db.query(CarpoolEvent).filter(
-        CarpoolEvent.id == event_id,
-        CarpoolEvent.user_id == current_user.id
-    ).first()
+    event = await db.scalar(
+        select(CarpoolEvent).where(
+            CarpoolEvent.id == event_id,
+            CarpoolEvent.user_id == current_user.id
+        )
+    )
     
     if not event:
         raise HTTPException(
@@ -82,17 +102,19 @@ def get_carpool_event(
 
 # Update a carpool event
 @router.put("/events/{event_id}", response_model=CarpoolEventResponse)
-def update_carpool_event(
+async def update_carpool_event(
     event_id: int,
     event_data: CarpoolEventUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     # Get event
-    event = db.query(CarpoolEvent).filter(
-        CarpoolEvent.id == event_id,
-        CarpoolEvent.user_id == current_user.id
-    ).first()
+    event = await db.scalar(
+        select(CarpoolEvent).where(
+            CarpoolEvent.id == event_id,
+            CarpoolEvent.user_id == current_user.id
+        )
+    )
     
     if not event:
         raise HTTPException(
@@ -101,13 +123,17 @@ def update_carpool_event(
         )
     
     # Update event
+    previous_destination = event.destination
     event.description = event_data.description
     event.destination = event_data.destination
     event.drop_off_time = event_data.drop_off_time
     event.notes = event_data.notes
     
-    db.commit()
-    db.refresh(event)
+    await db.commit()
+    await db.refresh(event)
+    
+    # Keep the cached destination completions up to date
+    autocomplete_index.update(current_user.id, "destinations", old_text=previous_destination, new_text=event.destination)
     
     # Update in Elasticsearch - but don't block if it fails
     try:
@@ -123,16 +149,18 @@ def update_carpool_event(
 
 # Delete a carpool event
 @router.delete("/events/{event_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_carpool_event(
+async def delete_carpool_event(
     event_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     # Get event
-    event = db.query(CarpoolEvent).filter(
-        CarpoolEvent.id == event_id,
-        CarpoolEvent.user_id == current_user.id
-    ).first()
+    event = await db.scalar(
+        select(CarpoolEvent).where(
+            CarpoolEvent.id == event_id,
+            CarpoolEvent.user_id == current_user.id
+        )
+    )
     
     if not event:
         raise HTTPException(
@@ -141,36 +169,57 @@ def delete_carpool_event(
         )
     
     # Delete from database
-    db.delete(event)
-    db.commit()
+    previous_destination = event.destination
+    await db.delete(event)
+    await db.commit()
+    
+    # Keep the cached destination completions up to date
+    autocomplete_index.update(current_user.id, "destinations", old_text=previous_destination)
     
     # Delete from Elasticsearch - but don't block if it fails
     try:
-        delete_document(CARPOOL_INDEX, event_id)
+        delete_document(CARPOOL_INDEX, event_id, current_user.id)
     except Exception as e:
         # If deletion from Elasticsearch fails, just log the error
         print(f"Warning: Error occurred during carpool event deletion from Elasticsearch: {str(e)}")
     
     return None
 
+# Autocomplete destinations
+@router.get("/autocomplete", response_model=AutocompleteResponse)
+async def autocomplete_destinations(
+    q: str,
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    # Complete from the user's in-memory prefix trie, loaded from the database on first use
+    completions = await autocomplete_index.complete_async(db, current_user.id, "destinations", q, limit)
+    
+    return {"query": q, "completions": completions}
+
 # Search carpool events
-@router.post("/search", response_model=List[CarpoolEventResponse])
-def search_events(
+@router.post("/search", response_model=CarpoolSearchResponse)
+async def search_events(
     search_query: CarpoolSearchQuery,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     # Search in Elasticsearch
-    search_results = search_carpool_events(current_user.id, search_query.query)
-    
-    # Extract event IDs
-    event_ids = [hit["_source"]["id"] for hit in search_results["hits"]["hits"]]
-    
-    # Get events from database
-    events = []
-    for event_id in event_ids:
-        event = db.query(CarpoolEvent).filter(CarpoolEvent.id == event_id).first()
-        if event:
-            events.append(event)
+    try:
+        search_results = await search_carpool_events_async(
+            current_user.id, search_query.query, search_query.size, search_query.cursor, search_query.highlight
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     
-    return events 
\ No newline at end of file
+    # Load the matching events in one query, in relevance order
+    events = await db.run_sync(hydrate_search_hits, CarpoolEvent, current_user.id, search_results)
+    return {
+        "results": events,
+        "next_cursor": search_results.get("next_cursor"),
+        "highlights": get_hit_highlights(search_results)
+    }
@@ -1,27 +1,35 @@
-from typing import List
+from typing import Optional
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import func, case, insert, update, delete, select, literal
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
 from app.db.database import get_db
+from app.db.replicas import get_read_db
 from app.models.user import User
 from app.models.checklist import Checklist, ChecklistItem, ChecklistRun, ChecklistRunItem
 from app.schemas.checklist import (
-    ChecklistCreate, ChecklistResponse, ChecklistUpdate,
-    ChecklistRunCreate, ChecklistRunResponse, ChecklistRunItemUpdate,
+    ChecklistCreate, ChecklistResponse, ChecklistListResponse, ChecklistUpdate, ChecklistOverviewResponse,
+    ChecklistOverviewListResponse, ChecklistSearchResponse, ChecklistRunCreate, ChecklistRunResponse,
+    ChecklistRunListResponse, ChecklistRunItemUpdate,
     CompleteChecklistRunRequest
 )
+from app.schemas.search import AutocompleteResponse
 from app.utils.auth import get_current_user
-from app.utils.elastic import index_checklist, delete_document, CHECKLIST_INDEX, search_checklists
-from app.utils.email import send_checklist_report, generate_checklist_report_html
+from app.utils.elastic import index_checklist, delete_document, CHECKLIST_INDEX, search_checklists_async
+from app.utils.search import hydrate_search_hits, get_hit_highlights
+from app.utils.pagination import InvalidCursorError, keyset_query, keyset_page
+from app.utils.autocomplete import autocomplete_index
+from app.utils.email import queue_checklist_report, notify_email_worker, generate_checklist_report_html
 
 router = APIRouter(prefix="/checklists", tags=["Checklists"])
 
 # Create a new checklist
 @router.post("/", response_model=ChecklistResponse, status_code=status.HTTP_201_CREATED)
-def create_checklist(
+async def create_checklist(
     checklist_data: ChecklistCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     # Create checklist
@@ -33,8 +41,8 @@ def create_checklist(
     
     # Add to database
     db.add(db_checklist)
-    db.commit()
-    db.refresh(db_checklist)
+    await db.commit()
+    await db.refresh(db_checklist)
     
     # Create checklist items
     db_items = []
@@ -47,11 +55,11 @@ def create_checklist(
         db.add(db_item)
         db_items.append(db_item)
     
-    db.commit()
+    # The items keep the ids assigned on flush, as commit doesn't expire them
+    await db.commit()
     
-    # Refresh items to get their ids
-    for item in db_items:
-        db.refresh(item)
+    # Keep the cached title completions up to date
+    autocomplete_index.update(current_user.id, "checklists", new_text=db_checklist.title)
     
     # Index in Elasticsearch - but don't block if it fails
     try:
@@ -80,21 +88,39 @@ def create_checklist(
     
     return response
 
-# Get all checklists for the current user
-@router.get("/", response_model=List[ChecklistResponse])
-def get_checklists(
+# Checklists are listed in the order they were created
+CHECKLIST_SORT_KEY = (Checklist.id,)
+
+# Function to load a page of the user's checklists with their items, after the cursor (or the first `skip` checklists)
+async def get_checklist_page(db, user_id, limit, cursor, skip):
+    try:
+        query = keyset_query(
+            select(Checklist).options(selectinload(Checklist.items)).where(Checklist.user_id == user_id),
+            CHECKLIST_SORT_KEY, limit, cursor, skip
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    return keyset_page((await db.scalars(query)).all(), CHECKLIST_SORT_KEY, limit)
+
+# Get the checklists of the current user, a page at a time
+@router.get("/", response_model=ChecklistListResponse)
+async def get_checklists(
     skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
-    # Get checklists for the current user
-    checklists = db.query(Checklist).filter(Checklist.user_id == current_user.id).offset(skip).limit(limit).all()
+    # Get checklists for the current user, loading all their items in one extra query
+    checklists, next_cursor = await get_checklist_page(db, current_user.id, limit, cursor, skip)
     
     # Prepare response with items
     result = []
     for checklist in checklists:
-        items = db.query(ChecklistItem).filter(ChecklistItem.checklist_id == checklist.id).all()
+        items = checklist.items
         result.append(
             ChecklistResponse(
                 id=checklist.id,
@@ -111,25 +137,188 @@ def get_checklists(
             )
         )
     
-    return result
+    return {"results": result, "next_cursor": next_cursor}
+
+# Search checklists
+@router.get("/search", response_model=ChecklistSearchResponse)
+async def search(
+    q: str,
+    size: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = None,
+    highlight: bool = False,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    # Search in Elasticsearch
+    try:
+        search_results = await search_checklists_async(current_user.id, q, size, cursor, highlight)
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    # Load the matching checklists and their items in a fixed number of queries, in relevance order
+    checklists = await db.run_sync(
+        hydrate_search_hits, Checklist, current_user.id, search_results,
+        options=[selectinload(Checklist.items)],
+        source_check=lambda source: all("id" in item for item in source.get("items", []))
+    )
+    
+    # Prepare response with items
+    result = []
+    for checklist in checklists:
+        if isinstance(checklist, dict):
+            # Served from the index
+            result.append(
+                ChecklistResponse(
+                    id=checklist["id"],
+                    user_id=checklist["user_id"],
+                    title=checklist["title"],
+                    category=checklist["category"],
+                    created_at=checklist["created_at"],
+                    items=[{
+                        "id": item["id"],
+                        "checklist_id": checklist["id"],
+                        "text": item["text"],
+                        "is_required": item["required"]
+                    } for item in checklist.get("items", [])]
+                )
+            )
+            continue
+        
+        result.append(
+            ChecklistResponse(
+                id=checklist.id,
+                user_id=checklist.user_id,
+                title=checklist.title,
+                category=checklist.category,
+                created_at=checklist.created_at,
+                items=[{
+                    "id": item.id,
+                    "checklist_id": item.checklist_id,
+                    "text": item.text,
+                    "is_required": item.is_required
+                } for item in checklist.items]
+            )
+        )
+    
+    return {
+        "results": result,
+        "next_cursor": search_results.get("next_cursor"),
+        "highlights": get_hit_highlights(search_results)
+    }
+
+# Get the checklists of the current user with a summary of their runs, a page at a time
+@router.get("/overview", response_model=ChecklistOverviewListResponse)
+async def get_checklists_overview(
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    # Get checklists for the current user, loading all their items in one extra query
+    checklists, next_cursor = await get_checklist_page(db, current_user.id, limit, cursor, skip)
+    
+    checklist_ids = [checklist.id for checklist in checklists]
+    
+    # Aggregate the runs of every checklist in one query
+    run_stats = {}
+    if checklist_ids:
+        rows = (await db.execute(
+            select(
+                ChecklistRun.checklist_id,
+                func.count(ChecklistRun.id),
+                func.max(ChecklistRun.started_at),
+                func.max(ChecklistRun.id),
+                func.max(case((ChecklistRun.completed_at.is_(None), ChecklistRun.id)))
+            ).where(ChecklistRun.checklist_id.in_(checklist_ids)).group_by(ChecklistRun.checklist_id)
+        )).all()
+        
+        for checklist_id, total_runs, last_run_at, latest_run_id, open_run_id in rows:
+            run_stats[checklist_id] = {
+                "total_runs": total_runs,
+                "last_run_at": last_run_at,
+                # Report progress of the open run if there is one, otherwise of the latest run
+                "summary_run_id": open_run_id or latest_run_id,
+                "open_run_id": open_run_id
+            }
+    
+    # Count completed items of each summarized run in one query
+    completion = {}
+    summary_run_ids = [stats["summary_run_id"] for stats in run_stats.values()]
+    if summary_run_ids:
+        rows = (await db.execute(
+            select(
+                ChecklistRunItem.run_id,
+                func.count(ChecklistRunItem.id),
+                func.sum(case((ChecklistRunItem.completed == True, 1), else_=0))
+            ).where(ChecklistRunItem.run_id.in_(summary_run_ids)).group_by(ChecklistRunItem.run_id)
+        )).all()
+        
+        for run_id, total_count, completed_count in rows:
+            completion[run_id] = (completed_count or 0) / total_count if total_count else None
+    
+    # Prepare response with items and run summary
+    result = []
+    for checklist in checklists:
+        stats = run_stats.get(checklist.id, {})
+        result.append(
+            ChecklistOverviewResponse(
+                id=checklist.id,
+                user_id=checklist.user_id,
+                title=checklist.title,
+                category=checklist.category,
+                created_at=checklist.created_at,
+                items=[{
+                    "id": item.id,
+                    "checklist_id": item.checklist_id,
+                    "text": item.text,
+                    "is_required": item.is_required
+                } for item in checklist.items],
+                total_runs=stats.get("total_runs", 0),
+                last_run_at=stats.get("last_run_at"),
+                open_run_id=stats.get("open_run_id"),
+                completion_ratio=completion.get(stats.get("summary_run_id"))
+            )
+        )
+    
+    return {"results": result, "next_cursor": next_cursor}
+
+# Autocomplete checklist titles
+@router.get("/autocomplete", response_model=AutocompleteResponse)
+async def autocomplete_checklists(
+    q: str,
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    # Complete from the user's in-memory prefix trie, loaded from the database on first use
+    completions = await autocomplete_index.complete_async(db, current_user.id, "checklists", q, limit)
+    
+    return {"query": q, "completions": completions}
 
 # Get a specific checklist by ID
 @router.get("/{checklist_id}", response_model=ChecklistResponse)
-def get_checklist(
+async def get_checklist(
     checklist_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    # Get checklist
-    checklist = db.query(Checklist).filter(Checklist.id == checklist_id, Checklist.user_id == current_user.id).first()
+    # Get checklist together with its items
+    checklist = await db.scalar(
+        select(Checklist).options(
+            selectinload(Checklist.items)
+        ).where(Checklist.id == checklist_id, Checklist.user_id == current_user.id)
+    )
     if not checklist:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Checklist not found"
         )
     
-    # Get items
-    items = db.query(ChecklistItem).filter(ChecklistItem.checklist_id == checklist.id).all()
+    items = checklist.items
     
     # Prepare response
     response = ChecklistResponse(
@@ -148,80 +337,92 @@ def get_checklist(
     
     return response
 
+# Function to sync the items of a checklist with the items sent by the client.
+# Items are matched on id; only changed rows are touched and each kind of change
+# (insert, update, delete) is sent to the database as a single statement.
+async def sync_checklist_items(db: AsyncSession, checklist_id: int, items_data):
+    # Get current item values without loading full ORM objects
+    existing_items = (await db.execute(
+        select(
+            ChecklistItem.id, ChecklistItem.text, ChecklistItem.is_required
+        ).where(ChecklistItem.checklist_id == checklist_id).order_by(ChecklistItem.id)
+    )).all()
+    existing_item_map = {item.id: item for item in existing_items}
+    
+    # Older clients send no ids at all - match their items by position instead
+    item_ids = [item_data.id for item_data in items_data]
+    if existing_items and not any(item_ids):
+        item_ids = [existing_items[i].id if i < len(existing_items) else None for i in range(len(items_data))]
+    
+    # Work out which rows to insert, update and delete
+    inserts = []
+    updates = []
+    kept_ids = set()
+    for item_id, item_data in zip(item_ids, items_data):
+        existing_item = existing_item_map.get(item_id)
+        if existing_item is None or item_id in kept_ids:
+            inserts.append({
+                "checklist_id": checklist_id,
+                "text": item_data.text,
+                "is_required": item_data.is_required
+            })
+            continue
+        
+        kept_ids.add(item_id)
+        if existing_item.text != item_data.text or existing_item.is_required != item_data.is_required:
+            updates.append({
+                "id": item_id,
+                "text": item_data.text,
+                "is_required": item_data.is_required
+            })
+    
+    delete_ids = [item.id for item in existing_items if item.id not in kept_ids]
+    
+    if updates:
+        await db.execute(update(ChecklistItem), updates)
+    if inserts:
+        await db.execute(insert(ChecklistItem), inserts)
+    if delete_ids:
+        await db.execute(
+            delete(ChecklistItem).where(ChecklistItem.id.in_(delete_ids)),
+            execution_options={"synchronize_session": False}
+        )
+    
+    return {"inserted": len(inserts), "updated": len(updates), "deleted": len(delete_ids)}
+
 # Update a checklist
 @router.put("/{checklist_id}", response_model=ChecklistResponse)
-def update_checklist(
+async def update_checklist(
     checklist_id: int,
     checklist_data: ChecklistUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     # Get checklist
-    checklist = db.query(Checklist).filter(Checklist.id == checklist_id, Checklist.user_id == current_user.id).first()
+    checklist = await db.scalar(select(Checklist).where(Checklist.id == checklist_id, Checklist.user_id == current_user.id))
     if not checklist:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Checklist not found"
         )
     
-    # Log the update request
-    print(f"Updating checklist {checklist_id} with {len(checklist_data.items)} items")
-    print(f"Request data: Title = '{checklist_data.title}', Category = '{checklist_data.category}'")
-    for i, item in enumerate(checklist_data.items):
-        print(f"  Item {i+1}: '{item.text}' (Required: {item.is_required})")
-    
     # Update checklist
+    previous_title = checklist.title
     checklist.title = checklist_data.title
     checklist.category = checklist_data.category
     
-    # Get existing items
-    existing_items = db.query(ChecklistItem).filter(ChecklistItem.checklist_id == checklist.id).all()
-    existing_item_map = {item.id: item for item in existing_items}
-    
-    print(f"Checklist has {len(existing_items)} existing items")
-    
-    # Process items - we'll track which existing items to keep
-    db_items = []
-    items_to_keep_ids = set()
-    
-    # Create new items or update existing ones
-    for i, item_data in enumerate(checklist_data.items):
-        # If this is an existing item that was just edited and still in the same position
-        if i < len(existing_items):
-            existing_item = existing_items[i]
-            existing_item.text = item_data.text
-            existing_item.is_required = item_data.is_required
-            db_items.append(existing_item)
-            items_to_keep_ids.add(existing_item.id)
-            print(f"Updated existing item {existing_item.id}: {item_data.text}")
-        else:
-            # This is a new item
-            db_item = ChecklistItem(
-                checklist_id=checklist.id,
-                text=item_data.text,
-                is_required=item_data.is_required
-            )
-            db.add(db_item)
-            db_items.append(db_item)
-            print(f"Added new item: {item_data.text}")
-    
-    # Delete items that no longer exist
-    items_deleted = 0
-    for item_id, item in existing_item_map.items():
-        if item_id not in items_to_keep_ids:
-            db.delete(item)
-            items_deleted += 1
+    # Apply item inserts, updates and deletes as bulk statements
+    await sync_checklist_items(db, checklist.id, checklist_data.items)
     
-    print(f"Deleted {items_deleted} items that were removed")
+    # Commit checklist and items in one transaction
+    await db.commit()
     
-    db.commit()
+    # Reload checklist and its items in a fixed number of queries
+    await db.refresh(checklist, ["title", "category", "items"])
+    db_items = checklist.items
     
-    # Refresh everything
-    db.refresh(checklist)
-    for item in db_items:
-        db.refresh(item)
-    
-    print(f"Update complete, checklist now has {len(db_items)} items")
+    # Keep the cached title completions up to date
+    autocomplete_index.update(current_user.id, "checklists", old_text=previous_title, new_text=checklist.title)
     
     # Update in Elasticsearch - but don't block if it fails
     try:
@@ -252,13 +453,13 @@ def update_checklist(
 
 # Delete a checklist
 @router.delete("/{checklist_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_checklist(
+async def delete_checklist(
     checklist_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     # Get checklist
-    checklist = db.query(Checklist).filter(Checklist.id == checklist_id, Checklist.user_id == current_user.id).first()
+    checklist = await db.scalar(select(Checklist).where(Checklist.id == checklist_id, Checklist.user_id == current_user.id))
     if not checklist:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -266,61 +467,62 @@ def delete_checklist(
         )
     
     # Delete from database (cascade will delete items and runs)
-    db.delete(checklist)
-    db.commit()
+    previous_title = checklist.title
+    await db.delete(checklist)
+    await db.commit()
+    
+    # Keep the cached title completions up to date
+    autocomplete_index.update(current_user.id, "checklists", old_text=previous_title)
     
     # Delete from Elasticsearch
-    delete_document(CHECKLIST_INDEX, checklist_id)
+    delete_document(CHECKLIST_INDEX, checklist_id, current_user.id)
     
     return None
 
 # Start a new checklist run
 @router.post("/runs", response_model=ChecklistRunResponse, status_code=status.HTTP_201_CREATED)
-def start_checklist_run(
+async def start_checklist_run(
     run_data: ChecklistRunCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     # Verify checklist exists and belongs to user
-    checklist = db.query(Checklist).filter(Checklist.id == run_data.checklist_id, Checklist.user_id == current_user.id).first()
+    checklist = await db.scalar(select(Checklist).where(Checklist.id == run_data.checklist_id, Checklist.user_id == current_user.id))
     if not checklist:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Checklist not found"
         )
     
-    # Create run
+    # Create run and flush it to get its id, without committing yet
     db_run = ChecklistRun(
         checklist_id=run_data.checklist_id,
         email_sent_to=run_data.email_sent_to,
         notes=run_data.notes
     )
-    
-    # Add to database
     db.add(db_run)
-    db.commit()
-    db.refresh(db_run)
-    
-    # Get checklist items
-    checklist_items = db.query(ChecklistItem).filter(ChecklistItem.checklist_id == checklist.id).all()
-    
-    # Create run items
-    run_items = []
-    for item in checklist_items:
-        db_run_item = ChecklistRunItem(
-            run_id=db_run.id,
-            item_id=item.id,
-            completed=False,
-            notes=None
+    await db.flush()
+    
+    # Create all run items with a single INSERT ... SELECT from the checklist items
+    await db.execute(
+        insert(ChecklistRunItem).from_select(
+            ["run_id", "item_id", "completed"],
+            select(
+                literal(db_run.id),
+                ChecklistItem.id,
+                literal(False)
+            ).where(ChecklistItem.checklist_id == checklist.id).order_by(ChecklistItem.id)
         )
-        db.add(db_run_item)
-        run_items.append(db_run_item)
+    )
     
-    db.commit()
+    # Commit run and run items in one transaction
+    await db.commit()
+    await db.refresh(db_run)
     
-    # Refresh run items to get their ids
-    for run_item in run_items:
-        db.refresh(run_item)
+    # Load the created run items in one query
+    run_items = (await db.scalars(
+        select(ChecklistRunItem).where(ChecklistRunItem.run_id == db_run.id).order_by(ChecklistRunItem.id)
+    )).all()
     
     # Prepare response
     response = ChecklistRunResponse(
@@ -343,16 +545,18 @@ def start_checklist_run(
 
 # Get a checklist run
 @router.get("/runs/{run_id}", response_model=ChecklistRunResponse)
-def get_checklist_run(
+async def get_checklist_run(
     run_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     # Get run and verify ownership
-    run = db.query(ChecklistRun).join(Checklist).filter(
-        ChecklistRun.id == run_id,
-        Checklist.user_id == current_user.id
-    ).first()
+    run = await db.scalar(
+        select(ChecklistRun).join(Checklist).where(
+            ChecklistRun.id == run_id,
+            Checklist.user_id == current_user.id
+        )
+    )
     
     if not run:
         raise HTTPException(
@@ -361,7 +565,7 @@ def get_checklist_run(
         )
     
     # Get run items
-    run_items = db.query(ChecklistRunItem).filter(ChecklistRunItem.run_id == run.id).all()
+    run_items = (await db.scalars(select(ChecklistRunItem).where(ChecklistRunItem.run_id == run.id))).all()
     
     # Prepare response
     response = ChecklistRunResponse(
@@ -384,18 +588,20 @@ def get_checklist_run(
 
 # Update a run item status
 @router.put("/runs/{run_id}/items/{item_id}", status_code=status.HTTP_200_OK)
-def update_run_item(
+async def update_run_item(
     run_id: int,
     item_id: int,
     item_data: ChecklistRunItemUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     # Verify run exists and belongs to user
-    run = db.query(ChecklistRun).join(Checklist).filter(
-        ChecklistRun.id == run_id,
-        Checklist.user_id == current_user.id
-    ).first()
+    run = await db.scalar(
+        select(ChecklistRun).join(Checklist).where(
+            ChecklistRun.id == run_id,
+            Checklist.user_id == current_user.id
+        )
+    )
     
     if not run:
         raise HTTPException(
@@ -404,10 +610,12 @@ def update_run_item(
         )
     
     # Get run item
-    run_item = db.query(ChecklistRunItem).filter(
-        ChecklistRunItem.run_id == run_id,
-        ChecklistRunItem.item_id == item_id
-    ).first()
+    run_item = await db.scalar(
+        select(ChecklistRunItem).where(
+            ChecklistRunItem.run_id == run_id,
+            ChecklistRunItem.item_id == item_id
+        )
+    )
     
     if not run_item:
         raise HTTPException(
@@ -419,36 +627,48 @@ def update_run_item(
     run_item.completed = item_data.completed
     run_item.notes = item_data.notes
     
-    db.commit()
-    db.refresh(run_item)
+    await db.commit()
+    await db.refresh(run_item)
     
     return {"success": True}
 
-# Get all runs for a specific checklist
-@router.get("/{checklist_id}/runs", response_model=List[ChecklistRunResponse])
-def get_checklist_runs(
+# Get the runs of a specific checklist, newest first, a page at a time
+@router.get("/{checklist_id}/runs", response_model=ChecklistRunListResponse)
+async def get_checklist_runs(
     checklist_id: int,
-    db: Session = Depends(get_db),
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     # Verify checklist exists and belongs to user
-    checklist = db.query(Checklist).filter(Checklist.id == checklist_id, Checklist.user_id == current_user.id).first()
+    checklist = await db.scalar(select(Checklist).where(Checklist.id == checklist_id, Checklist.user_id == current_user.id))
     if not checklist:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Checklist not found"
         )
     
-    # Get all runs for this checklist
-    runs = db.query(ChecklistRun).filter(ChecklistRun.checklist_id == checklist_id).order_by(ChecklistRun.started_at.desc()).all()
+    # Get a page of runs for this checklist, loading all their items in one extra query
+    sort_key = (ChecklistRun.started_at, ChecklistRun.id)
+    try:
+        query = keyset_query(
+            select(ChecklistRun).options(
+                selectinload(ChecklistRun.run_items)
+            ).where(ChecklistRun.checklist_id == checklist_id),
+            sort_key, limit, cursor, skip, descending=True
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    runs, next_cursor = keyset_page((await db.scalars(query)).all(), sort_key, limit)
     
     # Prepare response
     response = []
     for run in runs:
-        # Get run items
-        run_items = db.query(ChecklistRunItem).filter(ChecklistRunItem.run_id == run.id).all()
-        
-        # Add to response
         response.append(ChecklistRunResponse(
             id=run.id,
             checklist_id=run.checklist_id,
@@ -462,24 +682,26 @@ def get_checklist_runs(
                 "item_id": run_item.item_id,
                 "completed": run_item.completed,
                 "notes": run_item.notes
-            } for run_item in run_items]
+            } for run_item in run.run_items]
         ))
     
-    return response
+    return {"results": response, "next_cursor": next_cursor}
 
 # Complete a checklist run
 @router.post("/runs/{run_id}/complete", response_model=ChecklistRunResponse)
-def complete_checklist_run(
+async def complete_checklist_run(
     run_id: int,
     complete_data: CompleteChecklistRunRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     # Verify run exists and belongs to user
-    run = db.query(ChecklistRun).join(Checklist).filter(
-        ChecklistRun.id == run_id,
-        Checklist.user_id == current_user.id
-    ).first()
+    run = await db.scalar(
+        select(ChecklistRun).join(Checklist).where(
+            ChecklistRun.id == run_id,
+            Checklist.user_id == current_user.id
+        )
+    )
     
     if not run:
         raise HTTPException(
@@ -495,16 +717,22 @@ def complete_checklist_run(
         )
     
     # Get checklist
-    checklist = db.query(Checklist).filter(Checklist.id == run.checklist_id).first()
+    checklist = await db.scalar(select(Checklist).where(Checklist.id == run.checklist_id))
     
     # Get run items with associated checklist items
-    run_items = db.query(ChecklistRunItem).filter(ChecklistRunItem.run_id == run.id).all()
+    run_items = (await db.scalars(
+        select(ChecklistRunItem).options(
+            selectinload(ChecklistRunItem.item)
+        ).where(ChecklistRunItem.run_id == run.id).order_by(ChecklistRunItem.id)
+    )).all()
     
     # Check if required items are completed
-    required_items = db.query(ChecklistItem).filter(
-        ChecklistItem.checklist_id == run.checklist_id,
-        ChecklistItem.is_required == True
-    ).all()
+    required_items = (await db.scalars(
+        select(ChecklistItem).where(
+            ChecklistItem.checklist_id == run.checklist_id,
+            ChecklistItem.is_required == True
+        )
+    )).all()
     
     required_item_ids = {item.id for item in required_items}
     completed_required_item_ids = {
@@ -527,25 +755,25 @@ def complete_checklist_run(
     if complete_data.notes:
         run.notes = complete_data.notes
     
-    db.commit()
-    db.refresh(run)
-    
-    # Generate and send report if email is provided
+    # Queue the report in the outbox as part of the same transaction if email is provided
     if run.email_sent_to:
-        # Get items with their texts
-        items_with_text = []
-        for run_item in run_items:
-            item = db.query(ChecklistItem).filter(ChecklistItem.id == run_item.item_id).first()
-            if item:
-                run_item.item = item
-                items_with_text.append(run_item)
+        items_with_text = [run_item for run_item in run_items if run_item.item]
         
         # Generate HTML report
         html_content = generate_checklist_report_html(checklist, run, items_with_text)
         
-        # Send email
+        # Queue email - it is delivered in the background by the email worker
         subject = f"Checklist Completed: {checklist.title}"
-        send_checklist_report(run.email_sent_to, subject, html_content)
+        queue_checklist_report(db, run.email_sent_to, subject, html_content)
+    
+    await db.commit()
+    
+    # Let the email worker pick up the report right away
+    if run.email_sent_to:
+        notify_email_worker()
+    
+    # Completing the run leaves its items as loaded above
+    await db.refresh(run)
     
     # Prepare response
     response = ChecklistRunResponse(
@@ -565,41 +793,3 @@ def complete_checklist_run(
     )
     
     return response
-
-# Search checklists
-@router.get("/search", response_model=List[ChecklistResponse])
-def search(
-    q: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    # Search in Elasticsearch
-    search_results = search_checklists(current_user.id, q)
-    
-    # Extract checklist IDs
-    checklist_ids = [hit["_source"]["id"] for hit in search_results["hits"]["hits"]]
-    
-    # Get checklists from database
-    result = []
-    for checklist_id in checklist_ids:
-        checklist = db.query(Checklist).filter(Checklist.id == checklist_id).first()
-        if checklist:
-            items = db.query(ChecklistItem).filter(ChecklistItem.checklist_id == checklist.id).all()
-            result.append(
-                ChecklistResponse(
-                    id=checklist.id,
-                    user_id=checklist.user_id,
-                    title=checklist.title,
-                    category=checklist.category,
-                    created_at=checklist.created_at,
-                    items=[{
-                        "id": item.id,
-                        "checklist_id": item.checklist_id,
-                        "text": item.text,
-                        "is_required": item.is_required
-                    } for item in items]
-                )
-            )
-    
-    return result
- 
\ No newline at end of file
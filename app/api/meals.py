@@ -1,21 +1,28 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.database import get_db
+from app.db.replicas import get_read_db
 from app.models.user import User
 from app.models.meal import Meal
-from app.schemas.meal import MealCreate, MealResponse, MealUpdate, MealSearchQuery, MealSuggestionsResponse
+from app.schemas.meal import MealCreate, MealResponse, MealListResponse, MealUpdate, MealSearchQuery, MealSearchResponse, MealSuggestionsResponse
+from app.schemas.search import AutocompleteResponse
 from app.utils.auth import get_current_user
-from app.utils.elastic import index_meal, delete_document, MEAL_INDEX, search_meals, suggest_meal_plan
+from app.utils.elastic import index_meal, delete_document, MEAL_INDEX, search_meals_async, suggest_meal_plan_async
+from app.utils.search import hydrate_search_hits, get_hit_highlights
+from app.utils.pagination import InvalidCursorError, keyset_query, keyset_page
+from app.utils.recommendations import meal_recommender, meal_fact
+from app.utils.autocomplete import autocomplete_index
 
 router = APIRouter(prefix="/meals", tags=["Meal Planning"])
 
 # Create a new meal
 @router.post("/", response_model=MealResponse, status_code=status.HTTP_201_CREATED)
-def create_meal(
+async def create_meal(
     meal_data: MealCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     # Create meal
@@ -29,8 +36,15 @@ def create_meal(
     
     # Add to database
     db.add(db_meal)
-    db.commit()
-    db.refresh(db_meal)
+    await db.commit()
+    await db.refresh(db_meal)
+    
+    # Keep the cached meal history model and completions up to date
+    try:
+        meal_recommender.add_meal(current_user.id, db_meal)
+        autocomplete_index.update(current_user.id, "meals", new_text=db_meal.name)
+    except Exception as e:
+        print(f"Warning: Error occurred updating meal recommendations: {str(e)}")
     
     # Index in Elasticsearch - but don't block if it fails
     try:
@@ -44,33 +58,73 @@ def create_meal(
     
     return db_meal
 
-# Get all meals for the current user
-@router.get("/", response_model=List[MealResponse])
-def get_meals(
+# Get the meals of the current user, a page at a time
+@router.get("/", response_model=MealListResponse)
+async def get_meals(
     skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
-    # Get meals for the current user
-    meals = db.query(Meal).filter(
-        Meal.user_id == current_user.id
-    ).order_by(Meal.planned_date).offset(skip).limit(limit).all()
+    # Get meals for the current user in date order, after the cursor (or the first `skip` meals)
+    sort_key = (Meal.planned_date, Meal.id)
+    try:
+        query = keyset_query(select(Meal).where(Meal.user_id == current_user.id), sort_key, limit, cursor, skip)
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    meals, next_cursor = keyset_page((await db.scalars(query)).all(), sort_key, limit)
     
-    return meals
+    return {"results": meals, "next_cursor": next_cursor}
+
+# Get AI meal suggestions
+@router.get("/suggest", response_model=MealSuggestionsResponse)
+async def get_meal_suggestions(
+    by_weekday: bool = False,
+    by_meal_time: bool = False,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    # Favourite meals grouped by weekday and/or meal time, counted in Elasticsearch or the database
+    if by_weekday or by_meal_time:
+        suggestions = await suggest_meal_plan_async(current_user.id, db=db, by_weekday=by_weekday, by_meal_time=by_meal_time)
+        return {"suggestions": suggestions}
+    
+    # A plan for every meal slot of the next 7 days from the user's cached meal history (loaded from the database on a miss)
+    suggestions = await meal_recommender.suggest_async(db, current_user.id)
+    
+    return {"suggestions": suggestions}
+
+# Autocomplete meal names
+@router.get("/autocomplete", response_model=AutocompleteResponse)
+async def autocomplete_meals(
+    q: str,
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    # Complete from the user's in-memory prefix trie, loaded from the database on first use
+    completions = await autocomplete_index.complete_async(db, current_user.id, "meals", q, limit)
+    
+    return {"query": q, "completions": completions}
 
 # Get a specific meal
 @router.get("/{meal_id}", response_model=MealResponse)
-def get_meal(
+async def get_meal(
     meal_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     # Get meal
-    meal = db.query(Meal).filter(
-        Meal.id == meal_id,
-        Meal.user_id == current_user.id
-    ).first()
+    meal = await db.scalar(
+        select(Meal).where(
+            Meal.id == meal_id,
+            Meal.user_id == current_user.id
+        )
+    )
     
     if not meal:
         raise HTTPException(
@@ -82,17 +136,19 @@ def get_meal(
 
 # Update a meal
 @router.put("/{meal_id}", response_model=MealResponse)
-def update_meal(
+async def update_meal(
     meal_id: int,
     meal_data: MealUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     # Get meal
-    meal = db.query(Meal).filter(
-        Meal.id == meal_id,
-        Meal.user_id == current_user.id
-    ).first()
+    meal = await db.scalar(
+        select(Meal).where(
+            Meal.id == meal_id,
+            Meal.user_id == current_user.id
+        )
+    )
     
     if not meal:
         raise HTTPException(
@@ -101,13 +157,21 @@ def update_meal(
         )
     
     # Update meal
+    previous = meal_fact(meal)
     meal.name = meal_data.name
     meal.meal_time = meal_data.meal_time
     meal.planned_date = meal_data.planned_date
     meal.details = meal_data.details
     
-    db.commit()
-    db.refresh(meal)
+    await db.commit()
+    await db.refresh(meal)
+    
+    # Keep the cached meal history model and completions up to date
+    try:
+        meal_recommender.update_meal(current_user.id, previous, meal)
+        autocomplete_index.update(current_user.id, "meals", old_text=previous.name, new_text=meal.name)
+    except Exception as e:
+        print(f"Warning: Error occurred updating meal recommendations: {str(e)}")
     
     # Update in Elasticsearch - but don't block if it fails
     try:
@@ -123,16 +187,18 @@ def update_meal(
 
 # Delete a meal
 @router.delete("/{meal_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_meal(
+async def delete_meal(
     meal_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     # Get meal
-    meal = db.query(Meal).filter(
-        Meal.id == meal_id,
-        Meal.user_id == current_user.id
-    ).first()
+    meal = await db.scalar(
+        select(Meal).where(
+            Meal.id == meal_id,
+            Meal.user_id == current_user.id
+        )
+    )
     
     if not meal:
         raise HTTPException(
@@ -141,12 +207,20 @@ def delete_meal(
         )
     
     # Delete from database
-    db.delete(meal)
-    db.commit()
+    previous = meal_fact(meal)
+    await db.delete(meal)
+    await db.commit()
+    
+    # Keep the cached meal history model and completions up to date
+    try:
+        meal_recommender.remove_meal(current_user.id, previous)
+        autocomplete_index.update(current_user.id, "meals", old_text=previous.name)
+    except Exception as e:
+        print(f"Warning: Error occurred updating meal recommendations: {str(e)}")
     
     # Delete from Elasticsearch - but don't block if it fails
     try:
-        delete_document(MEAL_INDEX, meal_id)
+        delete_document(MEAL_INDEX, meal_id, current_user.id)
     except Exception as e:
         # If deletion from Elasticsearch fails, just log the error
         print(f"Warning: Error occurred during meal deletion from Elasticsearch: {str(e)}")
@@ -154,33 +228,27 @@ def delete_meal(
     return None
 
 # Search meals
-@router.post("/search", response_model=List[MealResponse])
-def search_meal_plans(
+@router.post("/search", response_model=MealSearchResponse)
+async def search_meal_plans(
     search_query: MealSearchQuery,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     # Search in Elasticsearch
-    search_results = search_meals(current_user.id, search_query.query)
-    
-    # Extract meal IDs
-    meal_ids = [hit["_source"]["id"] for hit in search_results["hits"]["hits"]]
-    
-    # Get meals from database
-    meals = []
-    for meal_id in meal_ids:
-        meal = db.query(Meal).filter(Meal.id == meal_id).first()
-        if meal:
-            meals.append(meal)
-    
-    return meals
-
-# Get AI meal suggestions
-@router.get("/suggest", response_model=MealSuggestionsResponse)
-def get_meal_suggestions(
-    current_user: User = Depends(get_current_user)
-):
-    # Get meal suggestions from Elasticsearch
-    suggestions = suggest_meal_plan(current_user.id)
+    try:
+        search_results = await search_meals_async(
+            current_user.id, search_query.query, search_query.size, search_query.cursor, search_query.highlight
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     
-    return {"suggestions": suggestions} 
\ No newline at end of file
+    # Load the matching meals in one query, in relevance order
+    meals = await db.run_sync(hydrate_search_hits, Meal, current_user.id, search_results)
+    return {
+        "results": meals,
+        "next_cursor": search_results.get("next_cursor"),
+        "highlights": get_hit_highlights(search_results)
+    }
@@ -0,0 +1,45 @@
+import secrets
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+from app.core.config import METRICS_TOKEN
+from app.db.pool_metrics import async_pool_metrics, pool_metrics
+from app.db.replicas import replica_router
+from app.utils.elastic import bulk_indexer, es_breaker, elasticsearch_prober
+from app.utils.email import email_worker
+from app.utils.recommendations import meal_recommender
+from app.utils.autocomplete import autocomplete_index
+from app.utils.search_cache import search_cache
+
+router = APIRouter(prefix="/internal", tags=["Internal"])
+
+# Bearer token scheme, checked against METRICS_TOKEN rather than a user's JWT
+metrics_bearer = HTTPBearer(auto_error=False)
+
+# Function to reject metrics requests without the metrics token
+def verify_metrics_token(credentials: HTTPAuthorizationCredentials = Depends(metrics_bearer)):
+    if not METRICS_TOKEN or credentials is None or not secrets.compare_digest(credentials.credentials, METRICS_TOKEN):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+# Get runtime metrics of the connection pools, caches and background workers
+@router.get("/metrics", dependencies=[Depends(verify_metrics_token)])
+def get_metrics():
+    return {
+        "database_pool": pool_metrics.snapshot(),
+        "async_database_pool": async_pool_metrics.snapshot(),
+        "database_replicas": replica_router.snapshot(),
+        "search_cache": search_cache.snapshot(),
+        "elasticsearch": {
+            "circuit": es_breaker.snapshot(),
+            "prober": dict(elasticsearch_prober.stats),
+            "bulk_indexer": {"pending": bulk_indexer.pending_count(), **bulk_indexer.stats}
+        },
+        "meal_recommender": meal_recommender.stats(),
+        "autocomplete": autocomplete_index.snapshot(),
+        "email": email_worker.stats()
+    }
@@ -0,0 +1,180 @@
+"""
+Check that the hot queries are answered from an index instead of a full table scan.
+
+Each query below runs on every request of a list or checklist page, filtered by
+one user or parent row. It is EXPLAINed against DATABASE_URL with sequential
+scans priced out (PostgreSQL's enable_seqscan = off), so the plan is the one the
+planner picks once the tables are large, whatever they hold today. A query
+passes if its table is searched through an index on the filtered column; a
+table that is still scanned has no usable index and will be read end to end on
+every request as it grows.
+
+Run it after `alembic upgrade schema@head`; it exits with 1 if any query would scan a
+table. tests/test_query_plans.py runs the same checks with the test suite.
+
+Usage:
+    python -m app.db.check_indexes
+"""
+import argparse
+import logging
+import re
+import sys
+
+from sqlalchemy import func, select, text
+
+from app.db.database import engine
+from app.models import Checklist, ChecklistItem, ChecklistRun, ChecklistRunItem, CarpoolEvent, Meal
+from app.utils.pagination import encode_cursor, keyset_query
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Sort keys of the list endpoints, as passed to keyset_query by the API
+MEAL_SORT_KEY = (Meal.planned_date, Meal.id)
+CARPOOL_EVENT_SORT_KEY = (CarpoolEvent.drop_off_time, CarpoolEvent.id)
+CHECKLIST_SORT_KEY = (Checklist.id,)
+CHECKLIST_RUN_SORT_KEY = (ChecklistRun.started_at, ChecklistRun.id)
+
+# name: (query as the API runs it, table that must not be scanned, column its index must be searched on)
+# List pages are built by keyset_query like in the API, the later pages from a cursor, so the
+# sort key comparison (julianday() of timestamps on SQLite) is part of the checked plan
+HOT_QUERIES = {
+    "meal list": (
+        keyset_query(select(Meal).where(Meal.user_id == 1), MEAL_SORT_KEY, 100),
+        "meals", "user_id"
+    ),
+    "meal list, next page": (
+        keyset_query(select(Meal).where(Meal.user_id == 1), MEAL_SORT_KEY, 100, encode_cursor(["2026-01-05", 7])),
+        "meals", "user_id"
+    ),
+    "carpool event list": (
+        keyset_query(select(CarpoolEvent).where(CarpoolEvent.user_id == 1), CARPOOL_EVENT_SORT_KEY, 100),
+        "carpool_events", "user_id"
+    ),
+    "carpool event list, next page": (
+        keyset_query(
+            select(CarpoolEvent).where(CarpoolEvent.user_id == 1), CARPOOL_EVENT_SORT_KEY, 100,
+            encode_cursor(["2026-01-05T08:15:00+00:00", 7])
+        ),
+        "carpool_events", "user_id"
+    ),
+    "checklist list": (
+        keyset_query(select(Checklist).where(Checklist.user_id == 1), CHECKLIST_SORT_KEY, 100),
+        "checklists", "user_id"
+    ),
+    "checklist list, next page": (
+        keyset_query(select(Checklist).where(Checklist.user_id == 1), CHECKLIST_SORT_KEY, 100, encode_cursor([7])),
+        "checklists", "user_id"
+    ),
+    "checklist items": (
+        select(ChecklistItem).where(ChecklistItem.checklist_id.in_([1, 2, 3])).order_by(ChecklistItem.id),
+        "checklist_items", "checklist_id"
+    ),
+    "checklist run history": (
+        keyset_query(
+            select(ChecklistRun).where(ChecklistRun.checklist_id == 1), CHECKLIST_RUN_SORT_KEY, 100, descending=True
+        ),
+        "checklist_runs", "checklist_id"
+    ),
+    "checklist run history, next page": (
+        keyset_query(
+            select(ChecklistRun).where(ChecklistRun.checklist_id == 1), CHECKLIST_RUN_SORT_KEY, 100,
+            encode_cursor(["2026-01-05T08:15:00.123456+00:00", 7]), descending=True
+        ),
+        "checklist_runs", "checklist_id"
+    ),
+    "checklist run summaries": (
+        select(ChecklistRun.checklist_id, func.count(ChecklistRun.id), func.max(ChecklistRun.started_at))
+        .where(ChecklistRun.checklist_id.in_([1, 2, 3])).group_by(ChecklistRun.checklist_id),
+        "checklist_runs", "checklist_id"
+    ),
+    "run items": (
+        select(ChecklistRunItem).where(ChecklistRunItem.run_id == 1).order_by(ChecklistRunItem.id),
+        "checklist_run_items", "run_id"
+    ),
+    "run item update": (
+        select(ChecklistRunItem).where(ChecklistRunItem.run_id == 1, ChecklistRunItem.item_id == 2),
+        "checklist_run_items", "run_id"
+    )
+}
+
+# Function to render a query with its parameters inlined, as EXPLAIN can't take bound parameters everywhere
+def render_query(query, dialect):
+    return str(query.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+
+# Function to list how a PostgreSQL plan reads each table: (table, node type, index condition)
+def postgresql_table_reads(plan, relation=None):
+    # Bitmap index scans name only the index; their table is the one of the heap scan above them
+    relation = plan.get("Relation Name", relation)
+    reads = []
+    if "Scan" in plan["Node Type"]:
+        reads.append((relation, plan["Node Type"], plan.get("Index Cond", "")))
+    for child in plan.get("Plans", []):
+        reads.extend(postgresql_table_reads(child, relation))
+    return reads
+
+# Function to check one query's plan on PostgreSQL
+def explain_postgresql(connection, sql, table, column):
+    connection.execute(text("SET LOCAL enable_seqscan = off"))
+    plan = connection.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()[0]["Plan"]
+    reads = [read for read in postgresql_table_reads(plan) if read[0] == table]
+
+    searched = any(re.search(rf"\b{column}\b", condition) for _, _, condition in reads)
+    scanned = any(node_type == "Seq Scan" for _, node_type, _ in reads)
+    detail = "; ".join(f"{node_type} {condition}".strip() for _, node_type, condition in reads)
+    return searched and not scanned, detail
+
+# Function to check one query's plan on SQLite
+def explain_sqlite(connection, sql, table, column):
+    details = [row[-1] for row in connection.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+    reads = [detail for detail in details if re.match(rf"(SEARCH|SCAN) {table}\b", detail)]
+
+    # e.g. "SEARCH meals USING INDEX ix_meals_user_id_planned_date (user_id=?)"
+    searched = any(detail.startswith("SEARCH") and re.search(rf"[( ]{column}[=<>]", detail) for detail in reads)
+    scanned = any(detail.startswith("SCAN") for detail in reads)
+    return searched and not scanned, "; ".join(reads)
+
+EXPLAINERS = {"postgresql": explain_postgresql, "sqlite": explain_sqlite}
+
+# Function to check one query's plan against the database
+def check_index(bind, query, table, column):
+    """
+    Returns:
+        tuple: (whether the table is searched through an index on the column, how the plan reads the table)
+    """
+    explain = EXPLAINERS.get(bind.dialect.name)
+    if explain is None:
+        raise ValueError(f"Checking query plans is not supported on {bind.dialect.name}")
+
+    # Each query in its own transaction, which also scopes SET LOCAL
+    with bind.connect() as connection:
+        result = explain(connection, render_query(query, bind.dialect), table, column)
+        connection.rollback()
+    return result
+
+# Function to check every hot query against the database
+def check_indexes(bind=engine):
+    """
+    Returns:
+        dict: {query name: (whether it uses an index, how the plan reads the table)}
+    """
+    return {name: check_index(bind, query, table, column) for name, (query, table, column) in HOT_QUERIES.items()}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check that the hot queries are answered from an index")
+    parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    exit_code = 0
+    for name, (indexed, detail) in check_indexes().items():
+        if indexed:
+            logger.info(f"{name}: {detail}")
+        else:
+            logger.error(f"{name} would scan the whole table: {detail}")
+            exit_code = 1
+
+    return exit_code
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,22 +1,70 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
-from app.core.config import DATABASE_URL
+from app.core.config import (
+    DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING
+)
+from app.db.pool_metrics import (
+    InstrumentedAsyncAdaptedQueuePool, InstrumentedQueuePool, async_pool_metrics, pool_metrics
+)
 
-# Create SQLAlchemy engine
-engine = create_engine(DATABASE_URL)
+# asyncio drivers used by the async engine, by backend
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
 
-# Create session factory
+# Function to point a database URL at the asyncio driver of its backend
+def get_async_database_url(url):
+    url = make_url(url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None:
+        return url
+    return url.set(drivername=f"{url.get_backend_name()}+{driver}")
+
+# Pool settings shared by every server database engine
+POOL_OPTIONS = {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+    "pool_recycle": DB_POOL_RECYCLE,
+    "pool_pre_ping": DB_POOL_PRE_PING
+}
+
+# Function to create the async engine of a database, e.g. the primary or a read replica
+def create_async_database_engine(url, poolclass=AsyncAdaptedQueuePool):
+    if make_url(url).get_backend_name() == "sqlite":
+        # SQLite picks its own pool, e.g. one connection per thread for in-memory databases
+        return create_async_engine(get_async_database_url(url))
+    return create_async_engine(get_async_database_url(url), poolclass=poolclass, **POOL_OPTIONS)
+
+# Create SQLAlchemy engines: a sync one for the CLIs and worker threads, an async one for the API
+if make_url(DATABASE_URL).get_backend_name() == "sqlite":
+    engine = create_engine(DATABASE_URL)
+else:
+    engine = create_engine(DATABASE_URL, poolclass=InstrumentedQueuePool, **POOL_OPTIONS)
+async_engine = create_async_database_engine(DATABASE_URL, poolclass=InstrumentedAsyncAdaptedQueuePool)
+
+# Count checkouts, waits and timeouts for the metrics endpoint
+pool_metrics.attach(engine)
+async_pool_metrics.attach(async_engine.sync_engine)
+
+# Sync session class behind the API's AsyncSessions, so session events can target just them
+class RequestSession(Session):
+    pass
+
+# Create session factories
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Objects stay readable after commit, as lazy loads can't run outside of an await
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, sync_session_class=RequestSession, autoflush=False, expire_on_commit=False
+)
 
 # Create base class for models
 Base = declarative_base()
 
 # Database session dependency
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close() 
\ No newline at end of file
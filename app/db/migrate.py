@@ -0,0 +1,23 @@
+import logging
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Migration scripts, managed with Alembic (see alembic.ini for the command line)
+MIGRATIONS_PATH = Path(__file__).resolve().parent / "migrations"
+
+# Function to build the Alembic configuration used from within the application
+def get_alembic_config():
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS_PATH))
+    return config
+
+# Function to bring the database schema up to date, like `alembic upgrade schema@head`.
+# The opt-in search_vectors branch is left to a deploy step, as it rewrites whole tables
+def upgrade_database():
+    logger.info("Applying database migrations...")
+    command.upgrade(get_alembic_config(), "schema@head")
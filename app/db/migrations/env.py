@@ -0,0 +1,69 @@
+import time
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+
+from app.core.config import DATABASE_URL
+from app.db.database import Base
+import app.models  # noqa: F401 - registers every table on Base.metadata
+
+config = context.config
+
+# Only the alembic command line configures logging; the application has its own
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+# Arbitrary key of the PostgreSQL advisory lock that keeps workers starting together from migrating at once
+MIGRATION_LOCK_KEY = 7274019
+
+def include_object(object, name, type_, reflected, compare_to):
+    # The full-text search columns and their indexes are added by the opt-in 0003 on PostgreSQL only, so the models don't declare them
+    if type_ in ("column", "index") and reflected and compare_to is None and "search_vector" in name:
+        return False
+    return True
+
+def get_url():
+    return config.get_main_option("sqlalchemy.url") or DATABASE_URL
+
+def run_migrations_offline():
+    # `alembic upgrade schema@head --sql` prints the SQL instead of running it
+    context.configure(
+        url=get_url(), target_metadata=target_metadata, include_object=include_object,
+        literal_binds=True, render_as_batch=True
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online():
+    connectable = create_engine(get_url(), poolclass=NullPool)
+    with connectable.connect() as connection:
+        locked = connection.dialect.name == "postgresql"
+        if locked:
+            # Session level, so it outlives the migration transactions; the others wait, then find nothing to do.
+            # Polled rather than waited on: a waiting transaction would block CREATE INDEX CONCURRENTLY forever
+            while not connection.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY}).scalar():
+                connection.commit()
+                time.sleep(1)
+            connection.commit()
+
+        try:
+            # Batch mode lets later migrations alter SQLite tables, which only support a few ALTERs
+            context.configure(
+                connection=connection, target_metadata=target_metadata, include_object=include_object,
+                render_as_batch=True
+            )
+            with context.begin_transaction():
+                context.run_migrations()
+        finally:
+            if locked:
+                connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+                connection.commit()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
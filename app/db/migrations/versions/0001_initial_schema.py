@@ -0,0 +1,115 @@
+"""Initial schema
+
+The tables as they were created with Base.metadata.create_all() before migrations
+existed. Tables that are already there are left alone, so databases created that
+way are brought under migration by upgrading them like a new one.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# Revision identifiers, used by Alembic
+revision = "0001"
+down_revision = None
+branch_labels = ("schema",)
+depends_on = None
+
+def created_at_column():
+    return sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now())
+
+def create_table(existing_tables, name, *columns, indexes=()):
+    if name in existing_tables:
+        return
+    op.create_table(name, *columns)
+    op.create_index(f"ix_{name}_id", name, ["id"])
+    for column, unique in indexes:
+        op.create_index(f"ix_{name}_{column}", name, [column], unique=unique)
+
+def upgrade():
+    existing_tables = set(sa.inspect(op.get_bind()).get_table_names())
+
+    create_table(
+        existing_tables, "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("password_hash", sa.String(), nullable=False),
+        created_at_column(),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+        indexes=[("email", True)]
+    )
+    create_table(
+        existing_tables, "checklists",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("title", sa.String(255), nullable=False),
+        sa.Column("category", sa.String(50)),
+        created_at_column()
+    )
+    create_table(
+        existing_tables, "checklist_items",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("checklist_id", sa.Integer(), sa.ForeignKey("checklists.id"), nullable=False),
+        sa.Column("text", sa.Text(), nullable=False),
+        sa.Column("is_required", sa.Boolean())
+    )
+    create_table(
+        existing_tables, "checklist_runs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("checklist_id", sa.Integer(), sa.ForeignKey("checklists.id"), nullable=False),
+        sa.Column("started_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("completed_at", sa.DateTime(timezone=True)),
+        sa.Column("email_sent_to", sa.String(255)),
+        sa.Column("notes", sa.Text())
+    )
+    create_table(
+        existing_tables, "checklist_run_items",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("run_id", sa.Integer(), sa.ForeignKey("checklist_runs.id"), nullable=False),
+        sa.Column("item_id", sa.Integer(), sa.ForeignKey("checklist_items.id"), nullable=False),
+        sa.Column("completed", sa.Boolean()),
+        sa.Column("notes", sa.Text())
+    )
+    create_table(
+        existing_tables, "carpool_events",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("description", sa.String(255), nullable=False),
+        sa.Column("destination", sa.String(255), nullable=False),
+        sa.Column("drop_off_time", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("notes", sa.Text()),
+        created_at_column(),
+        sa.Column("updated_at", sa.DateTime(timezone=True))
+    )
+    create_table(
+        existing_tables, "meals",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("name", sa.String(255), nullable=False),
+        sa.Column("meal_time", sa.String(50)),
+        sa.Column("details", sa.Text()),
+        sa.Column("planned_date", sa.Date(), nullable=False),
+        created_at_column(),
+        sa.Column("updated_at", sa.DateTime(timezone=True))
+    )
+    create_table(
+        existing_tables, "email_outbox",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("recipient", sa.String(255), nullable=False),
+        sa.Column("subject", sa.String(255), nullable=False),
+        sa.Column("html_content", sa.Text(), nullable=False),
+        sa.Column("status", sa.String(20), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("next_attempt_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("last_error", sa.Text()),
+        created_at_column(),
+        sa.Column("sent_at", sa.DateTime(timezone=True)),
+        indexes=[("status", False), ("next_attempt_at", False)]
+    )
+
+def downgrade():
+    for name in ("email_outbox", "meals", "carpool_events", "checklist_run_items", "checklist_runs",
+                 "checklist_items", "checklists", "users"):
+        op.drop_table(name)
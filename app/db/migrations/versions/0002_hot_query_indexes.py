@@ -0,0 +1,62 @@
+"""Indexes for the hot queries
+
+Every list endpoint filters by the owner and sorts, and the checklist pages look
+up items, runs and run items by their parent. Without these indexes each of
+those queries scans the whole table.
+
+On PostgreSQL the indexes are built CONCURRENTLY, outside of a transaction, so
+the tables stay writable while they build. A build that fails (e.g. it was
+interrupted) leaves an invalid index behind, which is dropped and rebuilt on
+the next upgrade.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# Revision identifiers, used by Alembic
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+# (index name, table, columns, unique)
+INDEXES = [
+    ("ix_meals_user_id_planned_date", "meals", ["user_id", "planned_date"], False),
+    ("ix_carpool_events_user_id_drop_off_time", "carpool_events", ["user_id", "drop_off_time"], False),
+    ("ix_checklists_user_id", "checklists", ["user_id"], False),
+    ("ix_checklist_items_checklist_id", "checklist_items", ["checklist_id"], False),
+    ("ix_checklist_runs_checklist_id_started_at", "checklist_runs", ["checklist_id", "started_at"], False),
+    ("ix_checklist_run_items_run_id_item_id", "checklist_run_items", ["run_id", "item_id"], True)
+]
+
+def drop_invalid_index(name):
+    # Left behind by a CONCURRENTLY build that failed; IF NOT EXISTS would otherwise keep it
+    invalid = op.get_bind().execute(sa.text(
+        "SELECT 1 FROM pg_index JOIN pg_class ON pg_class.oid = pg_index.indexrelid "
+        "WHERE pg_class.relname = :name AND NOT pg_index.indisvalid"
+    ), {"name": name}).scalar()
+    if invalid:
+        op.execute(f"DROP INDEX CONCURRENTLY {name}")
+
+def upgrade():
+    # A run lists each item once; drop any duplicates (keeping the first) so the unique index can be built
+    op.execute(
+        "DELETE FROM checklist_run_items WHERE EXISTS (SELECT 1 FROM checklist_run_items AS earlier "
+        "WHERE earlier.run_id = checklist_run_items.run_id AND earlier.item_id = checklist_run_items.item_id "
+        "AND earlier.id < checklist_run_items.id)"
+    )
+
+    postgresql = op.get_bind().dialect.name == "postgresql"
+    with op.get_context().autocommit_block():
+        for name, table, columns, unique in INDEXES:
+            if postgresql:
+                drop_invalid_index(name)
+            op.create_index(name, table, columns, unique=unique, if_not_exists=True, postgresql_concurrently=True)
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns, unique in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
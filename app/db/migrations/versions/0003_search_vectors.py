@@ -0,0 +1,84 @@
+"""Full-text search columns
+
+Adds the generated `search_vector` tsvector column searched by PostgreSQL search
+(SEARCH_BACKEND=postgres, app/utils/pg_search.py) to the searchable tables, with
+a GIN index on each. PostgreSQL only; other databases have nothing to add.
+
+Adding a stored generated column rewrites its table under an ACCESS EXCLUSIVE
+lock, which blocks reads and writes of the table until it is done, and every
+later write of a row also updates its tsvector and GIN entries. So this is an
+opt-in branch of its own, which the application doesn't apply at startup: run
+`alembic upgrade search_vectors@head` as a deploy step when switching to
+SEARCH_BACKEND=postgres, and `alembic downgrade search_vectors@base` to remove
+it again. The indexes are built CONCURRENTLY, like in 0002.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# Revision identifiers, used by Alembic
+revision = "0003"
+down_revision = None
+branch_labels = ("search_vectors",)
+depends_on = "0002"
+
+# Text search configuration, the same as PG_SEARCH_CONFIG in app/utils/pg_search.py
+SEARCH_CONFIG = "english"
+
+# Generated tsvector column of each searchable table, weighted like the Elasticsearch multi_match fields
+SEARCH_VECTOR_COLUMNS = {
+    "meals": (
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(name, '')), 'A') || "
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(details, '')), 'B') || "
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(meal_time, '')), 'C')"
+    ),
+    "carpool_events": (
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(description, '')), 'A') || "
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(destination, '')), 'A') || "
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(notes, '')), 'B')"
+    ),
+    "checklists": (
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(category, '')), 'B')"
+    ),
+    "checklist_items": f"to_tsvector('{SEARCH_CONFIG}', coalesce(text, ''))",
+}
+
+def drop_invalid_index(name):
+    # Left behind by a CONCURRENTLY build that failed; IF NOT EXISTS would otherwise keep it
+    invalid = op.get_bind().execute(sa.text(
+        "SELECT 1 FROM pg_index JOIN pg_class ON pg_class.oid = pg_index.indexrelid "
+        "WHERE pg_class.relname = :name AND NOT pg_index.indisvalid"
+    ), {"name": name}).scalar()
+    if invalid:
+        op.execute(f"DROP INDEX CONCURRENTLY {name}")
+
+def upgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    # Databases where `python -m app.utils.pg_search` added them before migrations existed already have the columns
+    for table, expression in SEARCH_VECTOR_COLUMNS.items():
+        op.execute(
+            f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+            f"GENERATED ALWAYS AS ({expression}) STORED"
+        )
+
+    with op.get_context().autocommit_block():
+        for table in SEARCH_VECTOR_COLUMNS:
+            drop_invalid_index(f"ix_{table}_search_vector")
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_{table}_search_vector ON {table} USING GIN (search_vector)")
+
+def downgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    with op.get_context().autocommit_block():
+        for table in reversed(list(SEARCH_VECTOR_COLUMNS)):
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS ix_{table}_search_vector")
+
+    for table in reversed(list(SEARCH_VECTOR_COLUMNS)):
+        op.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector")
@@ -0,0 +1,121 @@
+import bisect
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Upper bounds (seconds) of the checkout wait histogram buckets
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+class PoolMetrics:
+    """
+    Connection pool counters and a histogram of how long checkouts waited for a connection.
+
+    Checkouts, connects and invalidations are counted through pool events. Waits
+    and timeouts are reported by InstrumentedQueuePool, as no event fires when a
+    checkout starts waiting. An async engine is attached through its sync_engine.
+    """
+
+    def __init__(self):
+        self.engine = None
+        self._wait_counts = [0] * (len(WAIT_BUCKETS) + 1)  # Last bucket is +Inf
+        self._wait_sum = 0.0
+        self._lock = threading.Lock()
+        self.stats = {
+            "checkouts": 0, "checkins": 0, "connects": 0, "overflow_connects": 0,
+            "invalidations": 0, "timeouts": 0, "peak_in_use": 0
+        }
+
+    def attach(self, engine):
+        self.engine = engine
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "invalidate", self._on_invalidate)
+
+    def _pool_counts(self):
+        pool = self.engine.pool
+        if not isinstance(pool, QueuePool):
+            return None
+        # overflow() counts up from -pool_size until the pool is full
+        return {"in_use": pool.checkedout(), "idle": pool.checkedin(), "overflow": max(pool.overflow(), 0)}
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        counts = self._pool_counts()
+        with self._lock:
+            self.stats["checkouts"] += 1
+            if counts is not None and counts["in_use"] > self.stats["peak_in_use"]:
+                self.stats["peak_in_use"] = counts["in_use"]
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.stats["checkins"] += 1
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        # Connections opened beyond pool_size are overflow, closed again when checked in
+        counts = self._pool_counts()
+        with self._lock:
+            self.stats["connects"] += 1
+            if counts is not None and counts["overflow"] > 0:
+                self.stats["overflow_connects"] += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        # e.g. pre-ping found the server had dropped the connection
+        with self._lock:
+            self.stats["invalidations"] += 1
+
+    def record_wait(self, seconds):
+        with self._lock:
+            self._wait_counts[bisect.bisect_left(WAIT_BUCKETS, seconds)] += 1
+            self._wait_sum += seconds
+
+    def record_timeout(self):
+        with self._lock:
+            self.stats["timeouts"] += 1
+
+    def snapshot(self):
+        pool = self.engine.pool if self.engine is not None else None
+        counts = self._pool_counts() if pool is not None else None
+
+        with self._lock:
+            # Cumulative buckets, Prometheus style: each count includes the faster buckets
+            buckets = {}
+            total = 0
+            for bound, count in zip(WAIT_BUCKETS + ("+Inf",), self._wait_counts):
+                total += count
+                buckets[str(bound)] = total
+            result = {
+                "pool": type(pool).__name__ if pool is not None else None,
+                "checkout_wait_seconds": {"buckets": buckets, "count": total, "sum": round(self._wait_sum, 6)},
+                **self.stats
+            }
+
+        if counts is not None:
+            result.update(counts, size=pool.size(), timeout=pool.timeout())
+        return result
+
+# Process-wide metrics of the application's sync and async engines
+pool_metrics = PoolMetrics()
+async_pool_metrics = PoolMetrics()
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that reports how long each checkout took, and checkouts that timed out, to `metrics`."""
+
+    metrics = pool_metrics
+
+    def connect(self):
+        # Includes opening overflow connections and the pre-ping, i.e. everything a request waits for
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.metrics.record_timeout()
+            raise
+        self.metrics.record_wait(time.perf_counter() - started)
+        return connection
+
+class InstrumentedAsyncAdaptedQueuePool(InstrumentedQueuePool, AsyncAdaptedQueuePool):
+    """The async engine's pool, instrumented like InstrumentedQueuePool."""
+
+    metrics = async_pool_metrics
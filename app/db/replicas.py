@@ -0,0 +1,281 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi import Depends
+from sqlalchemy import create_engine, event, exc, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import (
+    DATABASE_REPLICA_URLS, DB_REPLICA_MAX_LAG_SECONDS, DB_REPLICA_CHECK_SECONDS, DB_READ_YOUR_WRITES_SECONDS
+)
+from app.db.database import RequestSession, create_async_database_engine, get_db
+from app.models.user import User
+from app.utils.auth import get_current_user
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Queries returning how many seconds a replica is behind its primary, by backend
+LAG_QUERIES = {
+    # A replica that has replayed everything it received is caught up, however old its last transaction
+    "postgresql": """
+        SELECT CASE
+            WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+            ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+        END
+    """,
+    # Stand-in replicas, e.g. copies of a development database, never lag
+    "sqlite": "SELECT 0"
+}
+
+class Replica:
+    """A read replica: the async engine serving reads and a small sync engine for health checks."""
+
+    def __init__(self, url):
+        self.name = make_url(url).render_as_string(hide_password=True)
+        self.engine = create_async_database_engine(url)
+        self.sessionmaker = async_sessionmaker(self.engine, autoflush=False, expire_on_commit=False)
+        if make_url(url).get_backend_name() == "sqlite":
+            self.check_engine = create_engine(url)
+        else:
+            self.check_engine = create_engine(url, pool_size=1, max_overflow=0, pool_pre_ping=True)
+        self.lag_query = text(LAG_QUERIES.get(self.check_engine.dialect.name, "SELECT 0"))
+
+        # Unknown until the first check, so reads stay on the primary until then
+        self.healthy = False
+        self.lag_seconds = None
+        self.last_error = None
+        self.stats = {"reads": 0, "checks": 0, "failures": 0}
+
+    def measure_lag(self):
+        with self.check_engine.connect() as connection:
+            return float(connection.execute(self.lag_query).scalar() or 0)
+
+class ReplicaRouter:
+    """
+    Sends read-only sessions to read replicas, falling back to the primary.
+
+    A replica is used while its last health check succeeded and found it at most
+    `max_lag_seconds` behind; the usable replicas take turns. Checks run every
+    `check_interval` seconds in a background thread, and a replica whose
+    connection fails during a request is skipped until a check passes again.
+
+    After a user writes, their reads go to the primary for `sticky_seconds`, so
+    they see their own changes even while the replicas catch up. Writes are
+    tracked in this process only: with several workers, a read served by another
+    worker than the write can still go to a replica up to `max_lag_seconds` behind.
+    """
+
+    def __init__(self, urls, max_lag_seconds=DB_REPLICA_MAX_LAG_SECONDS, sticky_seconds=DB_READ_YOUR_WRITES_SECONDS,
+                 check_interval=DB_REPLICA_CHECK_SECONDS):
+        self.replicas = [Replica(url) for url in urls]
+        self.max_lag_seconds = max_lag_seconds
+        self.sticky_seconds = sticky_seconds
+        self.check_interval = check_interval
+
+        self._turn = 0
+        self._recent_writes = OrderedDict()  # user id -> time of their last write, oldest first
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+
+        self.stats = {"replica_reads": 0, "primary_reads": 0, "sticky_reads": 0, "fallback_reads": 0}
+
+    def record_write(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            self._recent_writes.pop(user_id, None)
+            self._recent_writes[user_id] = now
+            # Forget writes that no longer pin anyone to the primary
+            while self._recent_writes:
+                oldest_user, written_at = next(iter(self._recent_writes.items()))
+                if now - written_at < self.sticky_seconds:
+                    break
+                del self._recent_writes[oldest_user]
+
+    def _wrote_recently(self, user_id):
+        # Must hold the lock
+        written_at = self._recent_writes.get(user_id)
+        return written_at is not None and time.monotonic() - written_at < self.sticky_seconds
+
+    def _usable(self, replica):
+        # Must hold the lock
+        return replica.healthy and replica.lag_seconds is not None and replica.lag_seconds <= self.max_lag_seconds
+
+    def choose(self, user_id=None):
+        """
+        Pick the replica for a read.
+
+        Returns:
+            Replica: The replica to read from, or None to read from the primary
+        """
+        with self._lock:
+            if not self.replicas:
+                self.stats["primary_reads"] += 1
+                return None
+            if user_id is not None and self._wrote_recently(user_id):
+                self.stats["sticky_reads"] += 1
+                return None
+
+            usable = [replica for replica in self.replicas if self._usable(replica)]
+            if not usable:
+                self.stats["fallback_reads"] += 1
+                return None
+
+            replica = usable[self._turn % len(usable)]
+            self._turn += 1
+            replica.stats["reads"] += 1
+            self.stats["replica_reads"] += 1
+            return replica
+
+    def mark_failed(self, replica, error):
+        with self._lock:
+            was_healthy = replica.healthy
+            replica.healthy = False
+            replica.last_error = str(error)
+            replica.stats["failures"] += 1
+        if was_healthy:
+            logger.warning(f"Read replica {replica.name} failed, skipping it until it recovers: {str(error)}")
+
+    def check(self, replica):
+        """
+        Check a replica's health and lag once.
+
+        Returns:
+            bool: Whether the replica can take reads
+        """
+        replica.stats["checks"] += 1
+        try:
+            lag_seconds = replica.measure_lag()
+        except Exception as e:
+            self.mark_failed(replica, e)
+            return False
+
+        with self._lock:
+            recovered = not replica.healthy
+            replica.healthy = True
+            replica.lag_seconds = lag_seconds
+            replica.last_error = None
+            usable = self._usable(replica)
+        if recovered:
+            logger.info(f"Read replica {replica.name} is reachable ({lag_seconds:.1f}s behind)")
+        return usable
+
+    def check_all(self):
+        for replica in self.replicas:
+            self.check(replica)
+
+    def start(self):
+        if self._thread is not None or not self.replicas:
+            return
+
+        # Check once up front so reads can use the replicas straight away
+        self.check_all()
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="db-replica-checker", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=10):
+        if self._thread is not None:
+            self._stopping.set()
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stopping.wait(self.check_interval):
+            try:
+                self.check_all()
+            except Exception as e:
+                logger.error(f"Error checking read replicas: {str(e)}")
+
+    async def dispose(self):
+        for replica in self.replicas:
+            await replica.engine.dispose()
+            replica.check_engine.dispose()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                **self.stats,
+                "sticky_users": sum(1 for user_id in self._recent_writes if self._wrote_recently(user_id)),
+                "replicas": [{
+                    "name": replica.name,
+                    "healthy": replica.healthy,
+                    "usable": self._usable(replica),
+                    "lag_seconds": replica.lag_seconds,
+                    "last_error": replica.last_error,
+                    **replica.stats
+                } for replica in self.replicas]
+            }
+
+# Process-wide router for the configured replicas
+replica_router = ReplicaRouter(DATABASE_REPLICA_URLS)
+
+# Writes are noticed on the primary sessions of API requests, which get_current_user
+# tags with the user's id. The CLIs and workers use other sessions: any do_orm_execute
+# listener makes SQLAlchemy refuse yield_per() with eager loading, as reindexing uses
+@event.listens_for(RequestSession, "after_flush")
+def _note_flushed_write(session, flush_context):
+    session.info["wrote"] = True
+
+@event.listens_for(RequestSession, "do_orm_execute")
+def _note_bulk_write(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+@event.listens_for(RequestSession, "after_commit")
+def _record_committed_write(session):
+    if session.info.pop("wrote", False) and "user_id" in session.info:
+        replica_router.record_write(session.info["user_id"])
+
+@event.listens_for(RequestSession, "after_rollback")
+def _forget_rolled_back_write(session):
+    session.info.pop("wrote", None)
+
+# Function to start the background replica health checks
+def start_replica_checks():
+    replica_router.start()
+
+# Function to stop the background replica health checks
+def stop_replica_checks():
+    replica_router.stop()
+
+# Errors that mean a replica can't be reached, as opposed to a bad query
+REPLICA_ERRORS = (exc.OperationalError, exc.InterfaceError, OSError)
+
+# Read-only session dependency for list and search endpoints: a replica when one is
+# healthy and caught up and the user hasn't just written, otherwise the request's own
+# primary session, which loaded the user
+async def get_read_db(db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
+    replica = replica_router.choose(current_user.id)
+    if replica is not None:
+        # End the transaction that loaded the user, so its primary connection goes back to the
+        # pool while a replica serves the request. Commit, as a rollback would expire the user
+        await db.commit()
+
+    while replica is not None:
+        replica_db = replica.sessionmaker()
+        try:
+            # Connect up front, so an unreachable replica costs a retry instead of a failed request
+            await replica_db.connection()
+            break
+        except REPLICA_ERRORS as e:
+            await replica_db.close()
+            replica_router.mark_failed(replica, e)
+            replica = replica_router.choose(current_user.id)
+
+    if replica is None:
+        yield db
+        return
+
+    try:
+        yield replica_db
+    except REPLICA_ERRORS as e:
+        # The replica went away mid-request; later reads avoid it until a check passes
+        replica_router.mark_failed(replica, e)
+        raise
+    finally:
+        await replica_db.close()
@@ -2,5 +2,6 @@ from app.models.user import User
 from app.models.checklist import Checklist, ChecklistItem, ChecklistRun, ChecklistRunItem
 from app.models.carpool import CarpoolEvent
 from app.models.meal import Meal
+from app.models.email_outbox import EmailOutbox
 
 # Add all models here for easy imports 
\ No newline at end of file
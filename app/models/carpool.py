@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 
@@ -6,6 +6,9 @@ from app.db.database import Base
 
 class CarpoolEvent(Base):
     __tablename__ = "carpool_events"
+    __table_args__ = (
+        Index("ix_carpool_events_user_id_drop_off_time", "user_id", "drop_off_time"),  # Event list, in time order
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, Text, DateTime, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 
@@ -8,21 +8,21 @@ class Checklist(Base):
     __tablename__ = "checklists"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     title = Column(String(255), nullable=False)
     category = Column(String(50))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
     user = relationship("User", backref="checklists")
-    items = relationship("ChecklistItem", back_populates="checklist", cascade="all, delete-orphan")
+    items = relationship("ChecklistItem", back_populates="checklist", cascade="all, delete-orphan", order_by="ChecklistItem.id")
     runs = relationship("ChecklistRun", back_populates="checklist", cascade="all, delete-orphan")
 
 class ChecklistItem(Base):
     __tablename__ = "checklist_items"
 
     id = Column(Integer, primary_key=True, index=True)
-    checklist_id = Column(Integer, ForeignKey("checklists.id"), nullable=False)
+    checklist_id = Column(Integer, ForeignKey("checklists.id"), nullable=False, index=True)
     text = Column(Text, nullable=False)
     is_required = Column(Boolean, default=True)
     
@@ -32,6 +32,9 @@ class ChecklistItem(Base):
 
 class ChecklistRun(Base):
     __tablename__ = "checklist_runs"
+    __table_args__ = (
+        Index("ix_checklist_runs_checklist_id_started_at", "checklist_id", "started_at"),  # Run history, newest first
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     checklist_id = Column(Integer, ForeignKey("checklists.id"), nullable=False)
@@ -42,10 +45,13 @@ class ChecklistRun(Base):
     
     # Relationships
     checklist = relationship("Checklist", back_populates="runs")
-    run_items = relationship("ChecklistRunItem", back_populates="run", cascade="all, delete-orphan")
+    run_items = relationship("ChecklistRunItem", back_populates="run", cascade="all, delete-orphan", order_by="ChecklistRunItem.id")
 
 class ChecklistRunItem(Base):
     __tablename__ = "checklist_run_items"
+    __table_args__ = (
+        Index("ix_checklist_run_items_run_id_item_id", "run_id", "item_id", unique=True),  # Each item once per run
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     run_id = Column(Integer, ForeignKey("checklist_runs.id"), nullable=False)
@@ -1,10 +1,11 @@
 from app.schemas.user import UserBase, UserCreate, UserResponse, UserLogin, Token, TokenData
 from app.schemas.checklist import (
-    ChecklistBase, ChecklistCreate, ChecklistUpdate, ChecklistResponse,
-    ChecklistItemBase, ChecklistItemCreate, ChecklistItemUpdate, ChecklistItemResponse,
+    ChecklistBase, ChecklistCreate, ChecklistUpdate, ChecklistResponse, ChecklistOverviewResponse, ChecklistSearchResponse,
+    ChecklistItemBase, ChecklistItemCreate, ChecklistItemUpdate, ChecklistItemSync, ChecklistItemResponse,
     ChecklistRunBase, ChecklistRunCreate, ChecklistRunUpdate, ChecklistRunResponse,
     ChecklistRunItemBase, ChecklistRunItemCreate, ChecklistRunItemUpdate, ChecklistRunItemResponse,
     CompleteChecklistRunRequest
 )
-from app.schemas.carpool import CarpoolEventBase, CarpoolEventCreate, CarpoolEventUpdate, CarpoolEventResponse, CarpoolSearchQuery
-from app.schemas.meal import MealBase, MealCreate, MealUpdate, MealResponse, MealSuggestion, MealSuggestionsResponse, MealSearchQuery 
\ No newline at end of file
+from app.schemas.carpool import CarpoolEventBase, CarpoolEventCreate, CarpoolEventUpdate, CarpoolEventResponse, CarpoolSearchQuery, CarpoolSearchResponse
+from app.schemas.meal import MealBase, MealCreate, MealUpdate, MealResponse, MealSuggestion, MealSuggestionsResponse, MealSearchQuery, MealSearchResponse 
+from app.schemas.search import AutocompleteResponse, SearchPage
\ No newline at end of file
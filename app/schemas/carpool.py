@@ -1,7 +1,10 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from datetime import datetime
 
+from app.schemas.pagination import Page
+from app.schemas.search import SearchPage
+
 # Carpool Event Schemas
 class CarpoolEventBase(BaseModel):
     description: str
@@ -24,6 +27,16 @@ class CarpoolEventResponse(CarpoolEventBase):
     class Config:
         from_attributes = True
 
+# Carpool Event List Page Schema
+class CarpoolEventListResponse(Page):
+    results: List[CarpoolEventResponse]
+
 # Search Query Schema
 class CarpoolSearchQuery(BaseModel):
-    query: str 
\ No newline at end of file
+    query: str
+    size: int = Field(10, ge=1, le=100)
+    cursor: Optional[str] = None
+    highlight: bool = False
+
+class CarpoolSearchResponse(SearchPage):
+    results: List[CarpoolEventResponse]
@@ -2,6 +2,9 @@ from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
 
+from app.schemas.pagination import Page
+from app.schemas.search import SearchPage
+
 # Checklist Item Schemas
 class ChecklistItemBase(BaseModel):
     text: str
@@ -13,6 +16,10 @@ class ChecklistItemCreate(ChecklistItemBase):
 class ChecklistItemUpdate(ChecklistItemBase):
     pass
 
+# Item sent when updating a checklist - id is set for existing items and omitted for new ones
+class ChecklistItemSync(ChecklistItemBase):
+    id: Optional[int] = None
+
 class ChecklistItemResponse(ChecklistItemBase):
     id: int
     checklist_id: int
@@ -29,7 +36,7 @@ class ChecklistCreate(ChecklistBase):
     items: List[ChecklistItemCreate]
 
 class ChecklistUpdate(ChecklistBase):
-    items: List[ChecklistItemCreate]
+    items: List[ChecklistItemSync]
 
 class ChecklistResponse(ChecklistBase):
     id: int
@@ -40,6 +47,24 @@ class ChecklistResponse(ChecklistBase):
     class Config:
         from_attributes = True
 
+# Checklist Overview Schema - checklist with a summary of its runs
+class ChecklistOverviewResponse(ChecklistResponse):
+    total_runs: int = 0
+    last_run_at: Optional[datetime] = None
+    open_run_id: Optional[int] = None
+    completion_ratio: Optional[float] = None
+
+# Checklist List Page Schemas
+class ChecklistListResponse(Page):
+    results: List[ChecklistResponse]
+
+class ChecklistOverviewListResponse(Page):
+    results: List[ChecklistOverviewResponse]
+
+# Checklist Search Page Schema
+class ChecklistSearchResponse(SearchPage):
+    results: List[ChecklistResponse]
+
 # Checklist Run Item Schemas
 class ChecklistRunItemBase(BaseModel):
     item_id: int
@@ -83,6 +108,10 @@ class ChecklistRunResponse(ChecklistRunBase):
     class Config:
         from_attributes = True
 
+# Checklist Run List Page Schema
+class ChecklistRunListResponse(Page):
+    results: List[ChecklistRunResponse]
+
 # Complete Checklist Run Request
 class CompleteChecklistRunRequest(BaseModel):
     email_sent_to: Optional[str] = None
@@ -1,7 +1,10 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import date, datetime
 
+from app.schemas.pagination import Page
+from app.schemas.search import SearchPage
+
 # Meal Schemas
 class MealBase(BaseModel):
     name: str
@@ -24,14 +27,25 @@ class MealResponse(MealBase):
     class Config:
         from_attributes = True
 
+# Meal List Page Schema
+class MealListResponse(Page):
+    results: List[MealResponse]
+
 # Meal Suggestion Schemas
 class MealSuggestion(BaseModel):
     day: int
     meal: str
+    meal_time: Optional[str] = None
 
 class MealSuggestionsResponse(BaseModel):
     suggestions: List[MealSuggestion]
 
 # Search Query Schema
 class MealSearchQuery(BaseModel):
-    query: str 
\ No newline at end of file
+    query: str
+    size: int = Field(10, ge=1, le=100)
+    cursor: Optional[str] = None
+    highlight: bool = False
+
+class MealSearchResponse(SearchPage):
+    results: List[MealResponse]
@@ -0,0 +1,6 @@
+from pydantic import BaseModel
+from typing import Optional
+
+# Page Schema - shared by the paged list and search responses
+class Page(BaseModel):
+    next_cursor: Optional[str] = None  # Pass back as "cursor" to get the next page, None on the last page
@@ -0,0 +1,13 @@
+from pydantic import BaseModel
+from typing import Dict, List
+
+from app.schemas.pagination import Page
+
+# Autocomplete Schemas
+class AutocompleteResponse(BaseModel):
+    query: str
+    completions: List[str]
+
+# Search Page Schema - shared by the paged search responses
+class SearchPage(Page):
+    highlights: Dict[int, Dict[str, List[str]]] = {}  # Result id -> field -> snippets with <em> around matches
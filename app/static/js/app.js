@@ -195,6 +195,49 @@ function formatDate(date, includeTime = false) {
     return d.toLocaleDateString('en-US', options);
 }
 
+/**
+ * Suggest completions under a text input while the user types
+ * @param {string} inputId - The id of the input element
+ * @param {string} endpoint - The autocomplete endpoint, e.g. '/meals/autocomplete'
+ */
+function setupAutocomplete(inputId, endpoint) {
+    const input = document.getElementById(inputId);
+    if (!input) return;
+    
+    const datalist = document.createElement('datalist');
+    datalist.id = `${inputId}-completions`;
+    input.after(datalist);
+    input.setAttribute('list', datalist.id);
+    input.setAttribute('autocomplete', 'off');
+    
+    let timer = null;
+    input.addEventListener('input', function() {
+        clearTimeout(timer);
+        const query = input.value.trim();
+        if (!query) {
+            datalist.innerHTML = '';
+            return;
+        }
+        
+        timer = setTimeout(async () => {
+            try {
+                const response = await window.auth.apiRequest(`${endpoint}?q=${encodeURIComponent(query)}`);
+                const data = await response.json();
+                if (input.value.trim() !== query) return;  // A newer request is on its way
+                
+                datalist.innerHTML = '';
+                (data.completions || []).forEach(completion => {
+                    const option = document.createElement('option');
+                    option.value = completion;
+                    datalist.appendChild(option);
+                });
+            } catch (error) {
+                console.error('Error loading completions:', error);
+            }
+        }, 150);
+    });
+}
+
 /**
  * Initialize the Checklist page
  */
@@ -271,5 +314,6 @@ function setupThemeToggle() {
 // Export utilities for other scripts
 window.app = {
     showNotification,
-    formatDate
+    formatDate,
+    setupAutocomplete
 }; 
\ No newline at end of file
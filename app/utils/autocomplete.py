@@ -0,0 +1,305 @@
+import heapq
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select, func
+
+from app.core.config import AUTOCOMPLETE_CACHE_SIZE, AUTOCOMPLETE_MODEL_TTL_SECONDS
+from app.models.carpool import CarpoolEvent
+from app.models.checklist import Checklist
+from app.models.meal import Meal
+
+# Completions cached at each trie node; requests for more than this are computed on the fly
+CACHED_COMPLETIONS = 10
+
+# Column completed for each kind of autocomplete
+AUTOCOMPLETE_SOURCES = {
+    "meals": (Meal, Meal.name),
+    "destinations": (CarpoolEvent, CarpoolEvent.destination),
+    "checklists": (Checklist, Checklist.title),
+}
+
+# Function to get the key a completion is stored under, so "Tacos" and "tacos " are one completion
+def completion_key(text):
+    return " ".join((text or "").casefold().split())
+
+class TrieNode:
+    __slots__ = ("children", "labels", "top")
+
+    def __init__(self):
+        self.children = {}
+        self.labels = set()  # Keys of the completions whose text (or one of its words) ends here
+        self.top = None  # Cached best completions under this node, None when stale
+
+class PrefixTrie:
+    """
+    Prefix trie over a set of texts, ranked by how many records use each text.
+
+    Every word of a text is a way in, so "sal" completes "Taco salad" as well as
+    "Salmon". Each node caches its best completions. Adding a text updates the
+    cached lists on its paths in place, and only removing one of the cached texts
+    clears a list, so a lookup usually just walks the prefix.
+    """
+
+    def __init__(self):
+        self.root = TrieNode()
+        self.counts = {}  # completion key -> number of records using it
+        self.display = {}  # completion key -> text shown to the user (latest spelling)
+
+    def __len__(self):
+        return len(self.counts)
+
+    @staticmethod
+    def _entry_points(key):
+        # The whole text and every suffix starting at a later word
+        words = key.split(" ")
+        return [" ".join(words[i:]) for i in range(len(words))]
+
+    def _rank(self, key):
+        return (-self.counts[key], key)
+
+    def _path_nodes(self, path, create=False):
+        nodes = [self.root]
+        for character in path:
+            child = nodes[-1].children.get(character)
+            if child is None:
+                if not create:
+                    break
+                child = nodes[-1].children[character] = TrieNode()
+            nodes.append(child)
+        return nodes
+
+    def _promote(self, nodes, key):
+        # A completion was added or used more: it can only move up, so cached lists stay exact
+        rank = self._rank(key)
+        for node in nodes:
+            top = node.top
+            if top is None:
+                continue
+            if key in top:
+                top.remove(key)
+            elif len(top) == CACHED_COMPLETIONS and rank > self._rank(top[-1]):
+                continue
+            position = 0
+            while position < len(top) and self._rank(top[position]) < rank:
+                position += 1
+            top.insert(position, key)
+            del top[CACHED_COMPLETIONS:]
+
+    def _demote(self, nodes, key):
+        # A completion was used less or removed: lists holding it may now miss a better one
+        for node in nodes:
+            if node.top is not None and key in node.top:
+                node.top = None
+
+    def add(self, text, count=1):
+        key = completion_key(text)
+        if not key:
+            return
+        self.counts[key] = self.counts.get(key, 0) + count
+        self.display[key] = text.strip()
+        for path in self._entry_points(key):
+            nodes = self._path_nodes(path, create=True)
+            nodes[-1].labels.add(key)
+            self._promote(nodes, key)
+
+    def remove(self, text):
+        key = completion_key(text)
+        count = self.counts.get(key, 0)
+        if count == 0:
+            return
+        if count > 1:
+            self.counts[key] = count - 1
+            for path in self._entry_points(key):
+                self._demote(self._path_nodes(path), key)
+            return
+
+        for path in self._entry_points(key):
+            nodes = self._path_nodes(path)
+            self._demote(nodes, key)
+            if len(nodes) <= len(path):
+                continue
+            nodes[-1].labels.discard(key)
+            # Prune branches that no longer lead to any completion
+            for depth in range(len(path), 0, -1):
+                node = nodes[depth]
+                if node.labels or node.children:
+                    break
+                del nodes[depth - 1].children[path[depth - 1]]
+        del self.counts[key]
+        del self.display[key]
+
+    def _best(self, node, limit):
+        keys = set()
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            keys.update(current.labels)
+            stack.extend(current.children.values())
+        return heapq.nsmallest(limit, keys, key=self._rank)
+
+    def complete(self, prefix, limit=CACHED_COMPLETIONS):
+        """
+        Get the most used texts with a word starting with `prefix`.
+
+        Returns:
+            list: Display texts, most used first
+        """
+        node = self.root
+        for character in completion_key(prefix):
+            node = node.children.get(character)
+            if node is None:
+                return []
+
+        if limit > CACHED_COMPLETIONS:
+            keys = self._best(node, limit)
+        else:
+            if node.top is None:
+                node.top = self._best(node, CACHED_COMPLETIONS)
+            keys = node.top[:limit]
+        return [self.display[key] for key in keys]
+
+class AutocompleteIndex:
+    """
+    Per-user prefix tries for each kind of autocomplete, kept in an LRU cache.
+
+    A user's tries are loaded from the database on their first request and are
+    then updated by the create, update and delete handlers. Tries older than
+    AUTOCOMPLETE_MODEL_TTL_SECONDS are reloaded to pick up other processes' writes.
+    """
+
+    def __init__(self, max_users=AUTOCOMPLETE_CACHE_SIZE, ttl_seconds=AUTOCOMPLETE_MODEL_TTL_SECONDS):
+        self.max_users = max_users
+        self.ttl_seconds = ttl_seconds
+        self._tries = OrderedDict()  # (user_id, kind) -> (PrefixTrie, loaded_at, lock of the trie), least recently used first
+        self._loading = {}  # (user_id, kind) -> True once the texts changed during the load
+        self._lock = threading.Lock()  # Guards the cache itself; each trie is walked and changed under its own lock
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    # Function to build the query of the texts and their counts a user's trie is built from
+    @staticmethod
+    def texts_query(user_id, kind):
+        model, column = AUTOCOMPLETE_SOURCES[kind]
+        return select(column, func.count(model.id)).where(model.user_id == user_id, column.isnot(None)).group_by(column)
+
+    # Function to build a trie from (text, count) rows
+    @staticmethod
+    def build_trie(rows):
+        trie = PrefixTrie()
+        for text, count in rows:
+            trie.add(text, count)
+        return trie
+
+    # Function to build a user's trie from the database
+    @classmethod
+    def load_trie(cls, db, user_id, kind):
+        return cls.build_trie(db.execute(cls.texts_query(user_id, kind)))
+
+    def _cached_trie(self, key):
+        # A fresh cached trie with its lock, or None once the caller is registered as loading it
+        with self._lock:
+            entry = self._tries.get(key)
+            if entry is not None and time.monotonic() - entry[1] < self.ttl_seconds:
+                self._tries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry[0], entry[2]
+            self._tries.pop(key, None)
+            self.stats["misses"] += 1
+            self._loading[key] = False
+            return None
+
+    def _store_trie(self, key, trie):
+        lock = threading.Lock()
+        with self._lock:
+            # A text changed while loading may or may not be in the trie; use it once without caching
+            if not self._loading.pop(key, False):
+                self._tries[key] = (trie, time.monotonic(), lock)
+                while len(self._tries) > self.max_users:
+                    self._tries.popitem(last=False)
+                    self.stats["evictions"] += 1
+        return trie, lock
+
+    def _load_failed(self, key):
+        with self._lock:
+            self._loading.pop(key, None)
+
+    def get_trie(self, db, user_id, kind):
+        """
+        Returns:
+            tuple: (the user's PrefixTrie, the lock to hold while walking or changing it)
+        """
+        key = (user_id, kind)
+        cached = self._cached_trie(key)
+        if cached is not None:
+            return cached
+
+        try:
+            trie = self.load_trie(db, user_id, kind)
+        except Exception:
+            self._load_failed(key)
+            raise
+
+        return self._store_trie(key, trie)
+
+    @staticmethod
+    def _complete(trie, lock, prefix, limit):
+        # Only this trie's lock, so a slow walk doesn't hold up other users' lookups and writes
+        with lock:
+            return trie.complete(prefix, limit)
+
+    def complete(self, db, user_id, kind, prefix, limit=CACHED_COMPLETIONS):
+        trie, lock = self.get_trie(db, user_id, kind)
+        return self._complete(trie, lock, prefix, limit)
+
+    async def complete_async(self, db, user_id, kind, prefix, limit=CACHED_COMPLETIONS):
+        """
+        Like `complete`, for async routes (db is an AsyncSession).
+
+        The texts are awaited, and building and walking the trie run in the
+        threadpool so they don't hold up the event loop.
+        """
+        key = (user_id, kind)
+        cached = self._cached_trie(key)
+        if cached is None:
+            try:
+                rows = (await db.execute(self.texts_query(user_id, kind))).all()
+                trie = await run_in_threadpool(self.build_trie, rows)
+            except BaseException:
+                # Also when the request is cancelled, so later changes aren't tracked for a load that never finishes
+                self._load_failed(key)
+                raise
+            cached = self._store_trie(key, trie)
+
+        trie, lock = cached
+        return await run_in_threadpool(self._complete, trie, lock, prefix, limit)
+
+    # Apply a change to a cached trie; users without one will load it when they next need it
+    def update(self, user_id, kind, old_text=None, new_text=None):
+        key = (user_id, kind)
+        with self._lock:
+            entry = self._tries.get(key)
+            if entry is None:
+                if key in self._loading:
+                    self._loading[key] = True
+                return
+
+        trie, _, lock = entry
+        with lock:
+            if old_text is not None:
+                trie.remove(old_text)
+            if new_text is not None:
+                trie.add(new_text)
+
+    def snapshot(self):
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                "tries": len(self._tries),
+                "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else None,
+                **self.stats
+            }
+
+# Process-wide autocomplete index
+autocomplete_index = AutocompleteIndex()
@@ -0,0 +1,170 @@
+import logging
+import threading
+import time
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Circuit states
+CLOSED = "closed"  # Calls go through
+OPEN = "open"  # Calls fail fast until the reset timeout has passed
+HALF_OPEN = "half_open"  # One trial call is let through to test the service
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a service whose circuit is open."""
+
+class CircuitBreaker:
+    """
+    Stops calling a service after repeated failures, so requests fail fast instead of
+    each waiting for a timeout.
+
+    After `failure_threshold` consecutive failures the circuit opens. Once
+    `reset_seconds` have passed one trial call is allowed (half-open); it closes
+    the circuit on success and reopens it on failure. A health check can also
+    open the circuit with `trip()`, which keeps it open without trial calls
+    until `reset()` closes it. A circuit created open starts out tripped.
+    """
+
+    def __init__(self, name, failure_threshold=3, reset_seconds=30, is_failure=None, state=CLOSED):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.is_failure = is_failure or (lambda error: True)  # Errors that say nothing about the service's health don't count
+
+        self._state = state
+        self._failures = 0
+        self._opened_at = time.monotonic() if state == OPEN else None
+        self._held = state == OPEN  # Tripped: stay open until reset()
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+        self.stats = {"calls": 0, "failures": 0, "rejected": 0, "opened": 0, "closed": 0}
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._trial_allowed():
+                return HALF_OPEN
+            return self._state
+
+    def _trial_allowed(self):
+        # Must hold the lock
+        return (self._state == OPEN and not self._held
+                and time.monotonic() - self._opened_at >= self.reset_seconds)
+
+    def _set_state(self, state):
+        # Must hold the lock; returns the previous state when it changed
+        previous = self._state
+        if previous == state:
+            return None
+        self._state = state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+            self.stats["opened"] += 1
+        elif state == CLOSED:
+            self._failures = 0
+            self.stats["closed"] += 1
+        return previous
+
+    def _notify(self, previous, state):
+        if previous is None:
+            return
+        logger.warning(f"Circuit for {self.name} is now {state} (was {previous})")
+
+    def allow_request(self):
+        """
+        Check whether a call may be made now, reserving the half-open trial call.
+
+        Returns:
+            bool: False if the call should fail fast
+        """
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._trial_allowed() and not self._trial_running:
+                self._trial_running = True
+                return True
+            self.stats["rejected"] += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._trial_running = False
+            self._held = False
+            self._failures = 0
+            previous = self._set_state(CLOSED)
+        self._notify(previous, CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.stats["failures"] += 1
+            self._failures += 1
+            previous = None
+            if self._trial_running or self._failures >= self.failure_threshold:
+                previous = self._set_state(OPEN)
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+        self._notify(previous, OPEN)
+
+    def reset(self):
+        """Close the circuit, e.g. after a health check succeeded."""
+        self.record_success()
+
+    def trip(self):
+        """Open the circuit until `reset()`, e.g. while a health check fails."""
+        with self._lock:
+            self._held = True
+            self._trial_running = False
+            previous = self._set_state(OPEN)
+            self._opened_at = time.monotonic()
+        self._notify(previous, OPEN)
+
+    def call(self, function, *args, **kwargs):
+        """
+        Call `function` through the circuit.
+
+        Raises:
+            CircuitOpenError: If the circuit is open
+        """
+        if not self.allow_request():
+            raise CircuitOpenError(f"Circuit for {self.name} is open")
+
+        self.stats["calls"] += 1
+        try:
+            result = function(*args, **kwargs)
+        except Exception as e:
+            if self.is_failure(e):
+                self.record_failure()
+            else:
+                # The service answered, it just didn't like the request
+                self.record_success()
+            raise
+        self.record_success()
+        return result
+
+    async def call_async(self, function, *args, **kwargs):
+        """Await coroutine function `function` through the circuit, like `call`."""
+        if not self.allow_request():
+            raise CircuitOpenError(f"Circuit for {self.name} is open")
+
+        self.stats["calls"] += 1
+        try:
+            result = await function(*args, **kwargs)
+        except Exception as e:
+            if self.is_failure(e):
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        except BaseException:
+            # Cancelled: nothing was learned about the service, but a reserved trial must be freed
+            with self._lock:
+                self._trial_running = False
+            raise
+        self.record_success()
+        return result
+
+    def snapshot(self):
+        state = self.state
+        with self._lock:
+            return {"state": state, "consecutive_failures": self._failures, **self.stats}
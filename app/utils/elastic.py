@@ -1,220 +1,616 @@
-from elasticsearch import Elasticsearch
-from elasticsearch.exceptions import ConnectionError as ESConnectionError
+from elasticsearch import AsyncElasticsearch, Elasticsearch
+from elasticsearch.exceptions import ApiError, NotFoundError, TransportError
+import json
 import logging
-from app.core.config import ELASTICSEARCH_HOST, ELASTICSEARCH_API_KEY, ELASTICSEARCH_INDEX_PREFIX, ENABLE_ELASTICSEARCH
+import threading
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timezone
+from app.core.config import (
+    ELASTICSEARCH_HOST, ELASTICSEARCH_API_KEY, ELASTICSEARCH_INDEX_PREFIX, ENABLE_ELASTICSEARCH,
+    ES_BULK_MAX_ACTIONS, ES_BULK_FLUSH_SECONDS, ES_BULK_MAX_PENDING, ENABLE_LOCAL_SEARCH, SEARCH_BACKEND,
+    ES_REQUEST_TIMEOUT_SECONDS, ES_BULK_TIMEOUT_SECONDS, ES_BREAKER_FAILURE_THRESHOLD, ES_BREAKER_RESET_SECONDS,
+    ES_PROBE_SECONDS, ES_ASYNC_MAX_CONNECTIONS, SEARCH_RESULTS_FROM_SOURCE
+)
+from sqlalchemy import select, func, extract
+from app.db.database import engine
+from app.models.meal import Meal
+from app.utils.search import SearchBackend, empty_search_results, get_hit_ids
+from app.utils.search_cache import search_cache
+from app.utils.pagination import InvalidCursorError, encode_cursor, decode_cursor
+from app.utils.circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED, OPEN
+from app.utils.local_search import LocalSearchBackend
+from app.utils.pg_search import PostgresSearchBackend
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
-# Track if Elasticsearch is available
-elasticsearch_available = False
+# Track if the index aliases have been set up
+elasticsearch_indices_ready = False
 
-# Initialize Elasticsearch client if enabled
+# Initialize Elasticsearch client if enabled. Calls time out quickly and are not retried,
+# so a dead cluster costs a request at most ES_REQUEST_TIMEOUT_SECONDS.
 if ENABLE_ELASTICSEARCH:
     es_client = Elasticsearch(
         ELASTICSEARCH_HOST,
-        api_key=ELASTICSEARCH_API_KEY if ELASTICSEARCH_API_KEY else None
+        api_key=ELASTICSEARCH_API_KEY if ELASTICSEARCH_API_KEY else None,
+        request_timeout=ES_REQUEST_TIMEOUT_SECONDS,
+        max_retries=0,
+        retry_on_timeout=False
+    )
+    # Bulk requests, reindexing and index setup legitimately take longer
+    es_bulk_client = es_client.options(request_timeout=ES_BULK_TIMEOUT_SECONDS)
+    # Async routes search through this client, so a slow cluster doesn't hold a threadpool worker per request
+    async_es_client = AsyncElasticsearch(
+        ELASTICSEARCH_HOST,
+        api_key=ELASTICSEARCH_API_KEY if ELASTICSEARCH_API_KEY else None,
+        request_timeout=ES_REQUEST_TIMEOUT_SECONDS,
+        max_retries=0,
+        retry_on_timeout=False,
+        connections_per_node=ES_ASYNC_MAX_CONNECTIONS
     )
 else:
     es_client = None
+    es_bulk_client = None
+    async_es_client = None
     logger.info("Elasticsearch is disabled in configuration. Search functionality will be disabled.")
 
+# Function to tell outages (timeouts, refused connections, 5xx, 429) from errors about the request itself
+def is_elasticsearch_outage(error):
+    if isinstance(error, TransportError):
+        return True
+    return isinstance(error, ApiError) and (error.status_code >= 500 or error.status_code == 429)
+
+# Circuit breaker around every Elasticsearch call. It starts open and is closed once
+# the indices are set up, by setup_elasticsearch_indices or the health prober.
+es_breaker = CircuitBreaker(
+    "elasticsearch",
+    failure_threshold=ES_BREAKER_FAILURE_THRESHOLD,
+    reset_seconds=ES_BREAKER_RESET_SECONDS,
+    is_failure=is_elasticsearch_outage,
+    state=OPEN
+)
+
 # Index names
 CHECKLIST_INDEX = f"{ELASTICSEARCH_INDEX_PREFIX}-checklists"
 CARPOOL_INDEX = f"{ELASTICSEARCH_INDEX_PREFIX}-carpool"
 MEAL_INDEX = f"{ELASTICSEARCH_INDEX_PREFIX}-meals"
 
+# Mappings for each index alias. Bump "version" whenever a mapping changes and run
+# `python -m app.utils.reindex --rollover` to rebuild the index behind its aliases.
+# Every document also carries a "doc_hash" (see document_hash) used by the drift
+# reconciler; it is aggregated but never searched.
+DOC_HASH_MAPPING = {"type": "long", "index": False}
+
+INDEX_DEFINITIONS = {
+    CHECKLIST_INDEX: {
+        "version": 2,
+        "mappings": {
+            "properties": {
+                "id": {"type": "integer"},
+                "user_id": {"type": "integer"},
+                "title": {"type": "text"},
+                "category": {"type": "keyword"},
+                "items": {
+                    "type": "nested",
+                    "properties": {
+                        "id": {"type": "integer"},
+                        "text": {"type": "text"},
+                        "required": {"type": "boolean"}
+                    }
+                },
+                "created_at": {"type": "date"},
+                "doc_hash": DOC_HASH_MAPPING
+            }
+        }
+    },
+    CARPOOL_INDEX: {
+        "version": 1,
+        "mappings": {
+            "properties": {
+                "id": {"type": "integer"},
+                "user_id": {"type": "integer"},
+                "description": {"type": "text"},
+                "destination": {"type": "text"},
+                "drop_off_time": {"type": "date"},
+                "notes": {"type": "text"},
+                "created_at": {"type": "date"},
+                "doc_hash": DOC_HASH_MAPPING
+            }
+        }
+    },
+    MEAL_INDEX: {
+        "version": 2,
+        "mappings": {
+            "properties": {
+                "id": {"type": "integer"},
+                "user_id": {"type": "integer"},
+                "name": {"type": "text", "fields": {"keyword": {"type": "keyword", "ignore_above": 256}}},
+                "meal_time": {"type": "keyword"},
+                "details": {"type": "text"},
+                "planned_date": {"type": "date"},
+                "created_at": {"type": "date"},
+                "doc_hash": DOC_HASH_MAPPING
+            }
+        }
+    }
+}
+
+# Searches read through the index alias itself, writes go through its write alias
+def write_alias(alias):
+    return f"{alias}-write"
+
+# Function to get the physical indices behind an alias
+def get_alias_indices(alias):
+    try:
+        return list(es_bulk_client.indices.get_alias(name=alias).keys())
+    except NotFoundError:
+        return []
+
+# Function to get the mapping version a physical index was created with
+def get_index_version(index):
+    mapping = es_bulk_client.indices.get_mapping(index=index)
+    return mapping[index]["mappings"].get("_meta", {}).get("version", 0)
+
+# Function to create a new physical index for an alias with the current mapping version
+def create_versioned_index(alias, bulk_load=False):
+    definition = INDEX_DEFINITIONS[alias]
+    index = f"{alias}-v{definition['version']}-{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')}"
+    
+    # Skip refreshes and replicas while a new index is bulk loaded - finish_bulk_load restores them
+    settings = {"refresh_interval": "-1", "number_of_replicas": 0} if bulk_load else None
+    
+    es_bulk_client.indices.create(
+        index=index,
+        mappings={**definition["mappings"], "_meta": {"version": definition["version"]}},
+        settings=settings
+    )
+    return index
+
+# Function to make a bulk loaded index searchable with normal settings
+def finish_bulk_load(index):
+    es_bulk_client.indices.put_settings(index=index, settings={"refresh_interval": None, "number_of_replicas": None})
+    es_bulk_client.indices.refresh(index=index)
+
+# Function to atomically point an alias at a single index
+def switch_alias(alias, index, is_write_index=None):
+    actions = [{"remove": {"index": old_index, "alias": alias}} for old_index in get_alias_indices(alias) if old_index != index]
+    add = {"index": index, "alias": alias}
+    if is_write_index is not None:
+        add["is_write_index"] = is_write_index
+    actions.append({"add": add})
+    
+    es_bulk_client.indices.update_aliases(actions=actions)
+
+# Function to make sure an alias and its write alias point at a versioned index
+def ensure_index_alias(alias):
+    indices = get_alias_indices(alias)
+    if indices:
+        version = get_index_version(indices[0])
+        if version < INDEX_DEFINITIONS[alias]["version"]:
+            logger.warning(
+                f"{alias} uses mapping version {version} but version {INDEX_DEFINITIONS[alias]['version']} is defined. "
+                f"Run `python -m app.utils.reindex --rollover` to rebuild it without downtime."
+            )
+        if not get_alias_indices(write_alias(alias)):
+            switch_alias(write_alias(alias), indices[0], is_write_index=True)
+        return
+    
+    new_index = create_versioned_index(alias)
+    actions = [
+        {"add": {"index": new_index, "alias": alias}},
+        {"add": {"index": new_index, "alias": write_alias(alias), "is_write_index": True}}
+    ]
+    
+    if es_bulk_client.indices.exists(index=alias):
+        # Concrete index from before versioning: copy it server-side, then replace it with the aliases in one step
+        es_bulk_client.reindex(source={"index": alias}, dest={"index": new_index}, wait_for_completion=True, refresh=True)
+        actions.insert(0, {"remove_index": {"index": alias}})
+        logger.info(f"Migrated {alias} index to {new_index}")
+    else:
+        logger.info(f"Created {new_index} index for {alias}")
+    
+    es_bulk_client.indices.update_aliases(actions=actions)
+
 # Function to create or update indices
 def setup_elasticsearch_indices():
-    global elasticsearch_available
+    """
+    Set up the index aliases and close the circuit breaker if Elasticsearch is reachable.
+    
+    Returns:
+        bool: Whether Elasticsearch can be used
+    """
+    global elasticsearch_indices_ready
     
     # Skip if Elasticsearch is disabled
     if not ENABLE_ELASTICSEARCH:
-        elasticsearch_available = False
         logger.info("Elasticsearch is disabled. Skipping index setup.")
-        return
+        return False
     
     try:
         # Check if Elasticsearch is available with timeout
-        if es_client.ping(request_timeout=5):
-            elasticsearch_available = True
+        if es_client.ping():
             logger.info("Successfully connected to Elasticsearch")
             
-            try:
-                # Checklist index
-                if not es_client.indices.exists(index=CHECKLIST_INDEX):
-                    es_client.indices.create(
-                        index=CHECKLIST_INDEX,
-                        body={
-                            "mappings": {
-                                "properties": {
-                                    "id": {"type": "integer"},
-                                    "user_id": {"type": "integer"},
-                                    "title": {"type": "text"},
-                                    "category": {"type": "keyword"},
-                                    "items": {
-                                        "type": "nested",
-                                        "properties": {
-                                            "text": {"type": "text"},
-                                            "required": {"type": "boolean"}
-                                        }
-                                    },
-                                    "created_at": {"type": "date"}
-                                }
-                            }
-                        }
-                    )
-                    logger.info(f"Created {CHECKLIST_INDEX} index")
-            except Exception as e:
-                logger.warning(f"Error creating {CHECKLIST_INDEX} index: {str(e)}")
+            for alias in INDEX_DEFINITIONS:
+                try:
+                    ensure_index_alias(alias)
+                except Exception as e:
+                    logger.warning(f"Error creating {alias} index: {str(e)}")
+            
+            elasticsearch_indices_ready = True
+            es_breaker.reset()
+            return True
+        
+        logger.warning("Elasticsearch is not available. Search will use the fallback backend until it recovers.")
+    except Exception as e:
+        logger.warning(f"Failed to connect to Elasticsearch: {str(e)}. Search will use the fallback backend until it recovers.")
+    
+    # Fail fast until the health prober sees the cluster again
+    es_breaker.trip()
+    return False
 
-            try:
-                # Carpool index
-                if not es_client.indices.exists(index=CARPOOL_INDEX):
-                    es_client.indices.create(
-                        index=CARPOOL_INDEX,
-                        body={
-                            "mappings": {
-                                "properties": {
-                                    "id": {"type": "integer"},
-                                    "user_id": {"type": "integer"},
-                                    "description": {"type": "text"},
-                                    "destination": {"type": "text"},
-                                    "drop_off_time": {"type": "date"},
-                                    "notes": {"type": "text"},
-                                    "created_at": {"type": "date"}
-                                }
-                            }
-                        }
-                    )
-                    logger.info(f"Created {CARPOOL_INDEX} index")
-            except Exception as e:
-                logger.warning(f"Error creating {CARPOOL_INDEX} index: {str(e)}")
+# Function to checksum the indexed fields of a document, so drift can be found without transferring documents
+def document_hash(document):
+    payload = json.dumps({key: value for key, value in document.items() if key != "doc_hash"}, sort_keys=True, separators=(",", ":"))
+    return zlib.crc32(payload.encode("utf-8"))
+
+# Function to stamp a document with its checksum
+def with_document_hash(document):
+    document["doc_hash"] = document_hash(document)
+    return document
+
+# Function to write a timestamp into a document in UTC. The API (asyncpg) and the command line tools
+# (psycopg2) can get the same timestamp back with different offsets, which would change the document hash
+def document_datetime(value):
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        # SQLite keeps timestamps without an offset, in UTC
+        return value.replace(tzinfo=timezone.utc).isoformat()
+    return value.astimezone(timezone.utc).isoformat()
+
+# Function to build the Elasticsearch document for a checklist
+def build_checklist_document(checklist, items):
+    return with_document_hash({
+        "id": checklist.id,
+        "user_id": checklist.user_id,
+        "title": checklist.title,
+        "category": checklist.category,
+        "items": [{"id": item.id, "text": item.text, "required": item.is_required} for item in items],
+        "created_at": document_datetime(checklist.created_at)
+    })
 
+# Function to build the Elasticsearch document for a carpool event
+def build_carpool_event_document(event):
+    return with_document_hash({
+        "id": event.id,
+        "user_id": event.user_id,
+        "description": event.description,
+        "destination": event.destination,
+        "drop_off_time": document_datetime(event.drop_off_time),
+        "notes": event.notes,
+        "created_at": document_datetime(event.created_at)
+    })
+
+# Function to build the Elasticsearch document for a meal
+def build_meal_document(meal):
+    return with_document_hash({
+        "id": meal.id,
+        "user_id": meal.user_id,
+        "name": meal.name,
+        "meal_time": meal.meal_time,
+        "details": meal.details,
+        "planned_date": meal.planned_date.isoformat() if meal.planned_date else None,
+        "created_at": document_datetime(meal.created_at)
+    })
+
+class BulkIndexer:
+    """
+    In-process queue of index and delete operations sent to Elasticsearch with the _bulk API.
+    
+    Operations are keyed by (index, id), so repeated writes to the same document
+    before a flush are coalesced into the latest one. A background thread flushes
+    the queue when it reaches `max_actions` or every `flush_seconds`. When the
+    thread is not running (e.g. in scripts) operations are flushed immediately.
+    
+    While the circuit breaker is open operations stay queued (up to `max_pending`)
+    and are sent once Elasticsearch is back.
+    """
+    
+    def __init__(self, client, max_actions=ES_BULK_MAX_ACTIONS, flush_seconds=ES_BULK_FLUSH_SECONDS, max_pending=ES_BULK_MAX_PENDING, breaker=None):
+        self.client = client
+        self.breaker = breaker
+        self.max_actions = max_actions
+        self.flush_seconds = flush_seconds
+        self.max_pending = max_pending
+        
+        self._pending = OrderedDict()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        
+        self.stats = {"queued": 0, "coalesced": 0, "flushed": 0, "failed": 0, "dropped": 0, "bulk_requests": 0}
+    
+    def start(self):
+        if self._thread is not None:
+            return
+        
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="es-bulk-indexer", daemon=True)
+        self._thread.start()
+    
+    def stop(self, timeout=10):
+        if self._thread is not None:
+            self._stopping.set()
+            self._wake.set()
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        
+        # Drain whatever is still queued before the process exits
+        self.flush()
+    
+    def enqueue(self, index, doc_id, document=None):
+        """
+        Queue an index operation, or a delete operation when `document` is None.
+        
+        Returns:
+            bool: False if the operation was dropped because the queue is full
+        """
+        key = (index, str(doc_id))
+        with self._lock:
+            if key in self._pending:
+                # Only the latest write to a document needs to reach Elasticsearch
+                self._pending.pop(key)
+                self.stats["coalesced"] += 1
+            elif len(self._pending) >= self.max_pending:
+                self.stats["dropped"] += 1
+                logger.error(f"Elasticsearch bulk queue is full, dropping operation for {index}/{doc_id}")
+                return False
+            
+            self._pending[key] = document
+            self.stats["queued"] += 1
+            pending_count = len(self._pending)
+        
+        if self._thread is None:
+            self.flush()
+        elif pending_count >= self.max_actions:
+            self._wake.set()
+        
+        return True
+    
+    def pending_count(self):
+        with self._lock:
+            return len(self._pending)
+    
+    # Ask the background thread to flush now
+    def wake(self):
+        if self._thread is None:
+            self.flush()
+        else:
+            self._wake.set()
+    
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            
             try:
-                # Meal index
-                if not es_client.indices.exists(index=MEAL_INDEX):
-                    es_client.indices.create(
-                        index=MEAL_INDEX,
-                        body={
-                            "mappings": {
-                                "properties": {
-                                    "id": {"type": "integer"},
-                                    "user_id": {"type": "integer"},
-                                    "name": {"type": "text"},
-                                    "meal_time": {"type": "keyword"},
-                                    "details": {"type": "text"},
-                                    "planned_date": {"type": "date"},
-                                    "created_at": {"type": "date"}
-                                }
-                            }
-                        }
-                    )
-                    logger.info(f"Created {MEAL_INDEX} index")
+                self.flush()
             except Exception as e:
-                logger.warning(f"Error creating {MEAL_INDEX} index: {str(e)}")
-        else:
-            elasticsearch_available = False
-            logger.warning("Elasticsearch is not available. Search functionality will be disabled.")
-    except (ESConnectionError, Exception) as e:
-        elasticsearch_available = False
-        logger.warning(f"Failed to connect to Elasticsearch: {str(e)}. Search functionality will be disabled.")
-
-# Function to index a checklist document
-def index_checklist(checklist, items):
-    if not elasticsearch_available:
-        return True  # Return success even if Elasticsearch is not available
+                logger.error(f"Error flushing Elasticsearch bulk queue: {str(e)}")
     
-    try:
-        checklist_doc = {
-            "id": checklist.id,
-            "user_id": checklist.user_id,
-            "title": checklist.title,
-            "category": checklist.category,
-            "items": [{"text": item.text, "required": item.is_required} for item in items],
-            "created_at": checklist.created_at.isoformat() if checklist.created_at else None
-        }
+    def _take_batch(self):
+        with self._lock:
+            batch = []
+            while self._pending and len(batch) < self.max_actions:
+                batch.append(self._pending.popitem(last=False))
+            return batch
+    
+    def _requeue(self, batch):
+        # Put failed operations back unless a newer write for the same document arrived meanwhile
+        with self._lock:
+            for key, document in reversed(batch):
+                if key not in self._pending:
+                    self._pending[key] = document
+                    self._pending.move_to_end(key, last=False)
+    
+    def flush(self):
+        """
+        Send all queued operations to Elasticsearch in batches of at most `max_actions`.
         
-        es_client.index(
-            index=CHECKLIST_INDEX,
-            id=checklist.id,
-            document=checklist_doc
-        )
-        return True  # Successful indexing
-    except Exception as e:
-        logger.error(f"Error indexing checklist: {str(e)}")
-        return False  # Failed indexing, but don't halt the application
+        Returns:
+            int: The number of operations sent
+        """
+        sent = 0
+        with self._flush_lock:
+            while True:
+                # Leave everything queued while Elasticsearch is known to be down
+                if self.breaker is not None and self.breaker.state == OPEN:
+                    return sent
+                
+                batch = self._take_batch()
+                if not batch:
+                    return sent
+                
+                operations = []
+                for (index, doc_id), document in batch:
+                    if document is None:
+                        operations.append({"delete": {"_index": index, "_id": doc_id}})
+                    else:
+                        operations.append({"index": {"_index": index, "_id": doc_id}})
+                        operations.append(document)
+                
+                try:
+                    if self.breaker is not None:
+                        response = self.breaker.call(self.client.bulk, operations=operations)
+                    else:
+                        response = self.client.bulk(operations=operations)
+                except CircuitOpenError:
+                    # Another call is testing whether Elasticsearch is back
+                    self._requeue(batch)
+                    return sent
+                except Exception as e:
+                    # Keep the operations for the next flush and stop hammering the cluster for now
+                    self._requeue(batch)
+                    logger.error(f"Error sending bulk request to Elasticsearch: {str(e)}")
+                    return sent
+                
+                self.stats["bulk_requests"] += 1
+                self.stats["flushed"] += len(batch)
+                sent += len(batch)
+                
+                # The client returns an ObjectApiResponse, fakes may return a plain dict
+                result_body = getattr(response, "body", response)
+                if result_body.get("errors"):
+                    for item in result_body.get("items", []):
+                        action, result = next(iter(item.items()))
+                        # A delete of a document that was never indexed is not an error
+                        if result.get("error") and not (action == "delete" and result.get("status") == 404):
+                            self.stats["failed"] += 1
+                            logger.error(f"Error in bulk {action} of {result.get('_index')}/{result.get('_id')}: {result.get('error')}")
 
-# Function to index a carpool event document
-def index_carpool_event(event):
-    if not elasticsearch_available:
-        return True  # Return success even if Elasticsearch is not available
+# Process-wide bulk indexer used by all index and delete functions
+bulk_indexer = BulkIndexer(es_bulk_client, breaker=es_breaker)
+
+# Function to start the background bulk indexer
+def start_bulk_indexer():
+    if ENABLE_ELASTICSEARCH:
+        bulk_indexer.start()
+
+# Function to stop the background bulk indexer, draining queued operations
+def stop_bulk_indexer():
+    if ENABLE_ELASTICSEARCH:
+        bulk_indexer.stop()
+
+class ElasticsearchProber:
+    """
+    Background health check that closes the circuit breaker when Elasticsearch recovers.
     
-    try:
-        event_doc = {
-            "id": event.id,
-            "user_id": event.user_id,
-            "description": event.description,
-            "destination": event.destination,
-            "drop_off_time": event.drop_off_time.isoformat() if event.drop_off_time else None,
-            "notes": event.notes,
-            "created_at": event.created_at.isoformat() if event.created_at else None
-        }
+    While the circuit is not closed the cluster is pinged every `interval` seconds.
+    Once it answers, indices that could not be set up at startup are created, and
+    the writes that piled up in the bulk indexer are sent. If writes were dropped
+    because the queue was full, the drift reconciler repairs the indices from the database.
+    """
+    
+    def __init__(self, interval=ES_PROBE_SECONDS):
+        self.interval = interval
+        self._stopping = threading.Event()
+        self._thread = None
+        self._dropped_seen = 0  # Dropped writes already repaired from the database
         
-        es_client.index(
-            index=CARPOOL_INDEX,
-            id=event.id,
-            document=event_doc
-        )
-        return True  # Successful indexing
-    except Exception as e:
-        logger.error(f"Error indexing carpool event: {str(e)}")
-        return False  # Failed indexing, but don't halt the application
-
-# Function to index a meal document
-def index_meal(meal):
-    if not elasticsearch_available:
-        return True  # Return success even if Elasticsearch is not available
+        self.stats = {"probes": 0, "recoveries": 0, "catch_up_repairs": 0}
     
-    try:
-        meal_doc = {
-            "id": meal.id,
-            "user_id": meal.user_id,
-            "name": meal.name,
-            "meal_time": meal.meal_time,
-            "details": meal.details,
-            "planned_date": meal.planned_date.isoformat() if meal.planned_date else None,
-            "created_at": meal.created_at.isoformat() if meal.created_at else None
-        }
+    def start(self):
+        if self._thread is not None:
+            return
         
-        es_client.index(
-            index=MEAL_INDEX,
-            id=meal.id,
-            document=meal_doc
-        )
-        return True  # Successful indexing
-    except Exception as e:
-        logger.error(f"Error indexing meal: {str(e)}")
-        return False  # Failed indexing, but don't halt the application
-
-# Function to delete a document from an index
-def delete_document(index, doc_id):
-    if not elasticsearch_available:
-        return True  # Return success even if Elasticsearch is not available
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="es-health-prober", daemon=True)
+        self._thread.start()
     
-    try:
-        es_client.delete(index=index, id=doc_id)
-        return True  # Successful deletion
-    except Exception as e:
-        logger.error(f"Error deleting document: {str(e)}")
-        return False  # Failed deletion, but don't halt the application
+    def stop(self, timeout=10):
+        if self._thread is not None:
+            self._stopping.set()
+            self._thread.join(timeout=timeout)
+            self._thread = None
+    
+    def _run(self):
+        while not self._stopping.wait(self.interval):
+            try:
+                self.probe()
+            except Exception as e:
+                logger.error(f"Error probing Elasticsearch: {str(e)}")
+    
+    def probe(self):
+        """
+        Check an unhealthy cluster once and catch up if it is back.
+        
+        Returns:
+            bool: Whether Elasticsearch is usable
+        """
+        if es_breaker.state != CLOSED:
+            self.stats["probes"] += 1
+            if not es_client.ping():
+                return False
+            
+            if not elasticsearch_indices_ready:
+                if not setup_elasticsearch_indices():
+                    return False
+            else:
+                es_breaker.reset()
+            
+            self.stats["recoveries"] += 1
+            logger.info("Elasticsearch is reachable again, sending queued writes")
+            bulk_indexer.wake()
+        
+        self.catch_up_dropped_writes()
+        return True
+    
+    def catch_up_dropped_writes(self):
+        # Writes dropped from a full queue can only be recovered from the database
+        dropped = bulk_indexer.stats["dropped"]
+        if dropped <= self._dropped_seen:
+            return
+        
+        from app.utils.reconcile import reconcile, REINDEX_SOURCES  # reconcile imports this module
+        
+        logger.warning(f"{dropped - self._dropped_seen} Elasticsearch writes were dropped, repairing the indices from the database")
+        for name in REINDEX_SOURCES:
+            stats = reconcile(name)
+            if stats["errors"]:
+                # Try again on the next probe
+                return
+        
+        self._dropped_seen = dropped
+        self.stats["catch_up_repairs"] += 1
 
-# Function to search checklists
-def search_checklists(user_id, query, size=10):
-    if not elasticsearch_available:
-        return {"hits": {"hits": []}}
+# Process-wide health prober
+elasticsearch_prober = ElasticsearchProber()
+
+# Function to start the background health prober
+def start_elasticsearch_prober():
+    if ENABLE_ELASTICSEARCH:
+        elasticsearch_prober.start()
+
+# Function to stop the background health prober
+def stop_elasticsearch_prober():
+    if ENABLE_ELASTICSEARCH:
+        elasticsearch_prober.stop()
+
+# Function to close the async client's connections on shutdown
+async def close_async_elasticsearch():
+    if async_es_client is not None:
+        await async_es_client.close()
+
+# Fields searched in each index, as used by the multi_match queries
+SEARCH_FIELDS = {
+    CHECKLIST_INDEX: ["title", "category", "items.text"],
+    CARPOOL_INDEX: ["description", "destination", "notes"],
+    MEAL_INDEX: ["name", "details", "meal_time"],
+}
+
+class ElasticsearchBackend(SearchBackend):
+    """Search backend that writes through the bulk indexer and searches the index aliases."""
     
-    try:
+    name = "elasticsearch"
+    
+    def available(self):
+        return elasticsearch_indices_ready and es_breaker.state != OPEN
+    
+    def writable(self):
+        # Writes are queued in the bulk indexer while the circuit is open
+        return es_client is not None
+    
+    def index_document(self, index, doc_id, document):
+        return bulk_indexer.enqueue(write_alias(index), doc_id, document)
+    
+    def delete_document(self, index, doc_id):
+        return bulk_indexer.enqueue(write_alias(index), doc_id)
+    
+    def search_body(self, user_id, query, fields, size=10, search_after=None, source=False, highlight=False):
         body = {
             "query": {
                 "bool": {
@@ -222,97 +618,382 @@ def search_checklists(user_id, query, size=10):
                         {"term": {"user_id": user_id}},
                         {"multi_match": {
                             "query": query,
-                            "fields": ["title", "category", "items.text"]
+                            "fields": fields
                         }}
                     ]
                 }
             },
-            "size": size
+            "size": size,
+            # The id breaks score ties, so search_after pages neither skip nor repeat hits
+            "sort": [{"_score": "desc"}, {"id": "asc"}],
+            "_source": {"excludes": ["doc_hash"]} if source else False
         }
-        
-        return es_client.search(index=CHECKLIST_INDEX, body=body)
-    except Exception as e:
-        logger.error(f"Error searching checklists: {str(e)}")
-        return {"hits": {"hits": []}}
+        if search_after is not None:
+            body["search_after"] = search_after
+        if highlight:
+            body["highlight"] = {"encoder": "html", "fields": {field: {} for field in fields}}
+        return body
+    
+    def search(self, index, user_id, query, fields, size=10, search_after=None, source=False, highlight=False):
+        body = self.search_body(user_id, query, fields, size, search_after, source, highlight)
+        return es_breaker.call(es_client.search, index=index, body=body)
+    
+    async def search_async(self, index, user_id, query, fields, size=10, search_after=None, source=False, highlight=False):
+        body = self.search_body(user_id, query, fields, size, search_after, source, highlight)
+        return await es_breaker.call_async(async_es_client.search, index=index, body=body)
 
-# Function to search carpool events
-def search_carpool_events(user_id, query, size=10):
-    if not elasticsearch_available:
-        return {"hits": {"hits": []}}
+# Search backends - SEARCH_BACKEND picks Elasticsearch or PostgreSQL, and the local index answers whenever neither can
+elasticsearch_backend = ElasticsearchBackend()
+postgres_search_backend = PostgresSearchBackend(engine, {
+    CHECKLIST_INDEX: "checklists",
+    CARPOOL_INDEX: "carpool_events",
+    MEAL_INDEX: "meals",
+})
+local_search_backend = LocalSearchBackend(SEARCH_FIELDS, enabled=ENABLE_LOCAL_SEARCH)
+
+# Function to get the search backends in the order they are tried
+def get_search_backends():
+    primary = postgres_search_backend if SEARCH_BACKEND == "postgres" else elasticsearch_backend
+    return [primary, local_search_backend]
+
+# Function to get the backends every write has to reach
+def get_write_backends():
+    return [backend for backend in (elasticsearch_backend, local_search_backend) if backend.writable()]
+
+# Function to get the backend that answers searches
+def get_search_backend():
+    for backend in get_search_backends():
+        if backend.available():
+            return backend
+    return None
+
+# Function to prepare the PostgreSQL search backend when it is configured
+def setup_postgres_search():
+    if SEARCH_BACKEND == "postgres":
+        postgres_search_backend.setup()
+
+# Function to write a document to every search backend
+def index_search_document(index, doc_id, document):
+    search_cache.invalidate(document["user_id"], index)
+    
+    success = True
+    for backend in get_write_backends():
+        try:
+            if not backend.index_document(index, doc_id, document):
+                success = False
+        except Exception as e:
+            logger.error(f"Error indexing document {doc_id} in {index} ({backend.name}): {str(e)}")
+            success = False  # Failed indexing, but don't halt the application
+    return success
+
+# Function to index a checklist document
+def index_checklist(checklist, items):
+    return index_search_document(CHECKLIST_INDEX, checklist.id, build_checklist_document(checklist, items))
+
+# Function to index a carpool event document
+def index_carpool_event(event):
+    return index_search_document(CARPOOL_INDEX, event.id, build_carpool_event_document(event))
+
+# Function to index a meal document
+def index_meal(meal):
+    return index_search_document(MEAL_INDEX, meal.id, build_meal_document(meal))
+
+# Function to delete a document from an index
+def delete_document(index, doc_id, user_id=None):
+    # Without the owner every user's cached results for the index have to go
+    if user_id is None:
+        search_cache.invalidate_index(index)
+    else:
+        search_cache.invalidate(user_id, index)
+    
+    success = True
+    for backend in get_write_backends():
+        try:
+            if not backend.delete_document(index, doc_id):
+                success = False
+        except Exception as e:
+            logger.error(f"Error deleting document {doc_id} from {index} ({backend.name}): {str(e)}")
+            success = False  # Failed deletion, but don't halt the application
+    return success
+
+# Function to build search results from cached ids, in the shape hydrate_search_hits expects
+def cached_search_results(ids, next_cursor=None):
+    return {"hits": {"total": {"value": len(ids)}, "hits": [{"_id": str(doc_id)} for doc_id in ids]}, "next_cursor": next_cursor}
+
+# Function to get the search_after values of a page cursor issued by a backend
+def get_search_after(cursor, backend):
+    values = decode_cursor(cursor)
+    # Sort values of one backend mean nothing to another, e.g. after a fallback to the local index
+    if (not isinstance(values, list) or len(values) != 3 or values[0] != backend.name
+            or not all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in values[1:])):
+        raise InvalidCursorError("The search cursor is no longer valid, start the search again")
+    return values[1:]
+
+# Function to get a page of search results from the cache, or None
+def get_cached_search_page(index, user_id, query, size, cursor, highlight):
+    # Highlights are not cached, the cache only holds ids
+    if highlight:
+        return None
+    cached = search_cache.get(user_id, index, query, size, cursor)
+    return cached_search_results(*cached) if cached is not None else None
+
+# Function to add the cursor of the next page to a backend's search results and cache them
+def finish_search_page(results, backend, index, user_id, query, size, cursor, highlight, generation):
+    # A full page may be followed by another one
+    hits = results["hits"]["hits"]
+    next_cursor = encode_cursor([backend.name, *hits[-1]["sort"]]) if hits and len(hits) == size else None
+    results = {**getattr(results, "body", results), "next_cursor": next_cursor}
+    
+    if not highlight:
+        search_cache.put(user_id, index, query, size, get_hit_ids(results), generation, cursor, next_cursor)
+    return results
+
+# Function to search one user's documents in an index
+def search_documents(index, user_id, query, size=10, cursor=None, source=SEARCH_RESULTS_FROM_SOURCE, highlight=False):
+    """
+    Search one page of a user's documents.
+    
+    Args:
+        size (int): Hits per page
+        cursor (str): The "next_cursor" of the previous page, None for the first page
+        source (bool): Return the indexed documents, only needed when results are served from the index
+        highlight (bool): Return highlight snippets of the matched fields
+    
+    Returns:
+        dict: Search results in the Elasticsearch response shape, plus the "next_cursor" of the
+            following page (None on the last page)
+    
+    Raises:
+        InvalidCursorError: The cursor is malformed or was issued by another backend
+    """
+    cached = get_cached_search_page(index, user_id, query, size, cursor, highlight)
+    if cached is not None:
+        return cached
     
+    backend = get_search_backend()
+    if backend is None:
+        return empty_search_results()
+    
+    generation = search_cache.generation(user_id, index)
+    search_after = get_search_after(cursor, backend) if cursor else None
     try:
-        body = {
-            "query": {
-                "bool": {
-                    "must": [
-                        {"term": {"user_id": user_id}},
-                        {"multi_match": {
-                            "query": query,
-                            "fields": ["description", "destination", "notes"]
-                        }}
-                    ]
-                }
-            },
-            "size": size
-        }
-        
-        return es_client.search(index=CARPOOL_INDEX, body=body)
+        results = backend.search(index, user_id, query, SEARCH_FIELDS[index], size, search_after, source, highlight)
     except Exception as e:
-        logger.error(f"Error searching carpool events: {str(e)}")
-        return {"hits": {"hits": []}}
+        logger.error(f"Error searching {index} ({backend.name}): {str(e)}")
+        
+        # Fall back to the local index if the primary backend failed
+        if backend is local_search_backend or not local_search_backend.available():
+            return empty_search_results()
+        backend = local_search_backend
+        search_after = get_search_after(cursor, backend) if cursor else None
+        results = backend.search(index, user_id, query, SEARCH_FIELDS[index], size, search_after, source, highlight)
+    
+    return finish_search_page(results, backend, index, user_id, query, size, cursor, highlight, generation)
 
-# Function to search meals
-def search_meals(user_id, query, size=10):
-    if not elasticsearch_available:
-        return {"hits": {"hits": []}}
+# Function to search one user's documents in an index without blocking the event loop
+async def search_documents_async(index, user_id, query, size=10, cursor=None, source=SEARCH_RESULTS_FROM_SOURCE, highlight=False):
+    """Same as search_documents, for async routes."""
+    cached = get_cached_search_page(index, user_id, query, size, cursor, highlight)
+    if cached is not None:
+        return cached
     
+    backend = get_search_backend()
+    if backend is None:
+        return empty_search_results()
+    
+    generation = search_cache.generation(user_id, index)
+    search_after = get_search_after(cursor, backend) if cursor else None
     try:
-        body = {
-            "query": {
-                "bool": {
-                    "must": [
-                        {"term": {"user_id": user_id}},
-                        {"multi_match": {
-                            "query": query,
-                            "fields": ["name", "details", "meal_time"]
-                        }}
-                    ]
-                }
-            },
-            "size": size
-        }
-        
-        return es_client.search(index=MEAL_INDEX, body=body)
+        results = await backend.search_async(index, user_id, query, SEARCH_FIELDS[index], size, search_after, source, highlight)
     except Exception as e:
-        logger.error(f"Error searching meals: {str(e)}")
-        return {"hits": {"hits": []}}
+        logger.error(f"Error searching {index} ({backend.name}): {str(e)}")
+        
+        # Fall back to the local index if the primary backend failed
+        if backend is local_search_backend or not local_search_backend.available():
+            return empty_search_results()
+        backend = local_search_backend
+        search_after = get_search_after(cursor, backend) if cursor else None
+        results = await backend.search_async(index, user_id, query, SEARCH_FIELDS[index], size, search_after, source, highlight)
+    
+    return finish_search_page(results, backend, index, user_id, query, size, cursor, highlight, generation)
+
+# Function to search checklists
+def search_checklists(user_id, query, size=10, cursor=None, highlight=False):
+    return search_documents(CHECKLIST_INDEX, user_id, query, size, cursor, highlight=highlight)
+
+# Function to search carpool events
+def search_carpool_events(user_id, query, size=10, cursor=None, highlight=False):
+    return search_documents(CARPOOL_INDEX, user_id, query, size, cursor, highlight=highlight)
+
+# Function to search meals
+def search_meals(user_id, query, size=10, cursor=None, highlight=False):
+    return search_documents(MEAL_INDEX, user_id, query, size, cursor, highlight=highlight)
+
+# Async versions of the search functions
+async def search_checklists_async(user_id, query, size=10, cursor=None, highlight=False):
+    return await search_documents_async(CHECKLIST_INDEX, user_id, query, size, cursor, highlight=highlight)
+
+async def search_carpool_events_async(user_id, query, size=10, cursor=None, highlight=False):
+    return await search_documents_async(CARPOOL_INDEX, user_id, query, size, cursor, highlight=highlight)
+
+async def search_meals_async(user_id, query, size=10, cursor=None, highlight=False):
+    return await search_documents_async(MEAL_INDEX, user_id, query, size, cursor, highlight=highlight)
+
+# Number of days in a suggested meal plan
+SUGGESTION_DAYS = 7
+
+# Script giving the ISO weekday (1 = Monday ... 7 = Sunday) of a meal's planned date
+WEEKDAY_SCRIPT = "doc['planned_date'].value.getDayOfWeekEnum().getValue()"
+
+# Function to build the terms aggregation request that counts a user's meals by name
+def build_meal_name_counts_body(user_id, by_weekday=False, by_meal_time=False):
+    aggs = {"names": {"terms": {"field": "name.keyword", "size": SUGGESTION_DAYS}}}
+    if by_weekday:
+        aggs = {"weekday": {"terms": {"script": {"source": WEEKDAY_SCRIPT, "lang": "painless"}, "size": 7}, "aggs": aggs}}
+    if by_meal_time:
+        aggs = {"meal_time": {"terms": {"field": "meal_time", "size": 10}, "aggs": aggs}}
+    
+    return {
+        "query": {
+            "term": {"user_id": user_id}
+        },
+        "size": 0,
+        "aggs": aggs
+    }
+
+# Function to walk the nested buckets of a meal name counts response down to the name terms
+def collect_meal_name_counts(aggregations):
+    groups = {}
+    def collect(aggregations, meal_time=None, weekday=None):
+        if "meal_time" in aggregations:
+            for bucket in aggregations["meal_time"]["buckets"]:
+                collect(bucket, bucket["key"], weekday)
+        elif "weekday" in aggregations:
+            for bucket in aggregations["weekday"]["buckets"]:
+                collect(bucket, meal_time, int(bucket["key"]))
+        else:
+            names = [bucket["key"] for bucket in aggregations["names"]["buckets"]]
+            if names:
+                groups[(meal_time, weekday)] = names
+    
+    collect(aggregations)
+    return groups
+
+# Function to get meal name counts from Elasticsearch with a terms aggregation
+def get_meal_name_counts_from_index(user_id, by_weekday=False, by_meal_time=False):
+    """
+    Count a user's meals by name inside Elasticsearch.
+    
+    Returns:
+        dict: {(meal_time, weekday): [name, ...]} with the most frequent names first,
+        where meal_time and weekday are None unless grouped by them
+    """
+    body = build_meal_name_counts_body(user_id, by_weekday, by_meal_time)
+    results = es_breaker.call(es_client.search, index=MEAL_INDEX, body=body)
+    return collect_meal_name_counts(results["aggregations"])
+
+# Function to get meal name counts from Elasticsearch without blocking the event loop
+async def get_meal_name_counts_from_index_async(user_id, by_weekday=False, by_meal_time=False):
+    body = build_meal_name_counts_body(user_id, by_weekday, by_meal_time)
+    results = await es_breaker.call_async(async_es_client.search, index=MEAL_INDEX, body=body)
+    return collect_meal_name_counts(results["aggregations"])
+
+# Function to get meal name counts from the database with GROUP BY
+def get_meal_name_counts_from_db(db, user_id, by_weekday=False, by_meal_time=False):
+    """
+    Count a user's meals by name in the database.
+    
+    Returns:
+        dict: Same shape as get_meal_name_counts_from_index
+    """
+    group_columns = []
+    if by_meal_time:
+        group_columns.append(Meal.meal_time.label("meal_time"))
+    if by_weekday:
+        # 0 = Sunday ... 6 = Saturday on both PostgreSQL and SQLite
+        group_columns.append(extract("dow", Meal.planned_date).label("weekday"))
+    
+    counts = select(
+        *group_columns,
+        Meal.name.label("name"),
+        func.count(Meal.id).label("meal_count")
+    ).where(Meal.user_id == user_id).group_by(*group_columns, Meal.name).subquery()
+    
+    # Keep only the top names of each group
+    partition = [counts.c[column.name] for column in group_columns]
+    ranked = select(
+        counts,
+        func.row_number().over(
+            partition_by=partition or None,
+            order_by=(counts.c.meal_count.desc(), counts.c.name)
+        ).label("position")
+    ).subquery()
+    
+    rows = db.execute(
+        select(ranked).where(ranked.c.position <= SUGGESTION_DAYS).order_by(ranked.c.position)
+    ).mappings().all()
+    
+    groups = {}
+    for row in rows:
+        weekday = None
+        if by_weekday:
+            weekday = int(row["weekday"]) or 7
+        groups.setdefault((row.get("meal_time"), weekday), []).append(row["name"])
+    return groups
+
+# Function to turn grouped meal names into a suggested plan
+def build_meal_suggestions(groups, by_weekday=False, by_meal_time=False):
+    meal_times = sorted({meal_time for meal_time, _ in groups}, key=lambda meal_time: meal_time or "")
+    
+    suggestions = []
+    for meal_time in meal_times:
+        if by_weekday:
+            # The favourite meal for each weekday
+            for day in range(1, 8):
+                names = groups.get((meal_time, day))
+                if names:
+                    suggestions.append({"day": day, "meal": names[0], "meal_time": meal_time})
+        else:
+            # The most frequent meals, one per day
+            for i, name in enumerate(groups.get((meal_time, None), [])[:SUGGESTION_DAYS]):
+                suggestions.append({"day": i + 1, "meal": name, "meal_time": meal_time})
+    
+    return suggestions
 
 # Function to suggest meals based on historical data
-def suggest_meal_plan(user_id):
-    if not elasticsearch_available:
-        return []
+def suggest_meal_plan(user_id, db=None, by_weekday=False, by_meal_time=False):
+    groups = None
     
-    try:
-        # Get historical meals
-        body = {
-            "query": {
-                "term": {"user_id": user_id}
-            },
-            "size": 1000
-        }
-        
-        results = es_client.search(index=MEAL_INDEX, body=body)
-        
-        # Process results to generate suggestions
-        # (In a real app, we would implement more sophisticated AI algorithms here)
-        meals = [hit["_source"]["name"] for hit in results["hits"]["hits"]]
-        
-        # Simple frequency-based suggestion
-        from collections import Counter
-        meal_counts = Counter(meals)
-        common_meals = meal_counts.most_common(7)  # Get top 7 meals
-        
-        return [{"day": i+1, "meal": meal[0]} for i, meal in enumerate(common_meals)] if common_meals else []
-    except Exception as e:
-        logger.error(f"Error suggesting meals: {str(e)}")
-        return [] 
\ No newline at end of file
+    # Count meals inside Elasticsearch so the response size doesn't grow with history
+    if elasticsearch_backend.available():
+        try:
+            groups = get_meal_name_counts_from_index(user_id, by_weekday, by_meal_time)
+        except Exception as e:
+            logger.error(f"Error suggesting meals: {str(e)}")
+    
+    # Use the database when Elasticsearch is off, failed, or has nothing (e.g. an index without name.keyword)
+    if not groups and db is not None:
+        try:
+            groups = get_meal_name_counts_from_db(db, user_id, by_weekday, by_meal_time)
+        except Exception as e:
+            logger.error(f"Error suggesting meals from the database: {str(e)}")
+    
+    return build_meal_suggestions(groups or {}, by_weekday, by_meal_time)
+
+# Function to suggest meals based on historical data, for async routes (db is an AsyncSession)
+async def suggest_meal_plan_async(user_id, db=None, by_weekday=False, by_meal_time=False):
+    groups = None
+    
+    if elasticsearch_backend.available():
+        try:
+            groups = await get_meal_name_counts_from_index_async(user_id, by_weekday, by_meal_time)
+        except Exception as e:
+            logger.error(f"Error suggesting meals: {str(e)}")
+    
+    if not groups and db is not None:
+        try:
+            groups = await db.run_sync(get_meal_name_counts_from_db, user_id, by_weekday, by_meal_time)
+        except Exception as e:
+            logger.error(f"Error suggesting meals from the database: {str(e)}")
+    
+    return build_meal_suggestions(groups or {}, by_weekday, by_meal_time)
@@ -1,8 +1,57 @@
-import os
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from jinja2 import Environment, FileSystemLoader, select_autoescape
 from sendgrid import SendGridAPIClient
 from sendgrid.helpers.mail import Mail, Content
+from sqlalchemy import or_, func
 
-from app.core.config import SENDGRID_API_KEY, EMAIL_SENDER, ENVIRONMENT
+from app.core.config import (
+    SENDGRID_API_KEY, SENDGRID_API_HOST, EMAIL_SENDER, ENVIRONMENT,
+    ENABLE_EMAIL_WORKER, EMAIL_WORKER_CONCURRENCY, EMAIL_WORKER_POLL_SECONDS,
+    EMAIL_MAX_ATTEMPTS, EMAIL_RETRY_BASE_SECONDS
+)
+from app.db.database import SessionLocal
+from app.models.email_outbox import EmailOutbox
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# How long a claimed outbox entry stays reserved before another worker may retry it
+EMAIL_CLAIM_LEASE_SECONDS = 300
+
+# Email templates are compiled once and escape all checklist text and notes. The escaping is most of
+# the rendering time (benchmarks/report_rendering.py); the code before them inserted that text as raw HTML
+email_templates = Environment(
+    loader=FileSystemLoader(str(Path(__file__).resolve().parent.parent / "templates")),
+    autoescape=select_autoescape(["html"]),
+    trim_blocks=True,
+    lstrip_blocks=True
+)
+checklist_report_template = email_templates.get_template("emails/checklist_report.html")
+
+# Shared SendGrid client, created on first use and reused for every email
+sendgrid_client = None
+sendgrid_client_lock = threading.Lock()
+
+def get_sendgrid_client():
+    """
+    Get the shared SendGrid client, creating it on first use.
+    
+    Returns:
+        SendGridAPIClient: The client used for all outgoing emails
+    """
+    global sendgrid_client
+    
+    if sendgrid_client is None:
+        with sendgrid_client_lock:
+            if sendgrid_client is None:
+                sendgrid_client = SendGridAPIClient(SENDGRID_API_KEY, host=SENDGRID_API_HOST)
+    
+    return sendgrid_client
 
 def send_checklist_report(recipient_email, subject, html_content):
     """
@@ -37,13 +86,304 @@ def send_checklist_report(recipient_email, subject, html_content):
     
     try:
         # Send the email
-        sg = SendGridAPIClient(SENDGRID_API_KEY)
-        response = sg.send(message)
+        response = get_sendgrid_client().send(message)
         return response.status_code >= 200 and response.status_code < 300
     except Exception as e:
-        print(f"Error sending email: {str(e)}")
+        logger.error(f"Error sending email: {str(e)}")
         return False
 
+def queue_checklist_report(db, recipient_email, subject, html_content):
+    """
+    Store a rendered checklist report in the email outbox.
+    
+    The entry is only added to the session, so it is committed together with
+    the caller's transaction and delivered later by the email worker.
+    
+    Args:
+        db: The database session of the current request
+        recipient_email (str): The email address of the recipient
+        subject (str): The email subject
+        html_content (str): The HTML content of the email
+    
+    Returns:
+        EmailOutbox: The pending outbox entry
+    """
+    entry = EmailOutbox(
+        recipient=recipient_email,
+        subject=subject,
+        html_content=html_content,
+        status="pending",
+        attempts=0
+    )
+    db.add(entry)
+    return entry
+
+class EmailDeliveryWorker:
+    """
+    Background worker that drains the email outbox.
+    
+    A dispatcher thread claims due entries and hands them to a bounded thread
+    pool. Failed deliveries are retried with exponential backoff until
+    EMAIL_MAX_ATTEMPTS is reached, after which the entry is marked as failed.
+    """
+    
+    def __init__(
+        self,
+        concurrency=EMAIL_WORKER_CONCURRENCY,
+        poll_seconds=EMAIL_WORKER_POLL_SECONDS,
+        max_attempts=EMAIL_MAX_ATTEMPTS,
+        retry_base_seconds=EMAIL_RETRY_BASE_SECONDS,
+        session_factory=SessionLocal,
+        send_func=send_checklist_report
+    ):
+        self.concurrency = max(1, concurrency)
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.session_factory = session_factory
+        self.send_func = send_func
+        
+        self._executor = None
+        self._dispatcher = None
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._slots = threading.Semaphore(self.concurrency)
+        self._stats_lock = threading.Lock()
+        self._in_flight = 0
+        self._sent = 0
+        self._retried = 0
+        self._failed = 0
+        self._latencies_ms = deque(maxlen=1000)
+    
+    def start(self):
+        if self._dispatcher is not None:
+            return
+        
+        self._stopping.clear()
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="email-worker")
+        self._dispatcher = threading.Thread(target=self._run, name="email-dispatcher", daemon=True)
+        self._dispatcher.start()
+        logger.info(f"Email worker started with {self.concurrency} delivery threads")
+    
+    def stop(self, timeout=10):
+        if self._dispatcher is None:
+            return
+        
+        self._stopping.set()
+        self._wake.set()
+        self._dispatcher.join(timeout=timeout)
+        self._executor.shutdown(wait=True)
+        self._dispatcher = None
+        self._executor = None
+        logger.info("Email worker stopped")
+    
+    def notify(self):
+        # Wake the dispatcher so new entries are picked up without waiting for the next poll
+        self._wake.set()
+    
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                claimed = self.drain_once(wait=False)
+            except Exception as e:
+                logger.error(f"Error draining email outbox: {str(e)}")
+                claimed = 0
+            
+            if not claimed:
+                self._wake.wait(self.poll_seconds)
+                self._wake.clear()
+    
+    def drain_once(self, wait=True):
+        """
+        Claim as many due entries as there are free delivery slots and deliver them.
+        
+        Args:
+            wait (bool): Block until the claimed entries have been delivered
+        
+        Returns:
+            int: The number of entries claimed
+        """
+        # Reserve free slots so no more than `concurrency` deliveries run at once
+        if not self._slots.acquire(timeout=self.poll_seconds):
+            return 0
+        
+        slots = 1
+        while slots < self.concurrency and self._slots.acquire(blocking=False):
+            slots += 1
+        
+        # Each delivery releases its own slot; the rest are released here, also when claiming fails
+        entries = []
+        delivering = 0
+        futures = []
+        try:
+            entries = self._claim(slots)
+            for entry in entries:
+                if self._executor is not None:
+                    futures.append(self._executor.submit(self._deliver, entry))
+                    delivering += 1
+                else:
+                    delivering += 1
+                    self._deliver(entry)
+        finally:
+            for _ in range(slots - delivering):
+                self._slots.release()
+            if delivering < len(entries):
+                # Never handed to a delivery; their claim lease runs out and another drain retries them
+                with self._stats_lock:
+                    self._in_flight -= len(entries) - delivering
+
+        if wait:
+            for future in futures:
+                future.result()
+        
+        return len(entries)
+    
+    def _claim(self, limit):
+        now = datetime.now(timezone.utc)
+        db = self.session_factory()
+        try:
+            # Due entries, plus entries whose claim lease expired (e.g. the process died mid-send)
+            rows = db.query(EmailOutbox).filter(
+                or_(
+                    EmailOutbox.status == "pending",
+                    EmailOutbox.status == "sending"
+                ),
+                EmailOutbox.next_attempt_at <= now
+            ).order_by(EmailOutbox.next_attempt_at, EmailOutbox.id).limit(limit).with_for_update(skip_locked=True).all()
+            
+            entries = []
+            for row in rows:
+                row.status = "sending"
+                row.attempts = (row.attempts or 0) + 1
+                row.next_attempt_at = now + timedelta(seconds=EMAIL_CLAIM_LEASE_SECONDS)
+                entries.append({
+                    "id": row.id,
+                    "recipient": row.recipient,
+                    "subject": row.subject,
+                    "html_content": row.html_content,
+                    "attempts": row.attempts,
+                    "created_at": row.created_at
+                })
+            
+            db.commit()
+            
+            with self._stats_lock:
+                self._in_flight += len(entries)
+            
+            return entries
+        finally:
+            db.close()
+    
+    def _deliver(self, entry):
+        try:
+            try:
+                sent = self.send_func(entry["recipient"], entry["subject"], entry["html_content"])
+                error = None if sent else "Email provider rejected the message"
+            except Exception as e:
+                sent = False
+                error = str(e)
+            
+            now = datetime.now(timezone.utc)
+            db = self.session_factory()
+            try:
+                row = db.query(EmailOutbox).filter(EmailOutbox.id == entry["id"]).first()
+                if row is None:
+                    return
+                
+                if sent:
+                    row.status = "sent"
+                    row.sent_at = now
+                    row.last_error = None
+                elif entry["attempts"] >= self.max_attempts:
+                    row.status = "failed"
+                    row.last_error = error
+                    logger.error(f"Giving up on email {entry['id']} to {entry['recipient']} after {entry['attempts']} attempts: {error}")
+                else:
+                    # Exponential backoff: base, 2x base, 4x base, ...
+                    delay = self.retry_base_seconds * (2 ** (entry["attempts"] - 1))
+                    row.status = "pending"
+                    row.next_attempt_at = now + timedelta(seconds=delay)
+                    row.last_error = error
+                    logger.warning(f"Email {entry['id']} failed (attempt {entry['attempts']}), retrying in {delay:g}s: {error}")
+                
+                db.commit()
+            finally:
+                db.close()
+            
+            with self._stats_lock:
+                if sent:
+                    self._sent += 1
+                    created_at = entry["created_at"]
+                    if created_at is not None:
+                        if created_at.tzinfo is None:
+                            created_at = created_at.replace(tzinfo=timezone.utc)
+                        self._latencies_ms.append((now - created_at).total_seconds() * 1000)
+                elif entry["attempts"] >= self.max_attempts:
+                    self._failed += 1
+                else:
+                    self._retried += 1
+        finally:
+            with self._stats_lock:
+                self._in_flight -= 1
+            self._slots.release()
+    
+    def stats(self):
+        """
+        Get outbox depth and delivery metrics.
+        
+        Returns:
+            dict: Outbox depth by status, in-flight count, counters and delivery latency in milliseconds
+        """
+        db = self.session_factory()
+        try:
+            depth = dict(
+                db.query(EmailOutbox.status, func.count(EmailOutbox.id)).filter(
+                    EmailOutbox.status.in_(["pending", "sending", "failed"])
+                ).group_by(EmailOutbox.status).all()
+            )
+        finally:
+            db.close()
+        
+        with self._stats_lock:
+            latencies = sorted(self._latencies_ms)
+            in_flight = self._in_flight
+            sent, retried, failed = self._sent, self._retried, self._failed
+        
+        def percentile(p):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 1)
+        
+        return {
+            "outbox_pending": depth.get("pending", 0),
+            "outbox_sending": depth.get("sending", 0),
+            "outbox_failed": depth.get("failed", 0),
+            "in_flight": in_flight,
+            "sent": sent,
+            "retried": retried,
+            "failed": failed,
+            "delivery_latency_ms": {
+                "p50": percentile(0.50),
+                "p95": percentile(0.95),
+                "max": round(latencies[-1], 1) if latencies else None
+            }
+        }
+
+# Process-wide email worker, started with the application
+email_worker = EmailDeliveryWorker()
+
+def start_email_worker():
+    if not ENABLE_EMAIL_WORKER:
+        logger.info("Email worker is disabled in configuration. Outbox entries will not be delivered by this process.")
+        return
+    email_worker.start()
+
+def stop_email_worker():
+    email_worker.stop()
+
+def notify_email_worker():
+    email_worker.notify()
+
 def generate_checklist_report_html(checklist, run, run_items):
     """
     Generate HTML content for a checklist report email.
@@ -57,54 +397,11 @@ def generate_checklist_report_html(checklist, run, run_items):
         str: HTML content for the email
     """
     completed_count = sum(1 for item in run_items if item.completed)
-    total_count = len(run_items)
-    
-    # Start with the header
-    html = f"""
-    <html>
-    <head>
-        <style>
-            body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-            .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-            h1 {{ color: #2c3e50; }}
-            .summary {{ background-color: #f8f9fa; padding: 15px; border-radius: 5px; margin-bottom: 20px; }}
-            .item {{ margin-bottom: 10px; }}
-            .completed {{ color: #28a745; }}
-            .not-completed {{ color: #dc3545; }}
-            .notes {{ font-style: italic; color: #6c757d; margin-left: 20px; }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <h1>{checklist.title}</h1>
-            <div class="summary">
-                <p><strong>Category:</strong> {checklist.category or 'Not specified'}</p>
-                <p><strong>Completion Date:</strong> {run.completed_at.strftime('%Y-%m-%d %H:%M') if run.completed_at else 'Not completed'}</p>
-                <p><strong>Completion Status:</strong> {completed_count}/{total_count} items completed</p>
-                {f'<p><strong>Notes:</strong> {run.notes}</p>' if run.notes else ''}
-            </div>
-            <h2>Checklist Items</h2>
-    """
-    
-    # Add each item
-    for run_item in run_items:
-        item = run_item.item
-        status_class = "completed" if run_item.completed else "not-completed"
-        status_text = "✓ Completed" if run_item.completed else "✗ Not Completed"
-        required_text = "Required" if item.is_required else "Optional"
-        
-        html += f"""
-            <div class="item">
-                <p><strong>{item.text}</strong> ({required_text}) - <span class="{status_class}">{status_text}</span></p>
-                {f'<p class="notes">Notes: {run_item.notes}</p>' if run_item.notes else ''}
-            </div>
-        """
-    
-    # Close the HTML
-    html += """
-        </div>
-    </body>
-    </html>
-    """
     
-    return html 
\ No newline at end of file
+    return checklist_report_template.render(
+        checklist=checklist,
+        run=run,
+        run_items=run_items,
+        completed_count=completed_count,
+        total_count=len(run_items)
+    )
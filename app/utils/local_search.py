@@ -0,0 +1,254 @@
+import heapq
+import html
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+
+from app.utils.search import SearchBackend, empty_search_results
+
+# BM25 parameters, same defaults as Elasticsearch
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+# Function to split text into lowercase terms
+def tokenize(text):
+    if not text:
+        return []
+    return TOKEN_PATTERN.findall(str(text).lower())
+
+# Function to get the text of a (possibly nested, e.g. "items.text") field of a document
+def get_field_text(document, field):
+    value = document
+    for part in field.split("."):
+        if isinstance(value, list):
+            return " ".join(str(entry.get(part) or "") for entry in value if isinstance(entry, dict))
+        if not isinstance(value, dict):
+            return ""
+        value = value.get(part)
+    return value if value is not None else ""
+
+# Function to wrap the query terms found in a text in <em> tags, escaping the rest like Elasticsearch's html encoder
+def highlight_text(text, terms):
+    parts = []
+    position = 0
+    found = False
+    for match in TOKEN_PATTERN.finditer(text):
+        if match.group().lower() not in terms:
+            continue
+        parts.append(html.escape(text[position:match.start()]))
+        parts.append(f"<em>{html.escape(match.group())}</em>")
+        position = match.end()
+        found = True
+    if not found:
+        return None
+    parts.append(html.escape(text[position:]))
+    return "".join(parts)
+
+class UserPostings:
+    """Inverted index of one user's documents in one index."""
+    
+    def __init__(self):
+        self.doc_count = 0
+        self.postings = defaultdict(lambda: defaultdict(dict))  # field -> term -> {doc_id: term frequency}
+        self.lengths = defaultdict(dict)  # field -> {doc_id: number of terms}
+        self.total_lengths = defaultdict(int)  # field -> sum of lengths
+
+class LocalSearchIndex:
+    """
+    In-process inverted index over the documents of one search index, partitioned by user.
+    
+    Every searchable field of a document is tokenized when it is indexed, so a
+    search only touches the postings of the query terms for the current user.
+    """
+    
+    def __init__(self, index):
+        self.index = index
+        self._documents = {}  # doc_id -> (user_id, document, {field: Counter of terms})
+        self._users = defaultdict(UserPostings)
+        self._lock = threading.RLock()
+    
+    def __len__(self):
+        return len(self._documents)
+    
+    def add(self, doc_id, document, fields):
+        field_terms = {field: Counter(tokenize(get_field_text(document, field))) for field in fields}
+        user_id = document.get("user_id")
+        
+        with self._lock:
+            self.remove(doc_id)
+            
+            user = self._users[user_id]
+            user.doc_count += 1
+            for field, terms in field_terms.items():
+                for term, frequency in terms.items():
+                    user.postings[field][term][doc_id] = frequency
+                length = sum(terms.values())
+                user.lengths[field][doc_id] = length
+                user.total_lengths[field] += length
+            
+            self._documents[doc_id] = (user_id, document, field_terms)
+    
+    def remove(self, doc_id):
+        with self._lock:
+            entry = self._documents.pop(doc_id, None)
+            if entry is None:
+                return False
+            
+            user_id, _, field_terms = entry
+            user = self._users[user_id]
+            user.doc_count -= 1
+            for field, terms in field_terms.items():
+                field_postings = user.postings[field]
+                for term in terms:
+                    postings = field_postings[term]
+                    postings.pop(doc_id, None)
+                    if not postings:
+                        del field_postings[term]
+                user.total_lengths[field] -= user.lengths[field].pop(doc_id, 0)
+            
+            if user.doc_count == 0:
+                del self._users[user_id]
+            return True
+    
+    def search(self, user_id, query, fields, size=10, search_after=None, source=True, highlight=False):
+        terms = tokenize(query)
+        
+        with self._lock:
+            user = self._users.get(user_id)
+            if user is None or not terms:
+                return empty_search_results()
+            
+            # Like a multi_match "best_fields" query: a document scores as its best matching field
+            scores = {}
+            for field in fields:
+                field_postings = user.postings.get(field)
+                if not field_postings:
+                    continue
+                
+                lengths = user.lengths[field]
+                average_length = (user.total_lengths[field] / user.doc_count) or 1
+                field_scores = defaultdict(float)
+                
+                for term in terms:
+                    postings = field_postings.get(term)
+                    if not postings:
+                        continue
+                    
+                    idf = math.log(1 + (user.doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for doc_id, frequency in postings.items():
+                        norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[doc_id] / average_length)
+                        field_scores[doc_id] += idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+                
+                for doc_id, score in field_scores.items():
+                    if score > scores.get(doc_id, 0.0):
+                        scores[doc_id] = score
+            
+            # Sorted by score, then id, so search_after can resume right after the last hit of a page
+            candidates = scores.items()
+            if search_after is not None:
+                after_score, after_id = search_after
+                candidates = [
+                    (doc_id, score) for doc_id, score in candidates
+                    if score < after_score or (score == after_score and doc_id > after_id)
+                ]
+            top = heapq.nlargest(size, candidates, key=lambda entry: (entry[1], -entry[0]))
+            
+            hits = []
+            term_set = set(terms)
+            for doc_id, score in top:
+                document = self._documents[doc_id][1]
+                hit = {"_index": self.index, "_id": str(doc_id), "_score": score, "sort": [score, doc_id]}
+                if source:
+                    hit["_source"] = document
+                if highlight:
+                    highlights = {}
+                    for field in fields:
+                        snippet = highlight_text(str(get_field_text(document, field)), term_set)
+                        if snippet is not None:
+                            highlights[field] = [snippet]
+                    hit["highlight"] = highlights
+                hits.append(hit)
+        
+        return {"hits": {"total": {"value": len(scores)}, "max_score": hits[0]["_score"] if hits else None, "hits": hits}}
+
+class LocalSearchBackend(SearchBackend):
+    """
+    Search backend that keeps every document in memory.
+    
+    It is updated from the same hooks that write to Elasticsearch and answers
+    searches whenever Elasticsearch is disabled or unreachable.
+    """
+    
+    name = "local"
+    
+    def __init__(self, index_fields, enabled=True):
+        self.index_fields = index_fields
+        self.enabled = enabled
+        self.indices = {index: LocalSearchIndex(index) for index in index_fields}
+        self._warming = False
+        self._deleted_while_warming = set()
+        self._lock = threading.Lock()
+    
+    def available(self):
+        return self.enabled
+    
+    def index_document(self, index, doc_id, document):
+        if not self.enabled:
+            return True
+        self.indices[index].add(int(doc_id), document, self.index_fields[index])
+        return True
+    
+    def delete_document(self, index, doc_id):
+        if not self.enabled:
+            return True
+        with self._lock:
+            if self._warming:
+                self._deleted_while_warming.add((index, int(doc_id)))
+        self.indices[index].remove(int(doc_id))
+        return True
+    
+    def search(self, index, user_id, query, fields, size=10, search_after=None, source=False, highlight=False):
+        if not self.enabled:
+            return empty_search_results()
+        return self.indices[index].search(user_id, query, fields, size, search_after, source, highlight)
+    
+    async def search_async(self, index, user_id, query, fields, size=10, search_after=None, source=False, highlight=False):
+        # Only reads memory, so it is cheaper to run on the event loop than to hand off to a thread
+        return self.search(index, user_id, query, fields, size, search_after, source, highlight)
+    
+    def warm(self, sources):
+        """
+        Load documents from the database without overwriting newer live writes.
+        
+        Args:
+            sources: Iterable of (index, doc_id, document) tuples
+        
+        Returns:
+            int: The number of documents loaded
+        """
+        if not self.enabled:
+            return 0
+        
+        with self._lock:
+            self._warming = True
+            self._deleted_while_warming.clear()
+        
+        loaded = 0
+        try:
+            for index, doc_id, document in sources:
+                local_index = self.indices[index]
+                with local_index._lock:
+                    # Skip documents a request wrote or deleted since warming started
+                    if doc_id in local_index._documents or (index, doc_id) in self._deleted_while_warming:
+                        continue
+                    local_index.add(doc_id, document, self.index_fields[index])
+                loaded += 1
+        finally:
+            with self._lock:
+                self._warming = False
+                self._deleted_while_warming.clear()
+        
+        return loaded
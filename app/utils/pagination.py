@@ -0,0 +1,110 @@
+import base64
+import json
+from datetime import date, datetime
+
+from sqlalchemy import DateTime, literal, tuple_
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+class InvalidCursorError(ValueError):
+    """Raised for a cursor that was tampered with or no longer fits the request."""
+
+# Function to turn the sort values of the last row of a page into an opaque cursor
+def encode_cursor(values):
+    payload = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+# Function to read the sort values back from a cursor
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError):
+        raise InvalidCursorError("Invalid cursor")
+
+# Function to turn a column value into JSON for a cursor
+def _cursor_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+# Function to read a cursor value back as the type of its column
+def _column_value(column, value):
+    python_type = column.type.python_type
+    if python_type in (date, datetime) and isinstance(value, str):
+        try:
+            return python_type.fromisoformat(value)
+        except ValueError:
+            raise InvalidCursorError("Invalid cursor")
+    if python_type is int and isinstance(value, int) and not isinstance(value, bool):
+        return value
+    raise InvalidCursorError("Invalid cursor")
+
+class keyset_value(FunctionElement):
+    """A sort key column or cursor value, as compared and ordered by keyset pagination."""
+
+    inherit_cache = True
+
+    def __init__(self, expression):
+        super().__init__(expression)
+        self.type = expression.type
+
+@compiles(keyset_value)
+def _compile_keyset_value(element, compiler, **kw):
+    return compiler.process(element.clauses.clauses[0], **kw)
+
+@compiles(keyset_value, "sqlite")
+def _compile_keyset_value_sqlite(element, compiler, **kw):
+    # SQLite keeps timestamps as text, with or without microseconds (server defaults have none),
+    # so equal times don't compare equal as strings
+    expression = compiler.process(element.clauses.clauses[0], **kw)
+    if isinstance(element.type, DateTime):
+        return f"julianday({expression})"
+    return expression
+
+# Function to order a query by keyset and start it after a cursor, or after `skip` rows without one
+def keyset_query(query, columns, limit, cursor=None, skip=0, descending=False):
+    """
+    Page a query by its sort key instead of OFFSET, so a page deep in the list costs
+    the same as the first. `columns` is the sort key, ending in a unique column (the
+    id) that breaks ties. One row more than `limit` is fetched, for keyset_page to
+    tell whether there is a next page.
+
+    `skip` keeps OFFSET paging working for clients that don't send cursors yet.
+
+    Raises:
+        InvalidCursorError: If the cursor doesn't fit the columns, or comes with a skip
+    """
+    if cursor is not None:
+        if skip:
+            raise InvalidCursorError("Pass either a cursor or skip, not both")
+        values = decode_cursor(cursor)
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise InvalidCursorError("Invalid cursor")
+        bounds = [
+            keyset_value(literal(_column_value(column, value), column.type)) for column, value in zip(columns, values)
+        ]
+
+        # A row value comparison, which the database answers from an index on the sort key
+        keys = [keyset_value(column) for column in columns]
+        position = tuple_(*keys) if len(keys) > 1 else keys[0]
+        bound = tuple_(*bounds) if len(bounds) > 1 else bounds[0]
+        query = query.where(position < bound if descending else position > bound)
+    elif skip:
+        query = query.offset(skip)
+
+    order = [keyset_value(column) for column in columns]
+    if descending:
+        order = [key.desc() for key in order]
+    return query.order_by(*order).limit(limit + 1)
+
+# Function to trim the extra row fetched by keyset_query and make the cursor of the next page
+def keyset_page(rows, columns, limit):
+    """
+    Returns:
+        tuple: (rows of this page, cursor of the next page or None on the last page)
+    """
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor([_cursor_value(getattr(rows[-1], column.key)) for column in columns])
@@ -0,0 +1,131 @@
+import logging
+
+from sqlalchemy import text
+
+from app.utils.local_search import tokenize
+from app.utils.search import SearchBackend, empty_search_results
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Text search configuration used for every tsvector and tsquery
+PG_SEARCH_CONFIG = "english"
+
+# Tables with the generated `search_vector` tsvector column and GIN index added by the opt-in migration 0003
+SEARCH_VECTOR_TABLES = ("meals", "carpool_events", "checklists", "checklist_items")
+
+# Search query of each index - :query is a tsquery string, results are (id, rank).
+# Ranks are float8 so the rank sent back in a cursor compares equal to the stored one.
+SEARCH_QUERIES = {
+    "meals": f"""
+        SELECT m.id, ts_rank(m.search_vector, q)::float8 AS rank
+        FROM meals m, to_tsquery('{PG_SEARCH_CONFIG}', :query) q
+        WHERE m.user_id = :user_id AND m.search_vector @@ q
+    """,
+    "carpool_events": f"""
+        SELECT e.id, ts_rank(e.search_vector, q)::float8 AS rank
+        FROM carpool_events e, to_tsquery('{PG_SEARCH_CONFIG}', :query) q
+        WHERE e.user_id = :user_id AND e.search_vector @@ q
+    """,
+    # A checklist matches on its own title/category or on any of its items, and ranks by the best of them.
+    # Only the user's items are matched, so the item search doesn't cover every user's items
+    "checklists": f"""
+        WITH q AS (SELECT to_tsquery('{PG_SEARCH_CONFIG}', :query) AS q),
+        item_matches AS (
+            SELECT i.checklist_id, max(ts_rank(i.search_vector, q.q)) AS rank
+            FROM checklist_items i
+            JOIN checklists ic ON ic.id = i.checklist_id
+            CROSS JOIN q
+            WHERE ic.user_id = :user_id AND i.search_vector @@ q.q
+            GROUP BY i.checklist_id
+        )
+        SELECT c.id, greatest(
+            CASE WHEN c.search_vector @@ q.q THEN ts_rank(c.search_vector, q.q) ELSE 0 END,
+            coalesce(im.rank, 0)
+        )::float8 AS rank
+        FROM checklists c
+        CROSS JOIN q
+        LEFT JOIN item_matches im ON im.checklist_id = c.id
+        WHERE c.user_id = :user_id AND (c.search_vector @@ q.q OR im.checklist_id IS NOT NULL)
+    """,
+}
+
+# Page of a search query, sorted by rank then id and starting after the (:after_rank, :after_id) of the previous page
+PAGE_QUERY = """
+    SELECT id, rank FROM ({query}) ranked
+    WHERE :after_rank IS NULL OR rank < :after_rank OR (rank = :after_rank AND id > :after_id)
+    ORDER BY rank DESC, id
+    LIMIT :size
+"""
+
+class PostgresSearchBackend(SearchBackend):
+    """
+    Search backend using PostgreSQL full-text search.
+    
+    Each searchable table has a generated `search_vector` tsvector column with
+    a GIN index (added by migration 0003), so rows are indexed by PostgreSQL
+    itself as they are written and index_document/delete_document have nothing
+    to do.
+    """
+    
+    name = "postgres"
+    
+    def __init__(self, engine, tables):
+        self.engine = engine
+        self.tables = tables  # search index name -> table name
+        self.ready = False
+    
+    def available(self):
+        return self.ready
+    
+    def setup(self):
+        """
+        Check that the migrations added the tsvector columns.
+        
+        Returns:
+            bool: True if the backend is ready to answer searches
+        """
+        if self.engine.dialect.name != "postgresql":
+            logger.warning(f"PostgreSQL search needs a PostgreSQL database, not {self.engine.dialect.name}. Search will use another backend.")
+            self.ready = False
+            return False
+        
+        try:
+            # The columns are added by `alembic upgrade search_vectors@head` as a deploy step, as adding one rewrites the whole table
+            with self.engine.connect() as connection:
+                found = set(connection.execute(text(
+                    "SELECT table_name FROM information_schema.columns "
+                    "WHERE table_schema = current_schema() AND column_name = 'search_vector'"
+                )).scalars())
+            missing = [table for table in SEARCH_VECTOR_TABLES if table not in found]
+            if missing:
+                self.ready = False
+                logger.warning(
+                    f"PostgreSQL search needs the search_vector column of {', '.join(missing)}. "
+                    f"Run `alembic upgrade search_vectors@head`. Search will use another backend."
+                )
+                return False
+            self.ready = True
+            logger.info("PostgreSQL full-text search is ready")
+        except Exception as e:
+            self.ready = False
+            logger.warning(f"Failed to set up PostgreSQL full-text search: {str(e)}")
+        
+        return self.ready
+    
+    def search(self, index, user_id, query, fields, size=10, search_after=None, source=False, highlight=False):
+        # Match any of the query terms, like the multi_match queries do
+        terms = tokenize(query)
+        if not terms:
+            return empty_search_results()
+        
+        after_rank, after_id = search_after if search_after is not None else (None, None)
+        with self.engine.connect() as connection:
+            rows = connection.execute(
+                text(PAGE_QUERY.format(query=SEARCH_QUERIES[self.tables[index]])),
+                {"query": " | ".join(terms), "user_id": user_id, "size": size, "after_rank": after_rank, "after_id": after_id}
+            ).all()
+        
+        # Hits carry no _source or highlights, so results are always hydrated from the database
+        hits = [{"_index": index, "_id": str(row.id), "_score": row.rank, "sort": [row.rank, row.id]} for row in rows]
+        return {"hits": {"total": {"value": len(hits)}, "max_score": hits[0]["_score"] if hits else None, "hits": hits}}
@@ -0,0 +1,364 @@
+import threading
+import time
+from collections import Counter, OrderedDict, namedtuple
+from datetime import date, timedelta
+
+import numpy as np
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+
+from app.core.config import (
+    RECOMMENDER_CACHE_SIZE, RECOMMENDER_MODEL_TTL_SECONDS, RECOMMENDER_HALF_LIFE_DAYS,
+    RECOMMENDER_MIN_GAP_DAYS, RECOMMENDER_GAP_DAYS, RECOMMENDER_MEAL_SLOTS
+)
+from app.models.meal import Meal
+
+# How much each signal contributes to a meal's score for a plan slot (each signal is scaled to 0..1)
+POPULARITY_WEIGHT = 1.0  # Eaten often, recently
+MEAL_TIME_WEIGHT = 1.0  # Eaten at this time of day
+WEEKDAY_WEIGHT = 0.5  # Eaten at this time of day on this weekday
+FRESHNESS_WEIGHT = 0.75  # Not eaten for a while
+REPEAT_PENALTY = 10.0  # Only repeat a meal within one plan when nothing else fits
+
+# Decayed weights are stored relative to a reference date; rebase before 2 ** exponent overflows
+MAX_WEIGHT_EXPONENT = 512
+
+# The fields of a meal the recommender learns from
+MealFact = namedtuple("MealFact", ["name", "meal_time", "planned_date"])
+
+# Function to capture the fields of a meal the recommender uses (e.g. before an update changes them)
+def meal_fact(meal):
+    return MealFact(meal.name, meal.meal_time, meal.planned_date)
+
+# Function to get the key meals are grouped under, so "Tacos" and "tacos " count as one meal
+def meal_key(value):
+    return (value or "").strip().casefold()
+
+class MealHistoryModel:
+    """
+    Array-backed statistics of one user's meal history.
+
+    Every meal name is a column in:
+        counts        number of meals with that name
+        weights       exponentially decayed count (half-life RECOMMENDER_HALF_LIFE_DAYS)
+        slot_weights  decayed counts by ISO weekday x meal time, shape (7, meal times, names)
+        last_dates    ordinal of the latest planned date
+
+    Meals are added and removed one at a time, so the model never has to be rebuilt
+    from the database while it stays cached.
+    """
+
+    def __init__(self, half_life_days=RECOMMENDER_HALF_LIFE_DAYS, capacity=64):
+        self.half_life_days = float(half_life_days)
+        self.reference = None  # Date ordinal at which a meal weighs exactly 1
+        self.names = {}  # meal key -> column
+        self.labels = []  # column -> name shown to the user
+        self.meal_times = {}  # meal time key -> row of slot_weights
+        self.dates = []  # column -> Counter of planned date ordinals
+        self.counts = np.zeros(capacity, dtype=np.int64)
+        self.weights = np.zeros(capacity)
+        self.slot_weights = np.zeros((7, 0, capacity))
+        self.last_dates = np.zeros(capacity, dtype=np.int64)
+        self.loaded_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.labels)
+
+    # Decayed weight of a meal planned on the given date ordinal
+    def _weight(self, ordinal):
+        if self.reference is None:
+            self.reference = ordinal
+        exponent = (ordinal - self.reference) / self.half_life_days
+        if abs(exponent) > MAX_WEIGHT_EXPONENT:
+            self._rebase(ordinal)
+            exponent = 0.0
+        return 2.0 ** exponent
+
+    # Move the reference date, rescaling the stored weights to match
+    def _rebase(self, ordinal):
+        scale = 2.0 ** ((self.reference - ordinal) / self.half_life_days)
+        self.weights *= scale
+        self.slot_weights *= scale
+        self.reference = ordinal
+
+    def _column(self, name):
+        key = meal_key(name)
+        column = self.names.get(key)
+        if column is None:
+            column = len(self.labels)
+            if column == self.counts.shape[0]:
+                self._grow_columns(column * 2)
+            self.names[key] = column
+            self.labels.append(name.strip())
+            self.dates.append(Counter())
+        return column
+
+    def _grow_columns(self, capacity):
+        extra = capacity - self.counts.shape[0]
+        self.counts = np.concatenate([self.counts, np.zeros(extra, dtype=np.int64)])
+        self.weights = np.concatenate([self.weights, np.zeros(extra)])
+        self.last_dates = np.concatenate([self.last_dates, np.zeros(extra, dtype=np.int64)])
+        self.slot_weights = np.concatenate(
+            [self.slot_weights, np.zeros(self.slot_weights.shape[:2] + (extra,))], axis=2
+        )
+
+    def _row(self, meal_time):
+        key = meal_key(meal_time)
+        row = self.meal_times.get(key)
+        if row is None:
+            row = len(self.meal_times)
+            self.meal_times[key] = row
+            self.slot_weights = np.concatenate(
+                [self.slot_weights, np.zeros((7, 1, self.slot_weights.shape[2]))], axis=1
+            )
+        return row
+
+    # Add (sign=1) or remove (sign=-1) one meal
+    def observe(self, fact, sign=1):
+        if not fact.name or not fact.name.strip() or fact.planned_date is None:
+            return
+        column = self.names.get(meal_key(fact.name))
+        if sign < 0 and (column is None or self.counts[column] == 0):
+            return
+
+        ordinal = fact.planned_date.toordinal()
+        weight = sign * self._weight(ordinal)
+        column = self._column(fact.name)
+        row = self._row(fact.meal_time)
+        weekday = fact.planned_date.isoweekday() - 1
+
+        self.counts[column] += sign
+        self.weights[column] += weight
+        self.slot_weights[weekday, row, column] += weight
+
+        dates = self.dates[column]
+        dates[ordinal] += sign
+        if dates[ordinal] <= 0:
+            del dates[ordinal]
+
+        if self.counts[column] == 0:
+            # Clear rounding leftovers so a removed meal scores exactly nothing
+            self.weights[column] = 0.0
+            self.slot_weights[:, :, column] = 0.0
+            self.last_dates[column] = 0
+        elif sign > 0:
+            self.last_dates[column] = max(self.last_dates[column], ordinal)
+        elif ordinal == self.last_dates[column]:
+            self.last_dates[column] = max(dates)
+
+    def add(self, fact):
+        self.observe(fact, 1)
+
+    def remove(self, fact):
+        self.observe(fact, -1)
+
+    # Scale each row of values to 0..1 by its largest entry
+    @staticmethod
+    def _normalize(values):
+        largest = values.max(axis=-1, keepdims=True)
+        return np.divide(values, largest, out=np.zeros_like(values), where=largest > 0)
+
+    def plan(self, start_date, days=7, meal_slots=RECOMMENDER_MEAL_SLOTS):
+        """
+        Suggest a meal for every slot of every day from start_date.
+
+        Returns:
+            list: [{"day": ISO weekday, "meal": name, "meal_time": slot}, ...] in plan order
+        """
+        size = len(self.labels)
+        slot_rows = [(slot, self.meal_times.get(meal_key(slot))) for slot in meal_slots]
+        slot_rows = [(slot, row) for slot, row in slot_rows if row is not None]
+        if size == 0 or not slot_rows:
+            return []
+
+        rows = [row for _, row in slot_rows]
+        dates = [start_date + timedelta(days=offset) for offset in range(days)]
+        weekdays = np.array([day.isoweekday() - 1 for day in dates])
+        ordinals = np.array([day.toordinal() for day in dates])
+
+        known = self.counts[:size] > 0
+        weights = np.maximum(self.weights[:size], 0.0)
+        slot_weights = np.maximum(self.slot_weights[:, rows, :size], 0.0)  # (7, slots, names)
+
+        popularity = self._normalize(weights)  # (names,)
+        meal_time_weights = slot_weights.sum(axis=0)  # (slots, names)
+        meal_time_affinity = self._normalize(meal_time_weights)
+        weekday_affinity = self._normalize(slot_weights[weekdays])  # (days, slots, names)
+
+        # Days between the latest time a meal was planned and each plan day
+        gaps = ordinals[:, None] - self.last_dates[:size][None, :]  # (days, names)
+        freshness = np.clip(gaps / float(RECOMMENDER_GAP_DAYS), 0.0, 1.0)
+
+        scores = (
+            POPULARITY_WEIGHT * popularity[None, None, :]
+            + MEAL_TIME_WEIGHT * meal_time_affinity[None, :, :]
+            + WEEKDAY_WEIGHT * weekday_affinity
+            + FRESHNESS_WEIGHT * freshness[:, None, :]
+        )
+
+        # Only suggest meals eaten at that time of day, and not too close to when they were last planned
+        eligible = (
+            known[None, None, :]
+            & (meal_time_weights > 0)[None, :, :]
+            & (gaps >= RECOMMENDER_MIN_GAP_DAYS)[:, None, :]
+        )
+        scores = np.where(eligible, scores, -np.inf)
+
+        # Fill the slots in order, pushing meals already in the plan to the back
+        suggestions = []
+        for day_index, day in enumerate(dates):
+            for slot_index, (slot, _) in enumerate(slot_rows):
+                column = int(np.argmax(scores[day_index, slot_index]))
+                if not np.isfinite(scores[day_index, slot_index, column]):
+                    continue
+                scores[:, :, column] -= REPEAT_PENALTY
+                suggestions.append({"day": day.isoweekday(), "meal": self.labels[column], "meal_time": slot})
+
+        return suggestions
+
+class MealRecommender:
+    """
+    Cache of per-user meal history models with least-recently-used eviction.
+
+    A model is loaded from the database the first time a user asks for suggestions
+    and is then kept up to date by the meal endpoints, so later suggestions only
+    cost the scoring. Models older than RECOMMENDER_MODEL_TTL_SECONDS are reloaded
+    to pick up changes made by other processes.
+    """
+
+    def __init__(self, max_users=RECOMMENDER_CACHE_SIZE, ttl_seconds=RECOMMENDER_MODEL_TTL_SECONDS):
+        self.max_users = max_users
+        self.ttl_seconds = ttl_seconds
+        self._models = OrderedDict()  # user_id -> MealHistoryModel, least recently used first
+        self._loading = {}  # user_id -> True once the meals changed during the load
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._models)
+
+    # Function to build the query of the meal fields a user's model is built from
+    @staticmethod
+    def meal_facts_query(user_id):
+        return select(Meal.name, Meal.meal_time, Meal.planned_date).where(Meal.user_id == user_id)
+
+    # Function to build a model from all of a user's meals
+    @staticmethod
+    def build_model(rows):
+        model = MealHistoryModel()
+        for row in rows:
+            model.add(MealFact(row.name, row.meal_time, row.planned_date))
+        return model
+
+    @classmethod
+    def load_model(cls, db, user_id):
+        return cls.build_model(db.execute(cls.meal_facts_query(user_id)))
+
+    def _cached_model(self, user_id):
+        # A fresh cached model, or None once the caller is registered as loading it
+        with self._lock:
+            model = self._models.get(user_id)
+            if model is not None and time.monotonic() - model.loaded_at < self.ttl_seconds:
+                self._models.move_to_end(user_id)
+                self.hits += 1
+                return model
+            self._models.pop(user_id, None)
+            self.misses += 1
+            self._loading[user_id] = False
+            return None
+
+    def _store_model(self, user_id, model):
+        with self._lock:
+            # A meal changed while loading may or may not be in the model; use it once without caching
+            if not self._loading.pop(user_id, False):
+                self._models[user_id] = model
+                while len(self._models) > self.max_users:
+                    self._models.popitem(last=False)
+                    self.evictions += 1
+
+    def _load_failed(self, user_id):
+        with self._lock:
+            self._loading.pop(user_id, None)
+
+    def get_model(self, db, user_id):
+        model = self._cached_model(user_id)
+        if model is not None:
+            return model
+
+        try:
+            model = self.load_model(db, user_id)
+        except Exception:
+            self._load_failed(user_id)
+            raise
+
+        self._store_model(user_id, model)
+        return model
+
+    # Apply a change to a cached model; users without one will load their meals when they next need them
+    def _update(self, user_id, removed=None, added=None):
+        with self._lock:
+            model = self._models.get(user_id)
+            if model is None:
+                if user_id in self._loading:
+                    self._loading[user_id] = True
+                return
+
+        with model.lock:
+            if removed is not None:
+                model.remove(removed)
+            if added is not None:
+                model.add(added)
+
+    def add_meal(self, user_id, meal):
+        self._update(user_id, added=meal_fact(meal))
+
+    def update_meal(self, user_id, previous, meal):
+        self._update(user_id, removed=previous, added=meal_fact(meal))
+
+    def remove_meal(self, user_id, previous):
+        self._update(user_id, removed=previous)
+
+    @staticmethod
+    def _plan(model, start_date=None, days=7):
+        if start_date is None:
+            start_date = date.today() + timedelta(days=1)
+        with model.lock:
+            return model.plan(start_date, days)
+
+    def suggest(self, db, user_id, start_date=None, days=7):
+        return self._plan(self.get_model(db, user_id), start_date, days)
+
+    async def suggest_async(self, db, user_id, start_date=None, days=7):
+        """
+        Like `suggest`, for async routes (db is an AsyncSession).
+
+        The meals are awaited, and building and scoring the model run in the
+        threadpool so the NumPy work doesn't hold up the event loop.
+        """
+        model = self._cached_model(user_id)
+        if model is None:
+            try:
+                rows = (await db.execute(self.meal_facts_query(user_id))).all()
+                model = await run_in_threadpool(self.build_model, rows)
+            except BaseException:
+                # Also when the request is cancelled, so later changes aren't tracked for a load that never finishes
+                self._load_failed(user_id)
+                raise
+            self._store_model(user_id, model)
+
+        return await run_in_threadpool(self._plan, model, start_date, days)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "users": len(self._models),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+# Shared recommender used by the meal endpoints
+meal_recommender = MealRecommender()
@@ -0,0 +1,194 @@
+"""
+Find and repair drift between the database and the Elasticsearch indices.
+
+Each source is split into id ranges of --batch-size ids. For every range the
+database side is summarized as (row count, sum of document hashes). The index
+side is summarized the same way with a histogram aggregation over the stored
+"doc_hash" field, so only two numbers per range cross the network. Only the
+ranges that differ are compared document by document, reading just the ids and
+hashes from the index with search_after, and only the differing documents are
+re-sent or deleted.
+
+Documents indexed before "doc_hash" existed show up as drift once and are
+re-sent with a hash.
+
+Usage:
+    python -m app.utils.reconcile [checklists] [carpool] [meals] [--batch-size 1000] [--dry-run]
+"""
+import argparse
+import logging
+import sys
+import time
+
+from elasticsearch.helpers import bulk
+
+from app.db.database import SessionLocal
+from app.utils import elastic
+from app.utils.elastic import setup_elasticsearch_indices, write_alias
+from app.utils.reindex import REINDEX_SOURCES
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Number of id ranges summarized per Elasticsearch request
+RANGES_PER_REQUEST = 500
+
+# Function to summarize the database side of every id range
+def summarize_database(db, stream, batch_size):
+    """
+    Returns:
+        dict: {range start: [row count, sum of document hashes]}
+    """
+    summaries = {}
+    for doc_id, document in stream(db, batch_size):
+        summary = summaries.setdefault(doc_id - doc_id % batch_size, [0, 0])
+        summary[0] += 1
+        summary[1] += document["doc_hash"]
+    return summaries
+
+# Function to get the highest document id in an index
+def get_max_indexed_id(client, index):
+    response = client.search(index=index, size=0, aggs={"max_id": {"max": {"field": "id"}}})
+    value = response["aggregations"]["max_id"]["value"]
+    return int(value) if value is not None else -1
+
+# Function to summarize the index side of every id range up to max_id
+def summarize_index(client, index, batch_size, max_id):
+    """
+    Returns:
+        dict: {range start: [document count, sum of document hashes]}
+    """
+    summaries = {}
+    window = batch_size * RANGES_PER_REQUEST
+    for start in range(0, max_id + 1, window):
+        response = client.search(
+            index=index,
+            size=0,
+            query={"range": {"id": {"gte": start, "lt": start + window}}},
+            aggs={"ranges": {
+                "histogram": {"field": "id", "interval": batch_size, "min_doc_count": 1},
+                "aggs": {"hash_sum": {"sum": {"field": "doc_hash"}}}
+            }}
+        )
+        for bucket in response["aggregations"]["ranges"]["buckets"]:
+            summaries[int(bucket["key"])] = [bucket["doc_count"], int(bucket["hash_sum"]["value"])]
+    return summaries
+
+# Function to read the ids and hashes of the documents in an id range
+def get_indexed_hashes(client, index, start, end, page_size=1000):
+    hashes = {}
+    search_after = None
+    while True:
+        response = client.search(
+            index=index,
+            size=page_size,
+            query={"range": {"id": {"gte": start, "lt": end}}},
+            sort=[{"id": "asc"}],
+            source=["doc_hash"],
+            search_after=search_after
+        )
+        hits = response["hits"]["hits"]
+        for hit in hits:
+            hashes[int(hit["_id"])] = hit["_source"].get("doc_hash")
+        if len(hits) < page_size:
+            return hashes
+        search_after = hits[-1]["sort"]
+
+# Function to bring one source's index in line with the database
+def reconcile(name, batch_size=1000, dry_run=False, client=None):
+    """
+    Compare a source with its index and repair the ranges that differ.
+
+    Args:
+        name (str): The source to check ("checklists", "carpool" or "meals")
+        batch_size (int): Ids per compared range
+        dry_run (bool): Only report the drift, don't repair it
+        client: The Elasticsearch client, defaults to the application's bulk client
+
+    Returns:
+        dict: Rows and ranges checked, documents indexed, updated and deleted, and elapsed seconds
+    """
+    alias, stream = REINDEX_SOURCES[name]
+    index = write_alias(alias)
+    client = client or elastic.es_bulk_client
+
+    stats = {"index": index, "rows": 0, "ranges": 0, "drifted_ranges": 0, "indexed": 0, "updated": 0, "deleted": 0, "errors": 0}
+    started = time.monotonic()
+
+    db = SessionLocal()
+    try:
+        # Pass 1: compare (count, hash sum) per id range
+        database_summaries = summarize_database(db, stream, batch_size)
+        max_id = max([get_max_indexed_id(client, index)] + [start + batch_size - 1 for start in database_summaries])
+        index_summaries = summarize_index(client, index, batch_size, max_id)
+
+        starts = sorted(set(database_summaries) | set(index_summaries))
+        drifted = [start for start in starts if database_summaries.get(start) != index_summaries.get(start)]
+        stats["rows"] = sum(count for count, _ in database_summaries.values())
+        stats["ranges"] = len(starts)
+        stats["drifted_ranges"] = len(drifted)
+
+        # Pass 2: compare the documents of the drifted ranges and fix the ones that differ
+        for start in drifted:
+            end = start + batch_size
+            documents = dict(stream(db, batch_size, (start, end)))
+            indexed = get_indexed_hashes(client, index, start, end)
+
+            actions = []
+            for doc_id, document in documents.items():
+                if doc_id not in indexed:
+                    stats["indexed"] += 1
+                elif indexed[doc_id] != document["doc_hash"]:
+                    stats["updated"] += 1
+                else:
+                    continue
+                actions.append({"_index": index, "_id": doc_id, "_source": document})
+            for doc_id in indexed.keys() - documents.keys():
+                stats["deleted"] += 1
+                actions.append({"_op_type": "delete", "_index": index, "_id": doc_id})
+
+            if actions and not dry_run:
+                _, errors = bulk(client, actions, raise_on_error=False, raise_on_exception=False)
+                for error in errors:
+                    # A delete of a document that is already gone is not an error
+                    if error.get("delete", {}).get("status") != 404:
+                        stats["errors"] += 1
+                        logger.error(f"Failed to repair a document in {index}: {error}")
+
+            # Drop the rows of this range before loading the next one
+            db.expunge_all()
+    finally:
+        db.close()
+
+    stats["elapsed_seconds"] = round(time.monotonic() - started, 2)
+    return stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find and repair drift between the database and the Elasticsearch indices")
+    parser.add_argument("sources", nargs="*", choices=list(REINDEX_SOURCES), help="Sources to check (default: all)")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Ids per compared range")
+    parser.add_argument("--dry-run", action="store_true", help="Report drift without repairing it")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    if not setup_elasticsearch_indices():
+        logger.error("Elasticsearch is not available. Nothing was checked.")
+        return 1
+
+    exit_code = 0
+    for name in args.sources or list(REINDEX_SOURCES):
+        stats = reconcile(name, batch_size=args.batch_size, dry_run=args.dry_run)
+        action = "would fix" if args.dry_run else "fixed"
+        logger.info(
+            f"{stats['index']}: {stats['rows']} rows in {stats['ranges']} ranges, {stats['drifted_ranges']} drifted; "
+            f"{action} {stats['indexed']} missing, {stats['updated']} stale and {stats['deleted']} orphaned documents "
+            f"in {stats['elapsed_seconds']}s"
+        )
+        if stats["errors"]:
+            exit_code = 1
+
+    return exit_code
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,280 @@
+"""
+Rebuild the Elasticsearch indices from PostgreSQL.
+
+Rows are streamed with server-side cursors, turned into documents with the
+same builders used by the API, and sent through parallel bulk workers, so
+memory use stays flat no matter how many rows a table has.
+
+With --rollover, each source is rebuilt into a new versioned index instead:
+new writes are pointed at it first, it is filled from the database, and the
+read alias is then switched to it in one atomic step, so searches keep being
+served from the old index until the new one is complete. The fill only creates
+documents the live writes haven't, and a reconcile pass then removes documents
+deleted while it ran, before anything reads from the new index. If the rebuild
+fails, writes go back to the old index, which is caught up with the writes made
+in the meantime, and the new index is deleted.
+
+Usage:
+    python -m app.utils.reindex [checklists] [carpool] [meals] [--rollover] [--delete-old] [--batch-size 1000] [--workers 4]
+"""
+import argparse
+import logging
+import sys
+import time
+
+from elasticsearch.helpers import parallel_bulk
+from sqlalchemy.orm import selectinload
+
+from app.db.database import SessionLocal
+from app.models.checklist import Checklist
+from app.models.carpool import CarpoolEvent
+from app.models.meal import Meal
+from app.utils import elastic
+from app.utils.elastic import (
+    CHECKLIST_INDEX, CARPOOL_INDEX, MEAL_INDEX,
+    build_checklist_document, build_carpool_event_document, build_meal_document,
+    setup_elasticsearch_indices, write_alias, get_alias_indices, create_versioned_index,
+    finish_bulk_load, switch_alias
+)
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# How often to log progress while reindexing
+PROGRESS_INTERVAL_SECONDS = 5
+
+# Function to limit a query to ids in [start, end)
+def filter_id_range(query, model, id_range):
+    if id_range is None:
+        return query
+    start, end = id_range
+    return query.filter(model.id >= start, model.id < end)
+
+# Function to stream checklists with their items
+def stream_checklists(db, batch_size, id_range=None):
+    query = db.query(Checklist).options(selectinload(Checklist.items)).order_by(Checklist.id)
+    for checklist in filter_id_range(query, Checklist, id_range).yield_per(batch_size):
+        yield checklist.id, build_checklist_document(checklist, checklist.items)
+
+# Function to stream carpool events
+def stream_carpool_events(db, batch_size, id_range=None):
+    query = db.query(CarpoolEvent).order_by(CarpoolEvent.id)
+    for event in filter_id_range(query, CarpoolEvent, id_range).yield_per(batch_size):
+        yield event.id, build_carpool_event_document(event)
+
+# Function to stream meals
+def stream_meals(db, batch_size, id_range=None):
+    query = db.query(Meal).order_by(Meal.id)
+    for meal in filter_id_range(query, Meal, id_range).yield_per(batch_size):
+        yield meal.id, build_meal_document(meal)
+
+# Sources that can be reindexed, by name
+REINDEX_SOURCES = {
+    "checklists": (CHECKLIST_INDEX, stream_checklists),
+    "carpool": (CARPOOL_INDEX, stream_carpool_events),
+    "meals": (MEAL_INDEX, stream_meals),
+}
+
+# Function to reindex one source into an index
+def reindex(name, target_index=None, batch_size=1000, workers=4, client=None, op_type="index"):
+    """
+    Stream every row of a source table into Elasticsearch.
+    
+    Args:
+        name (str): The source to reindex ("checklists", "carpool" or "meals")
+        target_index (str): The index to write to, defaults to the source's write alias
+        batch_size (int): Rows fetched per cursor round trip and documents per bulk request
+        workers (int): Number of parallel bulk threads
+        client: The Elasticsearch client, defaults to the application client
+        op_type (str): "index" to overwrite existing documents, "create" to keep them
+    
+    Returns:
+        dict: Number of documents indexed, skipped (already there with "create"), errors, elapsed seconds and throughput
+    """
+    default_index, stream = REINDEX_SOURCES[name]
+    target_index = target_index or write_alias(default_index)
+    client = client or elastic.es_bulk_client
+    
+    stats = {"index": target_index, "indexed": 0, "skipped": 0, "errors": 0}
+    started = time.monotonic()
+    last_report = started
+    
+    db = SessionLocal()
+    try:
+        actions = (
+            {"_op_type": op_type, "_index": target_index, "_id": doc_id, "_source": document}
+            for doc_id, document in stream(db, batch_size)
+        )
+        
+        for ok, info in parallel_bulk(
+            client,
+            actions,
+            thread_count=workers,
+            chunk_size=batch_size,
+            queue_size=workers,
+            raise_on_error=False,
+            raise_on_exception=False
+        ):
+            if ok:
+                stats["indexed"] += 1
+            elif info.get("create", {}).get("status") == 409:
+                # Written through the write alias since the rows were read, so newer than this copy
+                stats["skipped"] += 1
+            else:
+                stats["errors"] += 1
+                logger.error(f"Failed to index document into {target_index}: {info}")
+            
+            now = time.monotonic()
+            if now - last_report >= PROGRESS_INTERVAL_SECONDS:
+                last_report = now
+                logger.info(f"{target_index}: {stats['indexed']} documents indexed ({stats['indexed'] / (now - started):.0f} docs/s)")
+    finally:
+        db.close()
+    
+    stats["elapsed_seconds"] = round(time.monotonic() - started, 2)
+    stats["docs_per_second"] = round(stats["indexed"] / stats["elapsed_seconds"]) if stats["elapsed_seconds"] else stats["indexed"]
+    return stats
+
+# Function to point writes back at the index searches still read from and drop a failed rollover's index
+def abandon_rollover(name, new_index, previous_index, batch_size=1000):
+    from app.utils.reconcile import reconcile  # reconcile imports this module
+    
+    alias, _ = REINDEX_SOURCES[name]
+    if previous_index is None:
+        # Nothing to go back to; the new index is all there is
+        logger.error(f"Rebuilding {alias} failed and there is no previous index, {new_index} is kept")
+        return
+    
+    switch_alias(write_alias(alias), previous_index, is_write_index=True)
+    elastic.es_bulk_client.indices.delete(index=new_index, ignore_unavailable=True)
+    logger.error(f"Rebuilding {alias} failed, writes went back to {previous_index} and {new_index} was deleted")
+    
+    # Writes made during the fill only reached the new index; copy them over
+    try:
+        reconcile(name, batch_size=batch_size)
+    except Exception as e:
+        logger.error(f"Failed to catch {previous_index} up with writes made during the rollover, run `python -m app.utils.reconcile {name}`: {str(e)}")
+
+# Function to rebuild a source into a new versioned index and swap the aliases to it
+def rollover(name, batch_size=1000, workers=4, delete_old=False):
+    """
+    Rebuild a source into a new index without interrupting search.
+    
+    If the fill fails or has errors, writes are pointed back at the index
+    searches read from, and the new index is deleted.
+    
+    Args:
+        name (str): The source to rebuild ("checklists", "carpool" or "meals")
+        batch_size (int): Rows fetched per cursor round trip and documents per bulk request
+        workers (int): Number of parallel bulk threads
+        delete_old (bool): Delete the previous indices once the read alias has moved
+    
+    Returns:
+        dict: The reindex stats, plus the new index, the documents the reconcile pass repaired
+            and whether the read alias was switched
+    """
+    alias, _ = REINDEX_SOURCES[name]
+    old_indices = get_alias_indices(alias)
+    previous_index = (get_alias_indices(write_alias(alias)) or old_indices or [None])[0]
+    new_index = create_versioned_index(alias, bulk_load=True)
+    logger.info(f"Rebuilding {alias} into {new_index} (currently serving from {', '.join(old_indices) or 'nothing'})")
+    
+    from app.utils.reconcile import reconcile  # reconcile imports this module
+    
+    # New writes land in the new index while it is filled, so nothing is missed.
+    # The fill only creates documents, as the rows it reads can be older than those writes
+    switch_alias(write_alias(alias), new_index, is_write_index=True)
+    
+    try:
+        stats = reindex(name, target_index=new_index, batch_size=batch_size, workers=workers, op_type="create")
+        finish_bulk_load(new_index)
+        stats["new_index"] = new_index
+        
+        # Rows deleted during the fill can have been copied after their delete reached the new index
+        repaired = reconcile(name, batch_size=batch_size)
+    except Exception:
+        abandon_rollover(name, new_index, previous_index, batch_size)
+        raise
+    
+    stats["errors"] += repaired["errors"]
+    stats["repaired"] = {key: repaired[key] for key in ("indexed", "updated", "deleted")}
+    if any(stats["repaired"].values()):
+        logger.info(
+            f"{new_index}: reconciled {repaired['indexed']} missing, {repaired['updated']} stale "
+            f"and {repaired['deleted']} deleted documents after the fill"
+        )
+    
+    if stats["errors"]:
+        # Keep searches on the old index; running the rollover again starts a fresh index
+        stats["switched"] = False
+        logger.error(f"{new_index} had {stats['errors']} indexing errors, {alias} still reads from the old index")
+        abandon_rollover(name, new_index, previous_index, batch_size)
+        return stats
+    
+    # Searches move to the new index in one atomic alias update
+    switch_alias(alias, new_index)
+    stats["switched"] = True
+    logger.info(f"{alias} now reads from {new_index}")
+    
+    if delete_old:
+        for old_index in old_indices:
+            elastic.es_bulk_client.indices.delete(index=old_index)
+            logger.info(f"Deleted old index {old_index}")
+    
+    return stats
+
+# Function to load every document into the in-process search index
+def warm_local_search(batch_size=1000):
+    """
+    Fill the local search index from the database.
+    
+    Returns:
+        int: The number of documents loaded
+    """
+    def sources(db):
+        for index, stream in REINDEX_SOURCES.values():
+            for doc_id, document in stream(db, batch_size):
+                yield index, doc_id, document
+    
+    started = time.monotonic()
+    db = SessionLocal()
+    try:
+        loaded = elastic.local_search_backend.warm(sources(db))
+    finally:
+        db.close()
+    
+    logger.info(f"Loaded {loaded} documents into the local search index in {time.monotonic() - started:.1f}s")
+    return loaded
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild Elasticsearch indices from the database")
+    parser.add_argument("sources", nargs="*", choices=list(REINDEX_SOURCES), help="Sources to reindex (default: all)")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Rows per cursor fetch and documents per bulk request")
+    parser.add_argument("--workers", type=int, default=4, help="Number of parallel bulk threads")
+    parser.add_argument("--rollover", action="store_true", help="Build a new versioned index and switch the aliases to it")
+    parser.add_argument("--delete-old", action="store_true", help="With --rollover, delete the previous indices after the switch")
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(level=logging.INFO)
+    
+    if not setup_elasticsearch_indices():
+        logger.error("Elasticsearch is not available. Nothing was reindexed.")
+        return 1
+    
+    exit_code = 0
+    for name in args.sources or list(REINDEX_SOURCES):
+        if args.rollover:
+            stats = rollover(name, batch_size=args.batch_size, workers=args.workers, delete_old=args.delete_old)
+        else:
+            stats = reindex(name, batch_size=args.batch_size, workers=args.workers)
+        logger.info(
+            f"{stats['index']}: {stats['indexed']} documents indexed, {stats['errors']} errors "
+            f"in {stats['elapsed_seconds']}s ({stats['docs_per_second']} docs/s)"
+        )
+        if stats["errors"]:
+            exit_code = 1
+    
+    return exit_code
+
+if __name__ == "__main__":
+    sys.exit(main())
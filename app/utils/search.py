@@ -0,0 +1,95 @@
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import SEARCH_RESULTS_FROM_SOURCE
+
+# Empty search response, in the same shape as an Elasticsearch response
+def empty_search_results():
+    return {"hits": {"total": {"value": 0}, "hits": []}}
+
+class SearchBackend:
+    """
+    Interface implemented by every search backend.
+    
+    Documents are the dicts built by the build_*_document functions in
+    app/utils/elastic.py, and search results use the Elasticsearch response
+    shape ({"hits": {"hits": [{"_id", "_score", "_source"}]}}), so routes do
+    not need to know which backend answered.
+    
+    Hits are sorted by score, then id, and each carries its [score, id] as
+    "sort", which can be passed back as `search_after` to get the next page.
+    """
+    
+    name = "base"
+    
+    def available(self):
+        """Whether the backend can currently answer searches."""
+        return False
+    
+    def writable(self):
+        """Whether the backend takes writes now, possibly queueing them until it recovers."""
+        return self.available()
+    
+    def index_document(self, index, doc_id, document):
+        """Add or replace a document. Returns False if the write failed."""
+        return True
+    
+    def delete_document(self, index, doc_id):
+        """Remove a document. Returns False if the delete failed."""
+        return True
+    
+    def search(self, index, user_id, query, fields, size=10, search_after=None, source=False, highlight=False):
+        """
+        Full-text search of one user's documents over the given fields.
+        
+        Args:
+            search_after (list): The "sort" of the last hit of the previous page
+            source (bool): Include the documents as "_source" in the hits
+            highlight (bool): Include the matched terms of each field as "highlight" snippets
+        """
+        raise NotImplementedError
+    
+    async def search_async(self, index, user_id, query, fields, size=10, search_after=None, source=False, highlight=False):
+        """Like `search`, for async routes. Blocking backends run in the threadpool."""
+        return await run_in_threadpool(self.search, index, user_id, query, fields, size, search_after, source, highlight)
+
+# Function to get the document ids of search hits, in relevance order
+def get_hit_ids(search_results):
+    return [int(hit["_id"]) for hit in search_results["hits"]["hits"]]
+
+# Function to get the highlight snippets of search hits by document id
+def get_hit_highlights(search_results):
+    return {int(hit["_id"]): hit["highlight"] for hit in search_results["hits"]["hits"] if hit.get("highlight")}
+
+# Function to turn search hits into results, keeping the search relevance order
+def hydrate_search_hits(db, model, user_id, search_results, options=(), from_source=SEARCH_RESULTS_FROM_SOURCE, source_check=None):
+    """
+    Load the rows matching a set of search hits in a single query.
+    
+    Args:
+        db: The database session
+        model: The model the hits refer to (must have `id` and `user_id` columns)
+        user_id (int): The current user - rows of other users are never returned
+        search_results (dict): The response of one of the search functions
+        options: Loader options for the query, e.g. selectinload of relationships
+        from_source (bool): Return the indexed `_source` documents and skip the database
+        source_check: Optional function that returns False for a `_source` document that
+            is missing fields the caller needs, in which case the database is used instead
+    
+    Returns:
+        list: Model instances, or `_source` dicts when served from the index
+    """
+    hits = search_results["hits"]["hits"]
+    if not hits:
+        return []
+    
+    if from_source:
+        sources = [hit.get("_source") for hit in hits]
+        if all(source is not None and (source_check is None or source_check(source)) for source in sources):
+            return [source for source in sources if source.get("user_id") == user_id]
+    
+    # Load every hit in one query, scoped to the user
+    ids = get_hit_ids(search_results)
+    rows = db.query(model).options(*options).filter(model.id.in_(ids), model.user_id == user_id).all()
+    rows_by_id = {row.id: row for row in rows}
+    
+    return [rows_by_id[row_id] for row_id in ids if row_id in rows_by_id]
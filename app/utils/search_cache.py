@@ -0,0 +1,203 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from app.core.config import (
+    SEARCH_CACHE_ENABLED, SEARCH_CACHE_TTL_SECONDS, SEARCH_CACHE_MAX_ENTRIES, SEARCH_CACHE_MAX_BYTES,
+    SEARCH_CACHE_SETTLE_SECONDS
+)
+from app.utils.local_search import tokenize
+
+# Function to normalize a query so that "Tacos" and " tacos!" share a cache entry
+def normalize_query(query):
+    return " ".join(tokenize(query))
+
+class SearchResultCache:
+    """
+    Per-user cache of search result ids, with a TTL, LRU eviction and a memory bound.
+
+    Entries are keyed by (user, index, normalized query, size, page cursor) and hold
+    the result ids and the cursor of the next page. Any write to one of
+    a user's documents drops all of that user's entries for the index, as the
+    backends analyze text differently and a new document can match any query.
+
+    Two races are guarded against:
+    - A search that started before a write can't store its now stale result,
+      because every write bumps the (user, index) generation.
+    - Nothing is cached for `settle_seconds` after a write, because Elasticsearch
+      may not show the write yet (bulk queue and refresh interval).
+
+    Generations are only kept while they can matter: a write older than both the
+    TTL and the settle time is forgotten. Forgetting one moves the generation of
+    every unwritten (user, index) to a new value, so a search still running from
+    before it can't store its result either.
+
+    The cache and its generations live in this process, so a write only drops
+    the entries of the worker that handled it. With several workers, the others
+    keep serving their cached results, which miss the change, for up to
+    `ttl_seconds`. Keep the TTL short there, or turn the cache off where search
+    has to show a write straight away.
+    """
+
+    def __init__(self, enabled=SEARCH_CACHE_ENABLED, ttl_seconds=SEARCH_CACHE_TTL_SECONDS, max_entries=SEARCH_CACHE_MAX_ENTRIES,
+                 max_bytes=SEARCH_CACHE_MAX_BYTES, settle_seconds=SEARCH_CACHE_SETTLE_SECONDS):
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.settle_seconds = settle_seconds
+
+        self._entries = OrderedDict()  # key -> ((ids, next_cursor), stored_at, size in bytes), least recently used first
+        self._keys = {}  # (user_id, index) -> set of keys
+        self._generations = OrderedDict()  # (user_id, index) -> (generation, time of the last write), oldest write first
+        self._last_generation = 0  # Generations are numbered across all users and indices
+        self._unwritten_generation = 0  # Generation of a (user, index) with no recent write
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    @staticmethod
+    def _entry_size(key, ids, next_cursor):
+        # Rough memory footprint: the key, the cursors, the list and its int objects
+        return (sys.getsizeof(key) + sys.getsizeof(key[2]) + sys.getsizeof(key[4]) + sys.getsizeof(next_cursor)
+                + sys.getsizeof(ids) + 28 * len(ids))
+
+    def _remove(self, key):
+        # Must hold the lock
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+        scope = key[:2]
+        keys = self._keys.get(scope)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys[scope]
+
+    def _new_generation(self):
+        # Must hold the lock
+        self._last_generation += 1
+        return self._last_generation
+
+    def _forget_old_writes(self):
+        # Must hold the lock
+        now = time.monotonic()
+        forgotten = False
+        while self._generations:
+            _, written_at = next(iter(self._generations.values()))
+            if now - written_at < max(self.ttl_seconds, self.settle_seconds):
+                break
+            self._generations.popitem(last=False)
+            forgotten = True
+        if forgotten:
+            self._unwritten_generation = self._new_generation()
+
+    def generation(self, user_id, index):
+        """Get the token to pass to `put` for a search that is about to run."""
+        with self._lock:
+            return self._generations.get((user_id, index), (self._unwritten_generation, None))[0]
+
+    def get(self, user_id, index, query, size, cursor=None):
+        """
+        Returns:
+            tuple: The cached result ids and next page cursor, or None on a miss
+        """
+        if not self.enabled:
+            return None
+
+        key = (user_id, index, normalize_query(query), size, cursor)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+
+            (ids, next_cursor), stored_at, _ = entry
+            if time.monotonic() - stored_at >= self.ttl_seconds:
+                self._remove(key)
+                self.stats["expirations"] += 1
+                self.stats["misses"] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return list(ids), next_cursor
+
+    def put(self, user_id, index, query, size, ids, generation, cursor=None, next_cursor=None):
+        """Store result ids, unless one of the user's documents in the index changed since `generation` was taken."""
+        if not self.enabled:
+            return False
+
+        key = (user_id, index, normalize_query(query), size, cursor)
+        ids = tuple(ids)
+        entry_size = self._entry_size(key, ids, next_cursor)
+        if entry_size > self.max_bytes:
+            return False
+
+        with self._lock:
+            self._forget_old_writes()
+            current, written_at = self._generations.get((user_id, index), (self._unwritten_generation, None))
+            if current != generation:
+                return False
+            if written_at is not None and time.monotonic() - written_at < self.settle_seconds:
+                return False
+
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = ((ids, next_cursor), time.monotonic(), entry_size)
+            self._keys.setdefault((user_id, index), set()).add(key)
+            self._bytes += entry_size
+            self.stats["stores"] += 1
+
+            # Evict least recently used entries until both bounds hold
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.stats["evictions"] += 1
+            return True
+
+    def invalidate(self, user_id, index):
+        """Drop a user's cached results for an index after one of their documents changed."""
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._generations.pop((user_id, index), None)
+            self._generations[(user_id, index)] = (self._new_generation(), time.monotonic())
+            self._forget_old_writes()
+            for key in list(self._keys.get((user_id, index), ())):
+                self._remove(key)
+                self.stats["invalidations"] += 1
+
+    def invalidate_index(self, index):
+        """Drop every user's cached results for an index, e.g. when the owner of a deleted document is unknown."""
+        if not self.enabled:
+            return
+
+        with self._lock:
+            scopes = {scope for scope in self._generations if scope[1] == index} | {scope for scope in self._keys if scope[1] == index}
+            # Also stops searches of users without a recent write from storing their results
+            self._unwritten_generation = self._new_generation()
+        for user_id, _ in scopes:
+            self.invalidate(user_id, index)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys.clear()
+            self._bytes = 0
+
+    def snapshot(self):
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                "entries": len(self._entries),
+                "recent_writers": len(self._generations),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else None,
+                **self.stats
+            }
+
+# Process-wide search result cache
+search_cache = SearchResultCache()
@@ -0,0 +1,6 @@
+"""
+Benchmarks of the hot paths, run by hand when changing them.
+
+Each one is a module with its own command line, e.g.
+    python -m benchmarks.run_creation
+"""
@@ -0,0 +1,115 @@
+"""
+Requests per second against concurrent clients, for a list request served through
+a sync Session and through an AsyncSession.
+
+Both routes do what GET /meals/ does: load the user, then a page of their meals.
+The sync route runs in the threadpool with a Session from SessionLocal, like the
+routes did before the async engine; the async route awaits the same queries
+through AsyncSessionLocal on the event loop. Clients send requests to the app
+in-process (no network in between), each waiting for its response before
+sending the next.
+
+Usage:
+    python -m benchmarks.database_load [--clients 1 10 50 100 200] [--requests 2000] [--meals 100]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import date, timedelta
+
+from benchmarks import support
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import insert, select
+
+from app.db.database import AsyncSessionLocal, SessionLocal, async_engine, engine
+from app.db.migrate import upgrade_database
+from app.models.meal import Meal
+from app.models.user import User
+
+app = FastAPI()
+
+# The user and a page of their meals, as GET /meals/ loads them, through a sync Session in the threadpool
+@app.get("/sync/meals/{user_id}")
+def list_meals_sync(user_id: int):
+    db = SessionLocal()
+    try:
+        user = db.scalar(select(User).where(User.id == user_id))
+        meals = db.scalars(
+            select(Meal).where(Meal.user_id == user.id).order_by(Meal.planned_date, Meal.id).limit(101)
+        ).all()
+        return {"results": len(meals)}
+    finally:
+        db.close()
+
+# The same, through an AsyncSession on the event loop
+@app.get("/async/meals/{user_id}")
+async def list_meals_async(user_id: int):
+    async with AsyncSessionLocal() as db:
+        user = await db.scalar(select(User).where(User.id == user_id))
+        meals = (await db.scalars(
+            select(Meal).where(Meal.user_id == user.id).order_by(Meal.planned_date, Meal.id).limit(101)
+        )).all()
+        return {"results": len(meals)}
+
+# Function to add a user with `count` meals, returning the user id
+def seed(count):
+    with engine.begin() as connection:
+        user_id = connection.execute(
+            insert(User).returning(User.id), [{"email": f"db-bench-{time.time_ns()}@example.com", "password_hash": "-"}]
+        ).scalar()
+        connection.execute(insert(Meal), [
+            {"user_id": user_id, "name": f"Meal {n}", "meal_time": "Dinner", "planned_date": date(2026, 1, 1) + timedelta(days=n)}
+            for n in range(count)
+        ])
+    return user_id
+
+# Function to send `requests` requests to `url` from `clients` concurrent clients
+async def run_round(client, url, clients, requests):
+    latencies = []
+    remaining = iter(range(requests))
+
+    async def send():
+        for _ in remaining:
+            start = time.perf_counter()
+            response = await client.get(url)
+            response.raise_for_status()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(send() for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests/s": len(latencies) / elapsed,
+        "p50 ms": statistics.median(latencies),
+        "p99 ms": latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))]
+    }
+
+async def run(args, user_id):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        print(f"{'clients':>7} {'session':>8} {'requests/s':>11} {'p50 ms':>8} {'p99 ms':>8}")
+        for clients in args.clients:
+            for name in ("sync", "async"):
+                url = f"/{name}/meals/{user_id}"
+                await run_round(client, url, clients, clients)  # Warm up the pool
+                row = await run_round(client, url, clients, max(args.requests, clients))
+                print(f"{clients:>7} {name:>8} {row['requests/s']:>11.0f} {row['p50 ms']:>8.1f} {row['p99 ms']:>8.1f}")
+    await async_engine.dispose()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare requests/s of sync and async database sessions against concurrent clients")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 10, 50, 100, 200], help="Concurrent clients per round")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per round")
+    parser.add_argument("--meals", type=int, default=100, help="Meals of the benchmark user")
+    args = parser.parse_args(argv)
+
+    upgrade_database()
+    user_id = seed(args.meals)
+    asyncio.run(run(args, user_id))
+
+if __name__ == "__main__":
+    main()
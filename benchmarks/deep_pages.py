@@ -0,0 +1,83 @@
+"""
+Time fetching a page deep in GET /meals/ by cursor and by skip.
+
+One user gets `--meals` meals (among as many of another user's), and pages of
+`--limit` meals are fetched at increasing depth. A skip page makes the database
+walk past every row before it, so it slows down the deeper it is. A cursor page
+starts at its sort key in the index, so it should take about as long on page
+1,000 as on page 1.
+
+Usage:
+    python -m benchmarks.deep_pages [--meals 100000] [--pages 1 10 100 1000] [--limit 100] [--repeat 15]
+"""
+import argparse
+import uuid
+from datetime import date, timedelta
+
+from benchmarks import support
+from fastapi.testclient import TestClient
+from sqlalchemy import insert, select
+
+from app.db.database import engine
+from app.models.meal import Meal
+from app.models.user import User
+from app.utils.auth import create_access_token
+from app.utils.pagination import encode_cursor
+from main import app
+
+# Function to add a user with `count` meals, a few on each day so the sort key has ties, returning the user id
+def seed(email, count):
+    with engine.begin() as connection:
+        user_id = connection.execute(insert(User).returning(User.id), [{"email": email, "password_hash": "-"}]).scalar()
+        for offset in range(0, count, 10000):
+            connection.execute(insert(Meal), [
+                {"user_id": user_id, "name": f"Meal {n}", "meal_time": "Dinner", "planned_date": date(2000, 1, 1) + timedelta(days=n // 3)}
+                for n in range(offset, min(count, offset + 10000))
+            ])
+    return user_id
+
+# Function to make the cursor GET /meals/ returns for the page after row `position` (counting from 1)
+def cursor_after(user_id, position):
+    with engine.connect() as connection:
+        row = connection.execute(
+            select(Meal.planned_date, Meal.id).where(Meal.user_id == user_id)
+            .order_by(Meal.planned_date, Meal.id).offset(position - 1).limit(1)
+        ).one()
+    return encode_cursor([row.planned_date.isoformat(), row.id])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time deep pages of the meal list by cursor and by skip")
+    parser.add_argument("--meals", type=int, default=100000, help="Meals of the benchmark user")
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 10, 100, 1000], help="Page numbers to time")
+    parser.add_argument("--limit", type=int, default=100, help="Meals per page")
+    parser.add_argument("--repeat", type=int, default=15, help="Requests timed per page")
+    args = parser.parse_args(argv)
+
+    with TestClient(app) as client:
+        email = f"deep-pages-{uuid.uuid4().hex[:12]}@example.com"
+        user_id = seed(email, args.meals)
+        seed(f"other-{email}", args.meals)
+        headers = {"Authorization": f"Bearer {create_access_token(data={'sub': email})}"}
+
+        print(f"{'page':>6} {'skip ms':>8} {'cursor ms':>10}")
+        for page in args.pages:
+            position = (page - 1) * args.limit
+            params = {
+                "skip": {"limit": args.limit, "skip": position},
+                "cursor": {"limit": args.limit, "cursor": cursor_after(user_id, position)} if position else {"limit": args.limit},
+            }
+            results = {}
+            timings = {}
+            for name, query in params.items():
+                def fetch():
+                    response = client.get("/meals/", params=query, headers=headers)
+                    response.raise_for_status()
+                    results[name] = [meal["id"] for meal in response.json()["results"]]
+
+                fetch()  # Warm up
+                timings[name] = support.median_ms(fetch, args.repeat)
+            assert results["skip"] == results["cursor"], f"Page {page} differs between skip and cursor"
+            print(f"{page:>6} {timings['skip']:>8.2f} {timings['cursor']:>10.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Time rendering the checklist report email against the number of run items.
+
+Compares the compiled Jinja2 template with the string concatenation renderer it
+replaced, kept below as it was, and with that renderer escaping the same fields
+the template does. Escaping is what the template spends its time on: the old
+renderer put checklist titles, item text and notes into the email as raw HTML.
+
+Usage:
+    python -m benchmarks.report_rendering [--items 10 100 1000] [--repeat 50]
+"""
+import argparse
+from datetime import datetime
+from types import SimpleNamespace
+
+from markupsafe import escape
+
+from benchmarks import support
+from app.utils.email import generate_checklist_report_html
+
+# Function to render a report the way it was done before the template, optionally escaping like the template
+def concatenated_report_html(checklist, run, run_items, escape=str):
+    completed_count = sum(1 for item in run_items if item.completed)
+    total_count = len(run_items)
+    
+    html = f"""
+    <html>
+    <head>
+        <style>
+            body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
+            .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
+            h1 {{ color: #2c3e50; }}
+            .summary {{ background-color: #f8f9fa; padding: 15px; border-radius: 5px; margin-bottom: 20px; }}
+            .item {{ margin-bottom: 10px; }}
+            .completed {{ color: #28a745; }}
+            .not-completed {{ color: #dc3545; }}
+            .notes {{ font-style: italic; color: #6c757d; margin-left: 20px; }}
+        </style>
+    </head>
+    <body>
+        <div class="container">
+            <h1>{escape(checklist.title)}</h1>
+            <div class="summary">
+                <p><strong>Category:</strong> {escape(checklist.category or 'Not specified')}</p>
+                <p><strong>Completion Date:</strong> {run.completed_at.strftime('%Y-%m-%d %H:%M') if run.completed_at else 'Not completed'}</p>
+                <p><strong>Completion Status:</strong> {completed_count}/{total_count} items completed</p>
+                {f'<p><strong>Notes:</strong> {escape(run.notes)}</p>' if run.notes else ''}
+            </div>
+            <h2>Checklist Items</h2>
+    """
+    
+    for run_item in run_items:
+        item = run_item.item
+        status_class = "completed" if run_item.completed else "not-completed"
+        status_text = "✓ Completed" if run_item.completed else "✗ Not Completed"
+        required_text = "Required" if item.is_required else "Optional"
+        
+        html += f"""
+            <div class="item">
+                <p><strong>{escape(item.text)}</strong> ({required_text}) - <span class="{status_class}">{status_text}</span></p>
+                {f'<p class="notes">Notes: {escape(run_item.notes)}</p>' if run_item.notes else ''}
+            </div>
+        """
+    
+    html += """
+        </div>
+    </body>
+    </html>
+    """
+    
+    return html
+
+# Function to build a finished run of `count` items, every fifth with a note
+def make_report(count):
+    checklist = SimpleNamespace(title="Camping <weekend>", category="Trips")
+    run = SimpleNamespace(completed_at=datetime(2026, 1, 5, 18, 30), notes="Forgot the tent pegs & mallet")
+    run_items = [
+        SimpleNamespace(
+            item=SimpleNamespace(text=f"Item {n} & spares", is_required=n % 2 == 0),
+            completed=n % 3 != 0,
+            notes=f"Note {n}" if n % 5 == 0 else None
+        )
+        for n in range(count)
+    ]
+    return checklist, run, run_items
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time checklist report rendering against item count")
+    parser.add_argument("--items", type=int, nargs="+", default=[10, 100, 1000], help="Run item counts to time")
+    parser.add_argument("--repeat", type=int, default=50, help="Renders per item count")
+    args = parser.parse_args(argv)
+
+    renderers = {
+        "template": generate_checklist_report_html,
+        "concatenated": concatenated_report_html,
+        "concatenated+escape": lambda *report: concatenated_report_html(*report, escape=escape),
+    }
+
+    print(f"{'items':>6} " + " ".join(f"{name:>20}" for name in renderers) + "   (ms per report)")
+    for count in args.items:
+        report = make_report(count)
+        timings = [support.median_ms(lambda: render(*report), args.repeat) for render in renderers.values()]
+        print(f"{count:>6} " + " ".join(f"{timing:>20.3f}" for timing in timings))
+
+if __name__ == "__main__":
+    main()
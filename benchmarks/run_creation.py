@@ -0,0 +1,45 @@
+"""
+Time starting a checklist run against the number of items on the checklist.
+
+A run copies every checklist item into a run item with one INSERT ... SELECT,
+so starting a run should take about as long for 1,000 items as for 10.
+
+Usage:
+    python -m benchmarks.run_creation [--items 10 50 200 1000] [--repeat 20]
+"""
+import argparse
+
+from benchmarks import support
+from fastapi.testclient import TestClient
+
+from main import app
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time checklist run creation against item count")
+    parser.add_argument("--items", type=int, nargs="+", default=[10, 50, 200, 1000], help="Item counts to time")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs started per item count")
+    args = parser.parse_args(argv)
+
+    with TestClient(app) as client:
+        headers = support.register_user(client)
+
+        print(f"{'items':>6} {'ms/run':>8} {'ms/item':>8}")
+        for count in args.items:
+            response = client.post("/checklists/", json={
+                "title": f"Packing list ({count} items)",
+                "items": [{"text": f"Item {n}", "is_required": n % 2 == 0} for n in range(count)]
+            }, headers=headers)
+            response.raise_for_status()
+            checklist_id = response.json()["id"]
+
+            def start_run():
+                response = client.post("/checklists/runs", json={"checklist_id": checklist_id}, headers=headers)
+                response.raise_for_status()
+                assert len(response.json()["run_items"]) == count
+
+            start_run()  # Warm up
+            elapsed = support.median_ms(start_run, args.repeat)
+            print(f"{count:>6} {elapsed:>8.2f} {elapsed / count:>8.3f}")
+
+if __name__ == "__main__":
+    main()
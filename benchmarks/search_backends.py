@@ -0,0 +1,168 @@
+"""
+Compare Elasticsearch and PostgreSQL full-text search: query latency and what
+search indexing adds to every write.
+
+Needs a scratch PostgreSQL database in BENCHMARK_DATABASE_URL. Meals are added
+for a number of users, and writes are timed with and without the search_vectors
+migration, reporting time, WAL and table size per row. Searches are then timed
+through the PostgreSQL backend and, when ELASTICSEARCH_HOST answers, through a
+copy of the meals in a separate Elasticsearch index, whose indexing time and
+size per document are reported too. The benchmark index is deleted afterwards;
+the database keeps its rows and whatever search_vectors state it ended in.
+
+Usage:
+    BENCHMARK_DATABASE_URL=postgresql://... python -m benchmarks.search_backends [--users 100] [--meals 200] [--writes 5000]
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+from benchmarks import support
+from alembic import command
+from elasticsearch import Elasticsearch, helpers
+from sqlalchemy import insert, select, text
+
+from app.core.config import ELASTICSEARCH_HOST, ELASTICSEARCH_API_KEY
+from app.db.database import engine
+from app.db.migrate import get_alembic_config, upgrade_database
+from app.models.meal import Meal
+from app.models.user import User
+from app.utils.elastic import INDEX_DEFINITIONS, MEAL_INDEX, SEARCH_FIELDS, build_meal_document
+from app.utils.pg_search import PostgresSearchBackend
+
+# Index the meals are copied into, so the application's own indices are left alone
+BENCHMARK_INDEX = "fms-benchmark-meals"
+
+WORDS = [
+    "chicken", "tacos", "pasta", "salad", "soup", "curry", "rice", "beans", "pizza", "burger", "salmon",
+    "tofu", "noodles", "roast", "lentil", "spicy", "grilled", "baked", "lemon", "garlic", "tomato", "cheese"
+]
+QUERIES = ["chicken", "spicy tacos", "lemon garlic salmon", "soup", "baked cheese pasta"]
+
+# Function to make `count` meal rows for a user
+def make_meals(user_id, count, rng):
+    start = date(2024, 1, 1)
+    return [{
+        "user_id": user_id,
+        "name": " ".join(rng.sample(WORDS, 2)).title(),
+        "meal_time": rng.choice(["Breakfast", "Lunch", "Dinner"]),
+        "details": " ".join(rng.choices(WORDS, k=12)),
+        "planned_date": start + timedelta(days=rng.randrange(730)),
+    } for _ in range(count)]
+
+# Function to add users with their meals, returning the user ids
+def seed(users, meals_per_user, rng):
+    with engine.begin() as connection:
+        user_ids = connection.execute(insert(User).returning(User.id), [
+            {"email": f"search-bench-{time.time_ns()}-{n}@example.com", "password_hash": "-"} for n in range(users)
+        ]).scalars().all()
+        for user_id in user_ids:
+            connection.execute(insert(Meal), make_meals(user_id, meals_per_user, rng))
+    return user_ids
+
+# Function to time inserting meals in transactions of 100, like a stream of small API writes
+def measure_writes(user_ids, count, rng):
+    with engine.connect() as connection:
+        wal_before = connection.execute(text("SELECT pg_current_wal_insert_lsn()")).scalar()
+        size_before = connection.execute(text("SELECT pg_total_relation_size('meals')")).scalar()
+
+        started = time.perf_counter()
+        for offset in range(0, count, 100):
+            connection.execute(insert(Meal), [
+                meal for _ in range(min(100, count - offset)) for meal in make_meals(rng.choice(user_ids), 1, rng)
+            ])
+            connection.commit()
+        elapsed = time.perf_counter() - started
+
+        wal = connection.execute(text("SELECT pg_wal_lsn_diff(pg_current_wal_insert_lsn(), :lsn)"), {"lsn": wal_before}).scalar()
+        size = connection.execute(text("SELECT pg_total_relation_size('meals')")).scalar() - size_before
+    return {"ms/row": elapsed * 1000 / count, "WAL bytes/row": float(wal) / count, "table+index bytes/row": size / count}
+
+# Function to time searches of a backend, returning the median in milliseconds
+def measure_searches(search, user_ids, repeat):
+    queries = [(user_id, query) for user_id in user_ids[:20] for query in QUERIES]
+    for user_id, query in queries:
+        search(user_id, query)  # Warm up
+    return support.median_ms(lambda: [search(user_id, query) for user_id, query in queries], repeat) / len(queries)
+
+# Function to copy the meals into an Elasticsearch index and time searches of it
+def benchmark_elasticsearch(client, user_ids, repeat):
+    definition = INDEX_DEFINITIONS[MEAL_INDEX]
+    client.options(ignore_status=404).indices.delete(index=BENCHMARK_INDEX)
+    client.indices.create(index=BENCHMARK_INDEX, mappings=definition["mappings"])
+    try:
+        with engine.connect() as connection:
+            meals = connection.execute(select(Meal).where(Meal.user_id.in_(user_ids))).all()
+
+        started = time.perf_counter()
+        helpers.bulk(client, (
+            {"_index": BENCHMARK_INDEX, "_id": meal.id, "_source": build_meal_document(meal)} for meal in meals
+        ), chunk_size=1000)
+        client.indices.refresh(index=BENCHMARK_INDEX)
+        elapsed = time.perf_counter() - started
+
+        client.indices.forcemerge(index=BENCHMARK_INDEX, max_num_segments=1)
+        store = client.indices.stats(index=BENCHMARK_INDEX, metric="store")["indices"][BENCHMARK_INDEX]["primaries"]["store"]["size_in_bytes"]
+        writes = {"ms/row": elapsed * 1000 / len(meals), "WAL bytes/row": None, "table+index bytes/row": store / len(meals)}
+
+        # The query ElasticsearchBackend sends
+        fields = SEARCH_FIELDS[MEAL_INDEX]
+        latency = measure_searches(
+            lambda user_id, query: client.search(index=BENCHMARK_INDEX, size=10, query={"bool": {"must": [
+                {"term": {"user_id": user_id}}, {"multi_match": {"query": query, "fields": fields}}
+            ]}}),
+            user_ids, repeat
+        )
+        return writes, latency
+    finally:
+        client.options(ignore_status=404).indices.delete(index=BENCHMARK_INDEX)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare Elasticsearch and PostgreSQL search latency and write cost")
+    parser.add_argument("--users", type=int, default=100, help="Users to add meals for")
+    parser.add_argument("--meals", type=int, default=200, help="Meals per user")
+    parser.add_argument("--writes", type=int, default=5000, help="Meals inserted for each write measurement")
+    parser.add_argument("--repeat", type=int, default=5, help="Rounds of searches timed")
+    args = parser.parse_args(argv)
+
+    if engine.dialect.name != "postgresql":
+        print("Set BENCHMARK_DATABASE_URL to a scratch PostgreSQL database")
+        return 1
+
+    rng = random.Random(42)
+    alembic_config = get_alembic_config()
+    upgrade_database()
+    command.downgrade(alembic_config, "search_vectors@base")
+    user_ids = seed(args.users, args.meals, rng)
+
+    writes = {"PostgreSQL, no search": measure_writes(user_ids, args.writes, rng)}
+    command.upgrade(alembic_config, "search_vectors@head")
+    writes["PostgreSQL search"] = measure_writes(user_ids, args.writes, rng)
+
+    backend = PostgresSearchBackend(engine, {MEAL_INDEX: "meals"})
+    backend.setup()
+    fields = SEARCH_FIELDS[MEAL_INDEX]
+    latency = {"PostgreSQL search": measure_searches(
+        lambda user_id, query: backend.search(MEAL_INDEX, user_id, query, fields), user_ids, args.repeat
+    )}
+
+    client = Elasticsearch(ELASTICSEARCH_HOST, api_key=ELASTICSEARCH_API_KEY or None, request_timeout=60)
+    if client.options(request_timeout=2).ping():
+        writes["Elasticsearch"], latency["Elasticsearch"] = benchmark_elasticsearch(client, user_ids, args.repeat)
+    else:
+        print(f"Elasticsearch at {ELASTICSEARCH_HOST} is not reachable, only PostgreSQL is measured")
+
+    print(f"\n{'writes':<24} {'ms/row':>8} {'WAL bytes/row':>14} {'table+index bytes/row':>22}")
+    for name, row in writes.items():
+        wal = f"{row['WAL bytes/row']:>14.0f}" if row["WAL bytes/row"] is not None else f"{'-':>14}"
+        print(f"{name:<24} {row['ms/row']:>8.3f} {wal} {row['table+index bytes/row']:>22.0f}")
+
+    print(f"\n{'searches':<24} {'ms/search':>10}   ({args.users * args.meals} meals, {args.meals} per user)")
+    for name, milliseconds in latency.items():
+        print(f"{name:<24} {milliseconds:>10.3f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
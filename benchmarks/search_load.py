@@ -0,0 +1,142 @@
+"""
+Load test of concurrent searches against a fake Elasticsearch with a fixed latency.
+
+The fake server answers every request after `--latency` milliseconds, so the
+benchmark measures how many searches one worker keeps in flight rather than
+Elasticsearch itself. Each round runs the same number of concurrent clients
+through both search paths of app.utils.elastic:
+
+- threadpool: the sync client called through run_in_threadpool, as the sync
+  routes did, which holds a threadpool worker for every search in flight
+- async: the AsyncElasticsearch client awaited on the event loop
+
+and reports searches per second, latency and how late a 10 ms timer on the
+event loop fired at worst (a blocked loop shows up there).
+
+Usage:
+    python -m benchmarks.search_load [--clients 1 10 50 100 200 400] [--latency 50] [--searches 5]
+"""
+import argparse
+import asyncio
+import statistics
+import threading
+import time
+
+from benchmarks import support
+from aiohttp import web
+from elasticsearch import AsyncElasticsearch, Elasticsearch
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import ES_ASYNC_MAX_CONNECTIONS
+from app.utils import elastic
+
+EMPTY_SEARCH_RESPONSE = {
+    "took": 1, "timed_out": False,
+    "_shards": {"total": 1, "successful": 1, "skipped": 0, "failed": 0},
+    "hits": {"total": {"value": 0, "relation": "eq"}, "max_score": None, "hits": []}
+}
+
+class FakeElasticsearchServer:
+    """HTTP server on its own thread and event loop that answers every request with no hits after a delay."""
+
+    def __init__(self, latency_seconds):
+        self.latency_seconds = latency_seconds
+        self.url = None
+        self._loop = asyncio.new_event_loop()
+        self._started = threading.Event()
+
+    async def handle(self, request):
+        await asyncio.sleep(self.latency_seconds)
+        # The client checks that it is talking to Elasticsearch
+        return web.json_response(EMPTY_SEARCH_RESPONSE, headers={"X-Elastic-Product": "Elasticsearch"})
+
+    async def _serve(self):
+        app = web.Application()
+        app.router.add_route("*", "/{path:.*}", self.handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0, backlog=1024)
+        await site.start()
+        self.url = f"http://127.0.0.1:{runner.addresses[0][1]}"
+        self._started.set()
+
+    def start(self):
+        threading.Thread(target=self._loop.run_forever, name="fake-elasticsearch", daemon=True).start()
+        asyncio.run_coroutine_threadsafe(self._serve(), self._loop)
+        self._started.wait(10)
+        return self.url
+
+# Function to measure how late a 10 ms timer fires on the event loop until `done` is set
+async def watch_loop_lag(done, lags):
+    while not done.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        lags.append((time.perf_counter() - start - 0.01) * 1000)
+
+# Function to run `clients` concurrent clients doing `searches` searches each through `search`
+async def run_round(search, clients, searches):
+    latencies = []
+    lags = []
+    done = asyncio.Event()
+
+    async def client(number):
+        for n in range(searches):
+            start = time.perf_counter()
+            await search(number, f"tacos {n}")
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    watcher = asyncio.create_task(watch_loop_lag(done, lags))
+    started = time.perf_counter()
+    await asyncio.gather(*(client(number) for number in range(clients)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await watcher
+
+    latencies.sort()
+    return {
+        "searches/s": len(latencies) / elapsed,
+        "p50 ms": statistics.median(latencies),
+        "p99 ms": latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))],
+        "loop lag ms": max(lags, default=0.0)
+    }
+
+async def run(args, url):
+    # The application's clients, as configured in app.utils.elastic, pointed at the fake server
+    elastic.es_client = Elasticsearch(url, request_timeout=60, max_retries=0)
+    elastic.async_es_client = AsyncElasticsearch(
+        url, request_timeout=60, max_retries=0, connections_per_node=ES_ASYNC_MAX_CONNECTIONS
+    )
+    elastic.elasticsearch_indices_ready = True
+    elastic.es_breaker.reset()
+    elastic.search_cache.enabled = False
+
+    paths = {
+        "threadpool": lambda user_id, query: run_in_threadpool(elastic.search_meals, user_id, query),
+        "async": elastic.search_meals_async,
+    }
+
+    print(f"{'clients':>7} {'path':>10} {'searches/s':>11} {'p50 ms':>8} {'p99 ms':>8} {'loop lag ms':>12}")
+    try:
+        for clients in args.clients:
+            for name, search in paths.items():
+                await search(0, "warm up")
+                row = await run_round(search, clients, args.searches)
+                print(
+                    f"{clients:>7} {name:>10} {row['searches/s']:>11.0f} {row['p50 ms']:>8.1f} "
+                    f"{row['p99 ms']:>8.1f} {row['loop lag ms']:>12.1f}"
+                )
+    finally:
+        await elastic.async_es_client.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test concurrent searches against a fake Elasticsearch")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 10, 50, 100, 200, 400], help="Concurrent clients per round")
+    parser.add_argument("--latency", type=float, default=50, help="Milliseconds the fake Elasticsearch takes per request")
+    parser.add_argument("--searches", type=int, default=5, help="Searches per client and round")
+    args = parser.parse_args(argv)
+
+    url = FakeElasticsearchServer(args.latency / 1000).start()
+    asyncio.run(run(args, url))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Shared setup of the benchmarks that drive the API.
+
+Importing this module points the app at a throwaway SQLite database with the
+external services switched off, like the tests do, before anything reads
+app.core.config. Set BENCHMARK_DATABASE_URL to run against another database,
+e.g. a scratch PostgreSQL one; its tables are migrated and filled with
+benchmark users' rows.
+"""
+import os
+import statistics
+import tempfile
+import time
+import uuid
+
+os.environ["ENVIRONMENT"] = "test"
+os.environ["DATABASE_URL"] = os.getenv(
+    "BENCHMARK_DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='fms-bench-')}/fms_bench.db"
+)
+os.environ["DATABASE_REPLICA_URLS"] = ""
+os.environ["ENABLE_ELASTICSEARCH"] = "false"
+os.environ["ENABLE_LOCAL_SEARCH"] = "false"
+os.environ["ENABLE_EMAIL_WORKER"] = "false"
+os.environ["SENDGRID_API_KEY"] = ""
+
+# Function to register a fresh user and get the headers of their requests
+def register_user(client):
+    email = f"bench-{uuid.uuid4().hex[:12]}@example.com"
+    response = client.post("/auth/register", json={"email": email, "password": "password"})
+    response.raise_for_status()
+    response = client.post("/auth/token", data={"username": email, "password": "password"})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+# Function to time a call, returning the median of `repeat` runs in milliseconds
+def median_ms(func, repeat=20):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
@@ -3,28 +3,40 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.templating import Jinja2Templates
 import logging
+import threading
 
 from app.api.auth import router as auth_router
 from app.api.checklists import router as checklists_router
 from app.api.carpool import router as carpool_router
 from app.api.meals import router as meals_router
 from app.api.pages import router as pages_router
-from app.db.database import Base, engine
-from app.utils.elastic import setup_elasticsearch_indices
-from app.core.config import ENVIRONMENT
+from app.api.metrics import router as metrics_router
+from app.db.database import async_engine
+from app.db.migrate import upgrade_database
+from app.db.replicas import replica_router, start_replica_checks, stop_replica_checks
+from app.utils.elastic import (
+    setup_elasticsearch_indices, setup_postgres_search, start_bulk_indexer, stop_bulk_indexer,
+    start_elasticsearch_prober, stop_elasticsearch_prober, close_async_elasticsearch
+)
+from app.utils.email import start_email_worker, stop_email_worker
+from app.utils.reindex import warm_local_search
+from app.core.config import ENVIRONMENT, ENABLE_LOCAL_SEARCH, ENABLE_METRICS_ENDPOINT, METRICS_TOKEN, DB_AUTO_MIGRATE
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Create database tables
-logger.info("Creating database tables...")
-Base.metadata.create_all(bind=engine)
+# Create or upgrade the database tables
+if DB_AUTO_MIGRATE:
+    upgrade_database()
 
 # Initialize Elasticsearch indices
 logger.info("Setting up Elasticsearch indices...")
 setup_elasticsearch_indices()
 
+# Check the full-text search columns when PostgreSQL search is configured
+setup_postgres_search()
+
 # Create FastAPI app
 app = FastAPI(
     title="Family Management Solution",
@@ -46,6 +58,34 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Start the background workers with the application and drain them on shutdown
+@app.on_event("startup")
+def startup_workers():
+    start_email_worker()
+    start_bulk_indexer()
+    start_elasticsearch_prober()
+    start_replica_checks()
+    
+    # Fill the local search index in the background so startup isn't held up
+    if ENABLE_LOCAL_SEARCH:
+        threading.Thread(target=warm_local_search, name="local-search-warmup", daemon=True).start()
+
+@app.on_event("shutdown")
+def shutdown_workers():
+    stop_replica_checks()
+    stop_elasticsearch_prober()
+    stop_bulk_indexer()
+    stop_email_worker()
+
+@app.on_event("shutdown")
+async def close_search_clients():
+    await close_async_elasticsearch()
+
+@app.on_event("shutdown")
+async def close_database_connections():
+    await async_engine.dispose()
+    await replica_router.dispose()
+
 # Mount static files
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
@@ -59,6 +99,13 @@ app.include_router(carpool_router)
 app.include_router(meals_router)
 app.include_router(pages_router)
 
+# Internal metrics, off unless enabled, and only served to callers with METRICS_TOKEN
+if ENABLE_METRICS_ENDPOINT:
+    if METRICS_TOKEN:
+        app.include_router(metrics_router)
+    else:
+        logger.warning("ENABLE_METRICS_ENDPOINT is set but METRICS_TOKEN is empty, so /internal/metrics is not served")
+
 # Remove the default root endpoint since we have a pages router now
 # @app.get("/")
 # async def root():
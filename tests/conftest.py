@@ -0,0 +1,57 @@
+import os
+import tempfile
+from contextlib import contextmanager
+from itertools import count
+
+import pytest
+
+# Point the app at a throwaway SQLite database with the external services switched off,
+# before anything reads app.core.config
+os.environ["ENVIRONMENT"] = "test"
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='fms-test-')}/fms_test.db"
+os.environ["DATABASE_REPLICA_URLS"] = ""
+os.environ["ENABLE_ELASTICSEARCH"] = "false"
+os.environ["ENABLE_LOCAL_SEARCH"] = "false"
+os.environ["ENABLE_EMAIL_WORKER"] = "false"
+os.environ["SENDGRID_API_KEY"] = ""
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+import main
+from app.db.database import async_engine
+
+_user_numbers = count(1)
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+# Headers of a freshly registered user, so each test starts with no rows of its own
+@pytest.fixture
+def auth_headers(client):
+    email = f"user{next(_user_numbers)}@example.com"
+    response = client.post("/auth/register", json={"email": email, "password": "password"})
+    assert response.status_code == 201, response.text
+    response = client.post("/auth/token", data={"username": email, "password": "password"})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+# Counts the statements the API sends to the database inside the block
+@pytest.fixture
+def count_queries():
+    @contextmanager
+    def counting():
+        statements = []
+        
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        
+        event.listen(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    
+    return counting
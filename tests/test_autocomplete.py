@@ -0,0 +1,54 @@
+"""
+AutocompleteIndex keeps one user's trie walks from holding up other users.
+"""
+import threading
+
+from app.utils.autocomplete import AutocompleteIndex, PrefixTrie
+
+class FakeSession:
+    def __init__(self, texts):
+        self.texts = texts
+    
+    def execute(self, query):
+        return list(self.texts.items())
+
+def test_slow_walk_does_not_block_other_users(monkeypatch):
+    index = AutocompleteIndex()
+    index.complete(FakeSession({"Tacos": 3}), 1, "meals", "ta")
+    index.complete(FakeSession({"Soup": 1}), 2, "meals", "so")
+    
+    # User 1's next walk stalls until released
+    walking, release = threading.Event(), threading.Event()
+    complete = PrefixTrie.complete
+    
+    def slow_complete(trie, prefix, limit):
+        if "tacos" in trie.display:
+            walking.set()
+            release.wait(5)
+        return complete(trie, prefix, limit)
+    
+    monkeypatch.setattr(PrefixTrie, "complete", slow_complete)
+    slow_walk = threading.Thread(target=index.complete, args=(None, 1, "meals", "ta"))
+    slow_walk.start()
+    assert walking.wait(5)
+    
+    # Meanwhile user 2's writes and lookups go through, while user 1's write waits for the walk
+    results = {}
+    other_user = threading.Thread(target=lambda: (
+        index.update(2, "meals", new_text="Soup dumplings"),
+        results.setdefault("completions", index.complete(None, 2, "meals", "so"))
+    ))
+    same_user = threading.Thread(target=index.update, args=(1, "meals"), kwargs={"new_text": "Taco salad"})
+    other_user.start()
+    same_user.start()
+    other_user.join(2)
+    same_user.join(0.2)
+    
+    assert not other_user.is_alive()
+    assert results["completions"] == ["Soup", "Soup dumplings"]
+    assert same_user.is_alive()
+    
+    release.set()
+    slow_walk.join(5)
+    same_user.join(5)
+    assert index.complete(None, 1, "meals", "ta") == ["Tacos", "Taco salad"]
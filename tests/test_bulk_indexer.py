@@ -0,0 +1,129 @@
+"""
+BulkIndexer against a fake Elasticsearch client.
+"""
+import threading
+
+import pytest
+
+from app.utils.elastic import BulkIndexer
+
+class FakeElasticsearch:
+    def __init__(self, failures=0):
+        self.requests = []
+        self.failures = failures
+        self.received = threading.Event()
+    
+    def bulk(self, operations):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("Elasticsearch is unreachable")
+        
+        self.requests.append(operations)
+        self.received.set()
+        items = [{next(iter(operation)): {"status": 200}} for operation in operations if "index" in operation or "delete" in operation]
+        return {"errors": False, "items": items}
+    
+    # (action, index, id, document) of every operation sent, in order
+    def actions(self):
+        actions = []
+        for operations in self.requests:
+            operations = iter(operations)
+            for operation in operations:
+                action, meta = next(iter(operation.items()))
+                document = next(operations) if action == "index" else None
+                actions.append((action, meta["_index"], meta["_id"], document))
+        return actions
+
+@pytest.fixture
+def es():
+    return FakeElasticsearch()
+
+@pytest.fixture
+def make_indexer(es):
+    indexers = []
+    
+    def make(**kwargs):
+        indexer = BulkIndexer(es, **kwargs)
+        indexers.append(indexer)
+        return indexer
+    
+    yield make
+    for indexer in indexers:
+        indexer.stop()
+
+def test_flushes_right_away_without_background_thread(es, make_indexer):
+    indexer = make_indexer()
+    
+    indexer.enqueue("meals", 1, {"name": "Tacos"})
+    
+    assert es.actions() == [("index", "meals", "1", {"name": "Tacos"})]
+    assert indexer.pending_count() == 0
+
+def test_flushes_when_batch_is_full(es, make_indexer):
+    indexer = make_indexer(max_actions=3, flush_seconds=60)
+    indexer.start()
+    
+    indexer.enqueue("meals", 1, {"name": "Tacos"})
+    indexer.enqueue("meals", 2, {"name": "Soup"})
+    assert not es.received.wait(0.2)
+    
+    indexer.enqueue("meals", 3, None)
+    assert es.received.wait(5)
+    assert [action[:3] for action in es.actions()] == [("index", "meals", "1"), ("index", "meals", "2"), ("delete", "meals", "3")]
+    assert indexer.stats["bulk_requests"] == 1
+
+def test_flushes_on_interval(es, make_indexer):
+    indexer = make_indexer(max_actions=100, flush_seconds=0.05)
+    indexer.start()
+    
+    indexer.enqueue("meals", 1, {"name": "Tacos"})
+    
+    assert es.received.wait(5)
+    assert es.actions() == [("index", "meals", "1", {"name": "Tacos"})]
+
+def test_coalesces_repeated_writes_to_a_document(es, make_indexer):
+    indexer = make_indexer(max_actions=100, flush_seconds=60)
+    indexer.start()
+    
+    indexer.enqueue("meals", 1, {"name": "Tacos"})
+    indexer.enqueue("meals", 2, {"name": "Soup"})
+    indexer.enqueue("meals", 1, {"name": "Fish tacos"})
+    indexer.enqueue("carpool", 1, {"description": "School run"})
+    indexer.enqueue("meals", 2, None)
+    indexer.stop()
+    
+    # One operation per document, the latest one, in the order of the latest writes
+    assert es.actions() == [
+        ("index", "meals", "1", {"name": "Fish tacos"}),
+        ("index", "carpool", "1", {"description": "School run"}),
+        ("delete", "meals", "2", None)
+    ]
+    assert indexer.stats["coalesced"] == 2
+
+def test_stop_drains_queue_in_batches(es, make_indexer):
+    indexer = make_indexer(max_actions=2, flush_seconds=60)
+    indexer.start()
+    
+    # Full batches wake the thread, so pause it to leave the queue for stop() to drain
+    with indexer._flush_lock:
+        for doc_id in range(5):
+            indexer.enqueue("meals", doc_id, {"name": f"Meal {doc_id}"})
+        assert es.requests == []
+    indexer.stop()
+    
+    assert [action[2] for action in es.actions()] == ["0", "1", "2", "3", "4"]
+    assert all(len(operations) <= 4 for operations in es.requests)
+    assert indexer.pending_count() == 0
+
+def test_failed_bulk_request_is_retried_on_next_flush():
+    es = FakeElasticsearch(failures=1)
+    indexer = BulkIndexer(es, max_actions=100, flush_seconds=60)
+    
+    indexer.enqueue("meals", 1, {"name": "Tacos"})
+    assert indexer.pending_count() == 1
+    
+    # The failed operation stays queued, so the next write to the document replaces it
+    indexer.enqueue("meals", 1, {"name": "Fish tacos"})
+    
+    assert es.actions() == [("index", "meals", "1", {"name": "Fish tacos"})]
+    assert indexer.pending_count() == 0
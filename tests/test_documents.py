@@ -0,0 +1,38 @@
+"""
+Search documents hash the same however the database driver returned their timestamps.
+"""
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from app.utils.elastic import build_carpool_event_document, build_checklist_document, build_meal_document
+
+UTC_TIME = datetime(2026, 1, 5, 13, 30, tzinfo=timezone.utc)
+EASTERN_TIME = UTC_TIME.astimezone(timezone(timedelta(hours=-5)))
+
+def meal(created_at):
+    return SimpleNamespace(
+        id=1, user_id=2, name="Tacos", meal_time="Dinner", details=None,
+        planned_date=UTC_TIME.date(), created_at=created_at
+    )
+
+def carpool_event(time):
+    return SimpleNamespace(
+        id=1, user_id=2, description="School run", destination="School", notes=None,
+        drop_off_time=time, created_at=time
+    )
+
+def checklist(created_at):
+    return SimpleNamespace(id=1, user_id=2, title="Camping", category="Trips", created_at=created_at)
+
+def test_documents_hash_equal_across_utc_offsets():
+    assert EASTERN_TIME.isoformat() != UTC_TIME.isoformat()
+    
+    assert build_meal_document(meal(UTC_TIME)) == build_meal_document(meal(EASTERN_TIME))
+    assert build_carpool_event_document(carpool_event(UTC_TIME)) == build_carpool_event_document(carpool_event(EASTERN_TIME))
+    assert build_checklist_document(checklist(UTC_TIME), []) == build_checklist_document(checklist(EASTERN_TIME), [])
+
+def test_timestamps_without_offset_are_utc():
+    document = build_meal_document(meal(UTC_TIME.replace(tzinfo=None)))
+    
+    assert document == build_meal_document(meal(UTC_TIME))
+    assert document["created_at"] == "2026-01-05T13:30:00+00:00"
@@ -0,0 +1,97 @@
+"""
+Email outbox delivery with a stub in place of SendGrid.
+"""
+from sqlalchemy.exc import OperationalError
+
+from app.db.database import SessionLocal
+from app.models.email_outbox import EmailOutbox
+from app.utils.email import EmailDeliveryWorker, queue_checklist_report
+
+class StubSender:
+    def __init__(self, results=None):
+        self.results = list(results or [])
+        self.sent = []
+    
+    def __call__(self, recipient, subject, html_content):
+        self.sent.append((recipient, subject))
+        return self.results.pop(0) if self.results else True
+
+def queue_reports(count):
+    db = SessionLocal()
+    try:
+        entries = [queue_checklist_report(db, f"parent{i}@example.com", f"Report {i}", "<p>Done</p>") for i in range(count)]
+        db.commit()
+        return [entry.id for entry in entries]
+    finally:
+        db.close()
+
+def outbox_rows(ids):
+    db = SessionLocal()
+    try:
+        return {row.id: row for row in db.query(EmailOutbox).filter(EmailOutbox.id.in_(ids))}
+    finally:
+        db.close()
+
+def clear_outbox():
+    db = SessionLocal()
+    try:
+        db.query(EmailOutbox).delete()
+        db.commit()
+    finally:
+        db.close()
+
+def test_drain_delivers_queued_reports(client):
+    clear_outbox()
+    ids = queue_reports(3)
+    sender = StubSender()
+    worker = EmailDeliveryWorker(concurrency=4, poll_seconds=0.1, send_func=sender)
+    
+    assert worker.drain_once() == 3
+    
+    assert sorted(recipient for recipient, _ in sender.sent) == [f"parent{i}@example.com" for i in range(3)]
+    assert {row.status for row in outbox_rows(ids).values()} == {"sent"}
+    assert worker.stats()["in_flight"] == 0
+
+def test_failed_send_is_retried_later(client):
+    clear_outbox()
+    ids = queue_reports(1)
+    worker = EmailDeliveryWorker(concurrency=1, poll_seconds=0.1, retry_base_seconds=60, send_func=StubSender([False]))
+    
+    assert worker.drain_once() == 1
+    
+    row = outbox_rows(ids)[ids[0]]
+    assert (row.status, row.attempts) == ("pending", 1)
+    # Backed off, so the next drain finds nothing due
+    assert worker.drain_once() == 0
+
+def test_failed_claims_release_their_slots(client):
+    clear_outbox()
+    ids = queue_reports(2)
+    sender = StubSender()
+    worker = EmailDeliveryWorker(concurrency=2, poll_seconds=0.1, send_func=sender)
+    
+    claim = worker._claim
+    def failing_claim(limit):
+        raise OperationalError("SELECT ... FOR UPDATE", {}, Exception("lock timeout"))
+    worker._claim = failing_claim
+    
+    for _ in range(5):
+        try:
+            worker.drain_once()
+        except OperationalError:
+            pass
+        else:
+            raise AssertionError("The claim error should reach the caller")
+    
+    # Once the database is back, every slot is free again
+    limits = []
+    def recording_claim(limit):
+        limits.append(limit)
+        return claim(limit)
+    worker._claim = recording_claim
+    
+    assert worker.drain_once() == 2
+    assert limits == [2]
+    assert len(sender.sent) == 2
+    assert {row.status for row in outbox_rows(ids).values()} == {"sent"}
+    assert worker.stats()["in_flight"] == 0
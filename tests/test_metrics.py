@@ -0,0 +1,36 @@
+"""
+The internal metrics endpoint is off by default and needs the metrics token.
+"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import metrics
+
+def test_metrics_are_not_served_by_default(client):
+    assert client.get("/internal/metrics").status_code == 404
+
+@pytest.fixture
+def metrics_client(monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", "s3cret-token")
+    app = FastAPI()
+    app.include_router(metrics.router)
+    return TestClient(app)
+
+def test_metrics_need_the_token(metrics_client, auth_headers):
+    assert metrics_client.get("/internal/metrics").status_code == 401
+    assert metrics_client.get("/internal/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    # A user's login token isn't enough
+    assert metrics_client.get("/internal/metrics", headers=auth_headers).status_code == 401
+    
+    response = metrics_client.get("/internal/metrics", headers={"Authorization": "Bearer s3cret-token"})
+    assert response.status_code == 200
+    assert "async_database_pool" in response.json()
+
+def test_metrics_refuse_everyone_without_a_token(monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", "")
+    app = FastAPI()
+    app.include_router(metrics.router)
+    
+    response = TestClient(app).get("/internal/metrics", headers={"Authorization": "Bearer "})
+    assert response.status_code == 401
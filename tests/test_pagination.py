@@ -0,0 +1,129 @@
+"""
+The list endpoints page by keyset cursor: walking the pages gives every row once, in
+order, and a deep page is fetched without OFFSET.
+"""
+import re
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event, select
+from sqlalchemy.dialects import postgresql
+
+from app.db.database import async_engine
+from app.models.meal import Meal
+from app.utils.pagination import encode_cursor, keyset_query
+
+# Function to add `count` meals and carpool events, several on each day so the sort key has ties
+def add_meals_and_events(client, headers, count):
+    for n in range(count):
+        day = n // 3 + 1
+        response = client.post("/meals/", json={
+            "name": f"Meal {n}", "meal_time": "Dinner", "planned_date": f"2026-02-{day:02d}"
+        }, headers=headers)
+        assert response.status_code == 201, response.text
+        response = client.post("/carpool/events", json={
+            "description": f"Drive {n}", "destination": "School", "drop_off_time": f"2026-02-{day:02d}T08:00:00"
+        }, headers=headers)
+        assert response.status_code == 201, response.text
+
+# Function to get one page of a list endpoint
+def get_page(client, headers, url, **params):
+    response = client.get(url, params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+# Function to follow next_cursor from the first page to the last, returning the ids in order
+def walk(client, headers, url, limit):
+    ids = []
+    page = get_page(client, headers, url, limit=limit)
+    while True:
+        ids.extend(row["id"] for row in page["results"])
+        if page["next_cursor"] is None:
+            return ids
+        page = get_page(client, headers, url, limit=limit, cursor=page["next_cursor"])
+
+# Function to add `count` one-item checklists, returning their ids
+def create_checklists(client, headers, count):
+    ids = []
+    for n in range(count):
+        response = client.post("/checklists/", json={
+            "title": f"Checklist {n}", "category": "Trips", "items": [{"text": "Item", "is_required": True}]
+        }, headers=headers)
+        assert response.status_code == 201, response.text
+        ids.append(response.json()["id"])
+    return ids
+
+# Rows for every list endpoint, 10 each, returning the endpoint URLs
+@pytest.fixture
+def list_urls(client, auth_headers):
+    add_meals_and_events(client, auth_headers, 10)
+    checklist_ids = create_checklists(client, auth_headers, 10)
+    for _ in range(10):
+        response = client.post("/checklists/runs", json={"checklist_id": checklist_ids[0]}, headers=auth_headers)
+        assert response.status_code == 201, response.text
+    return ["/meals/", "/carpool/events", "/checklists/", "/checklists/overview", f"/checklists/{checklist_ids[0]}/runs"]
+
+@pytest.mark.parametrize("limit", [1, 3, 4, 10])
+def test_cursor_pages_cover_every_row_once_in_order(client, auth_headers, list_urls, limit):
+    for url in list_urls:
+        expected = [row["id"] for row in get_page(client, auth_headers, url, limit=1000)["results"]]
+        assert len(expected) == 10
+        
+        assert walk(client, auth_headers, url, limit) == expected, url
+
+# Function to capture the statements of the API's engine with their parameters
+@contextmanager
+def capture_statements():
+    statements = []
+    
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+    
+    event.listen(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+# Function to get how many rows a statement skips with OFFSET
+def skipped_rows(statement, parameters):
+    if not re.search(r"\bOFFSET\b", statement, re.IGNORECASE):
+        return 0
+    # SQLite always renders OFFSET, as its last parameter (0 without an offset)
+    assert statement.rstrip().endswith("OFFSET ?"), statement
+    return parameters[-1]
+
+def test_deep_cursor_page_does_not_use_offset(client, auth_headers, list_urls):
+    for url in list_urls:
+        # The cursor of the last page
+        page = get_page(client, auth_headers, url, limit=3, skip=6)
+        cursor = page["next_cursor"]
+        assert cursor is not None
+        
+        with capture_statements() as statements:
+            last_page = get_page(client, auth_headers, url, limit=3, cursor=cursor)
+        assert len(last_page["results"]) == 1
+        assert [skipped_rows(*statement) for statement in statements] == [0] * len(statements), url
+        
+        # The same page by skip does skip rows, so the check above would have caught it
+        with capture_statements() as statements:
+            assert get_page(client, auth_headers, url, limit=3, skip=9)["results"] == last_page["results"]
+        assert 9 in [skipped_rows(*statement) for statement in statements], url
+
+def test_cursor_query_has_no_offset_on_postgresql():
+    columns = [Meal.planned_date, Meal.id]
+    cursor = encode_cursor(["2026-02-01", 1000000])
+    
+    query = keyset_query(select(Meal).where(Meal.user_id == 1), columns, 100, cursor)
+    sql = str(query.compile(dialect=postgresql.dialect()))
+    
+    assert "OFFSET" not in sql
+    assert "(meals.planned_date, meals.id) > (" in sql
+
+def test_cursor_and_skip_together_are_rejected(client, auth_headers, list_urls):
+    cursor = get_page(client, auth_headers, "/meals/", limit=3)["next_cursor"]
+    
+    response = client.get("/meals/", params={"limit": 3, "skip": 3, "cursor": cursor}, headers=auth_headers)
+    assert response.status_code == 400
+    response = client.get("/meals/", params={"cursor": "not-a-cursor"}, headers=auth_headers)
+    assert response.status_code == 400
@@ -0,0 +1,98 @@
+"""
+The list endpoints load their rows in a fixed number of queries, however many rows there are.
+"""
+import pytest
+
+def create_checklists(client, headers, count, items=3):
+    ids = []
+    for i in range(count):
+        response = client.post("/checklists/", json={
+            "title": f"Checklist {i}",
+            "category": "Trips",
+            "items": [{"text": f"Item {n}", "is_required": n % 2 == 0} for n in range(items)]
+        }, headers=headers)
+        assert response.status_code == 201, response.text
+        ids.append(response.json()["id"])
+    return ids
+
+# Function to count the statements of one request, checking it succeeded
+def queries_for(client, count_queries, url, headers):
+    with count_queries() as statements:
+        response = client.get(url, headers=headers)
+    assert response.status_code == 200, response.text
+    return len(statements), response.json()
+
+@pytest.mark.parametrize("url", ["/checklists/", "/checklists/overview"])
+def test_checklist_lists_use_fixed_number_of_queries(client, auth_headers, count_queries, url):
+    create_checklists(client, auth_headers, 2)
+    few_queries, page = queries_for(client, count_queries, url, auth_headers)
+    assert len(page["results"]) == 2
+    
+    create_checklists(client, auth_headers, 10)
+    many_queries, page = queries_for(client, count_queries, url, auth_headers)
+    assert len(page["results"]) == 12
+    assert all(len(checklist["items"]) == 3 for checklist in page["results"])
+    
+    assert many_queries == few_queries
+
+def test_checklist_detail_loads_items_with_checklist(client, auth_headers, count_queries):
+    checklist_id = create_checklists(client, auth_headers, 1)[0]
+    
+    queries, checklist = queries_for(client, count_queries, f"/checklists/{checklist_id}", auth_headers)
+    assert len(checklist["items"]) == 3
+    # The user, the checklist and its items
+    assert queries == 3
+
+def test_checklist_runs_use_fixed_number_of_queries(client, auth_headers, count_queries):
+    checklist_id = create_checklists(client, auth_headers, 1)[0]
+    url = f"/checklists/{checklist_id}/runs"
+    
+    def start_run():
+        response = client.post("/checklists/runs", json={"checklist_id": checklist_id}, headers=auth_headers)
+        assert response.status_code == 201, response.text
+    
+    start_run()
+    few_queries, page = queries_for(client, count_queries, url, auth_headers)
+    assert len(page["results"]) == 1
+    
+    for _ in range(8):
+        start_run()
+    many_queries, page = queries_for(client, count_queries, url, auth_headers)
+    assert len(page["results"]) == 9
+    assert all(len(run["run_items"]) == 3 for run in page["results"])
+    
+    assert many_queries == few_queries
+
+def test_run_creation_uses_fixed_number_of_queries(client, auth_headers, count_queries):
+    def start_run(checklist_id):
+        with count_queries() as statements:
+            response = client.post("/checklists/runs", json={"checklist_id": checklist_id}, headers=auth_headers)
+        assert response.status_code == 201, response.text
+        return len(statements), response.json()
+    
+    short_list = create_checklists(client, auth_headers, 1, items=2)[0]
+    long_list = create_checklists(client, auth_headers, 1, items=200)[0]
+    
+    few_queries, run = start_run(short_list)
+    assert len(run["run_items"]) == 2
+    many_queries, run = start_run(long_list)
+    assert len(run["run_items"]) == 200
+    
+    assert many_queries == few_queries
+
+def test_meal_and_carpool_lists_use_fixed_number_of_queries(client, auth_headers, count_queries):
+    def add_rows(start, count):
+        for day in range(start, start + count):
+            client.post("/meals/", json={
+                "name": f"Meal {day}", "meal_time": "Dinner", "planned_date": f"2026-01-{day:02d}"
+            }, headers=auth_headers)
+            client.post("/carpool/events", json={
+                "description": f"Drive {day}", "destination": "School", "drop_off_time": f"2026-01-{day:02d}T08:00:00"
+            }, headers=auth_headers)
+    
+    add_rows(1, 2)
+    few = [queries_for(client, count_queries, url, auth_headers)[0] for url in ("/meals/", "/carpool/events")]
+    add_rows(3, 10)
+    many = [queries_for(client, count_queries, url, auth_headers)[0] for url in ("/meals/", "/carpool/events")]
+    
+    assert many == few
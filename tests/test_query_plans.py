@@ -0,0 +1,16 @@
+"""
+The hot list and checklist queries are answered from an index, not a full table scan.
+"""
+import pytest
+
+from app.db.check_indexes import HOT_QUERIES, check_index
+from app.db.database import engine
+
+# The client starts the app, which migrates the test database first
+@pytest.mark.parametrize("name", list(HOT_QUERIES))
+def test_hot_query_uses_an_index(client, name):
+    query, table, column = HOT_QUERIES[name]
+    
+    indexed, detail = check_index(engine, query, table, column)
+    
+    assert indexed, f"{name} would scan {table}: {detail}"
@@ -0,0 +1,84 @@
+"""
+Read routing of the list endpoints and the connections it holds.
+"""
+import os
+
+import pytest
+from sqlalchemy import event
+
+from app.db import replicas
+from app.db.database import async_engine
+from app.db.replicas import ReplicaRouter
+
+LIST_URLS = ["/meals/", "/carpool/events", "/checklists/", "/checklists/overview"]
+
+class ConnectionTracker:
+    """Connections checked out of an engine's pool at once, and the order of checkouts and checkins."""
+    
+    def __init__(self, name, engine):
+        self.name = name
+        self.engine = engine
+        self.in_use = 0
+        self.peak = 0
+        self.events = None
+    
+    def checkout(self, dbapi_connection, connection_record, connection_proxy):
+        self.in_use += 1
+        self.peak = max(self.peak, self.in_use)
+        self.events.append((self.name, "checkout"))
+    
+    def checkin(self, dbapi_connection, connection_record):
+        self.in_use -= 1
+        self.events.append((self.name, "checkin"))
+    
+    def __enter__(self):
+        event.listen(self.engine, "checkout", self.checkout)
+        event.listen(self.engine, "checkin", self.checkin)
+        return self
+    
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, "checkout", self.checkout)
+        event.remove(self.engine, "checkin", self.checkin)
+
+@pytest.fixture
+def replica(monkeypatch):
+    # The test database stands in for its own replica
+    router = ReplicaRouter([os.environ["DATABASE_URL"]], sticky_seconds=60)
+    router.check_all()
+    monkeypatch.setattr(replicas, "replica_router", router)
+    yield router.replicas[0]
+    router.replicas[0].check_engine.dispose()
+
+@pytest.mark.parametrize("url", LIST_URLS)
+def test_primary_reads_use_one_connection(client, auth_headers, url):
+    events = []
+    with ConnectionTracker("primary", async_engine.sync_engine) as primary:
+        primary.events = events
+        response = client.get(url, headers=auth_headers)
+    
+    assert response.status_code == 200, response.text
+    assert primary.peak == 1
+
+@pytest.mark.parametrize("url", LIST_URLS)
+def test_replica_reads_release_the_primary_connection_first(client, auth_headers, replica, url):
+    events = []
+    with ConnectionTracker("primary", async_engine.sync_engine) as primary, \
+            ConnectionTracker("replica", replica.engine.sync_engine) as replica_connections:
+        primary.events = replica_connections.events = events
+        response = client.get(url, headers=auth_headers)
+    
+    assert response.status_code == 200, response.text
+    assert replica.stats["reads"] == 1
+    # The user is loaded on the primary, whose connection is returned before the replica's is taken
+    assert events[:3] == [("primary", "checkout"), ("primary", "checkin"), ("replica", "checkout")]
+    assert primary.peak == 1 and replica_connections.peak == 1
+
+def test_reads_stay_on_primary_after_a_write(client, auth_headers, replica):
+    response = client.post("/meals/", json={"name": "Tacos", "meal_time": "Dinner", "planned_date": "2026-01-01"}, headers=auth_headers)
+    assert response.status_code == 201, response.text
+    
+    response = client.get("/meals/", headers=auth_headers)
+    
+    assert [meal["name"] for meal in response.json()["results"]] == ["Tacos"]
+    assert replica.stats["reads"] == 0
+    assert replicas.replica_router.stats["sticky_reads"] == 1
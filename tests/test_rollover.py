@@ -0,0 +1,107 @@
+"""
+Rolling a source over to a new index against a fake Elasticsearch client.
+"""
+import pytest
+
+from app.utils import elastic, reconcile, reindex
+from app.utils.elastic import MEAL_INDEX, write_alias
+
+OLD_INDEX = f"{MEAL_INDEX}-v1-20260101000000"
+
+class FakeIndices:
+    def __init__(self):
+        self.indices = {OLD_INDEX}
+        self.aliases = {MEAL_INDEX: {OLD_INDEX: {}}, write_alias(MEAL_INDEX): {OLD_INDEX: {"is_write_index": True}}}
+    
+    def get_alias(self, name):
+        return dict(self.aliases.get(name, {}))
+    
+    def create(self, index, mappings, settings=None):
+        self.indices.add(index)
+    
+    def put_settings(self, index, settings):
+        pass
+    
+    def refresh(self, index):
+        pass
+    
+    def update_aliases(self, actions):
+        for action in actions:
+            (kind, target), = action.items()
+            indices = self.aliases.setdefault(target["alias"], {})
+            if kind == "remove":
+                indices.pop(target["index"], None)
+            else:
+                indices[target["index"]] = {"is_write_index": target["is_write_index"]} if "is_write_index" in target else {}
+    
+    def delete(self, index, ignore_unavailable=False):
+        self.indices.discard(index)
+        for indices in self.aliases.values():
+            indices.pop(index, None)
+    
+    # The indices an alias points at
+    def pointed_at(self, alias):
+        return sorted(self.aliases.get(alias, {}))
+
+class FakeElasticsearch:
+    def __init__(self):
+        self.indices = FakeIndices()
+
+@pytest.fixture
+def es(monkeypatch):
+    client = FakeElasticsearch()
+    monkeypatch.setattr(elastic, "es_bulk_client", client)
+    return client
+
+# Records the index the write alias pointed at whenever the source was reconciled
+@pytest.fixture
+def reconciled(monkeypatch, es):
+    write_targets = []
+    
+    def fake_reconcile(name, batch_size=1000):
+        write_targets.append(es.indices.pointed_at(write_alias(MEAL_INDEX)))
+        return {"indexed": 0, "updated": 0, "deleted": 0, "errors": 0}
+    
+    monkeypatch.setattr(reconcile, "reconcile", fake_reconcile)
+    return write_targets
+
+def fill(errors=0, fails=False):
+    def fake_reindex(name, target_index=None, **kwargs):
+        if fails:
+            raise ConnectionError("Elasticsearch went away")
+        return {"index": target_index, "indexed": 10, "skipped": 0, "errors": errors}
+    return fake_reindex
+
+def test_switches_both_aliases_to_the_new_index(monkeypatch, es, reconciled):
+    monkeypatch.setattr(reindex, "reindex", fill())
+    
+    stats = reindex.rollover("meals")
+    
+    assert stats["switched"]
+    assert es.indices.pointed_at(MEAL_INDEX) == [stats["new_index"]]
+    assert es.indices.pointed_at(write_alias(MEAL_INDEX)) == [stats["new_index"]]
+    assert reconciled == [[stats["new_index"]]]
+
+def test_failed_fill_points_writes_back_at_the_old_index(monkeypatch, es, reconciled):
+    monkeypatch.setattr(reindex, "reindex", fill(fails=True))
+    
+    with pytest.raises(ConnectionError):
+        reindex.rollover("meals")
+    
+    assert es.indices.pointed_at(MEAL_INDEX) == [OLD_INDEX]
+    assert es.indices.pointed_at(write_alias(MEAL_INDEX)) == [OLD_INDEX]
+    assert es.indices.aliases[write_alias(MEAL_INDEX)][OLD_INDEX] == {"is_write_index": True}
+    assert es.indices.indices == {OLD_INDEX}
+    # The old index is caught up with the writes that went to the new one meanwhile
+    assert reconciled == [[OLD_INDEX]]
+
+def test_fill_with_errors_points_writes_back_at_the_old_index(monkeypatch, es, reconciled):
+    monkeypatch.setattr(reindex, "reindex", fill(errors=3))
+    
+    stats = reindex.rollover("meals")
+    
+    assert not stats["switched"]
+    assert es.indices.pointed_at(MEAL_INDEX) == [OLD_INDEX]
+    assert es.indices.pointed_at(write_alias(MEAL_INDEX)) == [OLD_INDEX]
+    assert es.indices.indices == {OLD_INDEX}
+    assert reconciled == [[stats["new_index"]], [OLD_INDEX]]
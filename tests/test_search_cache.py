@@ -0,0 +1,53 @@
+"""
+SearchResultCache invalidation and bookkeeping.
+"""
+import time
+
+from app.utils.search_cache import SearchResultCache
+
+def make_cache(**kwargs):
+    options = {"enabled": True, "ttl_seconds": 60, "max_entries": 100, "max_bytes": 1024 * 1024, "settle_seconds": 0}
+    options.update(kwargs)
+    return SearchResultCache(**options)
+
+def test_write_drops_cached_results_and_stale_searches():
+    cache = make_cache()
+    generation = cache.generation(1, "meals")
+    assert cache.put(1, "meals", "Tacos", 10, [3, 1], generation)
+    assert cache.get(1, "meals", " tacos!", 10) == ([3, 1], None)
+    
+    # A search that started before the write can't store its result
+    stale_generation = cache.generation(1, "meals")
+    cache.invalidate(1, "meals")
+    assert cache.get(1, "meals", "tacos", 10) is None
+    assert not cache.put(1, "meals", "tacos", 10, [3, 1], stale_generation)
+    assert cache.put(1, "meals", "tacos", 10, [3, 1, 7], cache.generation(1, "meals"))
+
+def test_old_writes_are_forgotten():
+    cache = make_cache(ttl_seconds=0.5)
+    for user_id in range(1000):
+        cache.invalidate(user_id, "meals")
+    assert cache.snapshot()["recent_writers"] == 1000
+    
+    time.sleep(0.6)
+    cache.invalidate(1000, "meals")
+    assert cache.snapshot()["recent_writers"] == 1
+
+def test_forgetting_a_write_keeps_stale_searches_out():
+    cache = make_cache(ttl_seconds=0.05)
+    stale_generation = cache.generation(1, "meals")
+    cache.invalidate(1, "meals")
+    
+    # Once the write is forgotten, the search from before it still can't store its result
+    time.sleep(0.1)
+    cache.invalidate(2, "meals")
+    assert not cache.put(1, "meals", "tacos", 10, [3], stale_generation)
+    assert cache.put(1, "meals", "tacos", 10, [3, 4], cache.generation(1, "meals"))
+
+def test_index_wide_invalidation_covers_users_without_writes():
+    cache = make_cache()
+    generation = cache.generation(5, "meals")
+    
+    cache.invalidate_index("meals")
+    
+    assert not cache.put(5, "meals", "tacos", 10, [3], generation)
@@ -0,0 +1,55 @@
+"""
+Meal suggestions and autocomplete keep their CPU work off the event loop.
+"""
+import asyncio
+
+import pytest
+
+from app.utils.autocomplete import AutocompleteIndex, PrefixTrie
+from app.utils.recommendations import MealHistoryModel, MealRecommender
+
+# Function to wrap a function so it records whether it ran on the event loop's thread
+def record_loop_use(function, calls):
+    def wrapper(*args, **kwargs):
+        try:
+            asyncio.get_running_loop()
+            calls.append("event loop")
+        except RuntimeError:
+            calls.append("thread")
+        return function(*args, **kwargs)
+    return wrapper
+
+@pytest.fixture
+def meals(client, auth_headers):
+    for day, name in enumerate(["Tacos", "Taco salad", "Soup", "Tacos", "Pasta", "Tacos"], start=1):
+        response = client.post("/meals/", json={
+            "name": name, "meal_time": "Dinner", "planned_date": f"2026-01-{day:02d}"
+        }, headers=auth_headers)
+        assert response.status_code == 201, response.text
+
+def test_suggestions_build_and_score_in_threadpool(client, auth_headers, meals, monkeypatch):
+    calls = []
+    monkeypatch.setattr(MealRecommender, "build_model", staticmethod(record_loop_use(MealRecommender.build_model, calls)))
+    monkeypatch.setattr(MealHistoryModel, "plan", record_loop_use(MealHistoryModel.plan, calls))
+    
+    response = client.get("/meals/suggest", headers=auth_headers)
+    
+    assert response.status_code == 200, response.text
+    assert {suggestion["meal"] for suggestion in response.json()["suggestions"]} <= {"Tacos", "Taco salad", "Soup", "Pasta"}
+    assert response.json()["suggestions"]
+    assert calls == ["thread", "thread"]
+
+def test_autocomplete_builds_and_walks_trie_in_threadpool(client, auth_headers, meals, monkeypatch):
+    calls = []
+    monkeypatch.setattr(AutocompleteIndex, "build_trie", staticmethod(record_loop_use(AutocompleteIndex.build_trie, calls)))
+    monkeypatch.setattr(PrefixTrie, "complete", record_loop_use(PrefixTrie.complete, calls))
+    
+    response = client.get("/meals/autocomplete", params={"q": "ta"}, headers=auth_headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["completions"] == ["Tacos", "Taco salad"]
+    
+    # The trie is cached now, only the lookup runs
+    response = client.get("/meals/autocomplete", params={"q": "so"}, headers=auth_headers)
+    assert response.json()["completions"] == ["Soup"]
+    
+    assert calls == ["thread", "thread", "thread"]